@@ -0,0 +1,60 @@
+"""
+Бенчмарк: JSON-експорт проти гарячої резервної копії (BackupService).
+
+База - синтетичний бекап з bench_import.py (200 000 рядків, ~5 років відміток).
+
+Запуск з кореня проєкту:
+    python benchmarks/bench_backup.py
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.storage import StorageService
+from src.logic.backup_service import BackupService
+from bench_import import make_backup, USER_ID
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def report(label, seconds, size):
+    print(f"{label:<40} {seconds * 1000:8.0f} ms {size / 1024:10.0f} KB")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = StorageService(os.path.join(tmp, "app.db"))
+        storage.import_user_data(make_backup(), USER_ID)
+        backups = BackupService(storage, os.path.join(tmp, "backups"))
+
+        json_path = os.path.join(tmp, "export.json")
+
+        def json_export():
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump(storage.export_user_data(USER_ID), f, ensure_ascii=False, indent=4)
+
+        seconds, _ = timed(json_export)
+        report("JSON (export_user_data + json.dump)", seconds, os.path.getsize(json_path))
+
+        seconds, _ = timed(lambda: storage.export_user_data_to_file(USER_ID, json_path))
+        report("JSON (export_user_data_to_file)", seconds, os.path.getsize(json_path))
+
+        seconds, manifest = timed(backups.create_backup)
+        report("BackupService.create_backup (gzip)", seconds, manifest["compressed_size"])
+        print(f"{'  знімок БД без стиснення':<40} {'':>11} {manifest['size'] / 1024:10.0f} KB")
+
+        seconds, _ = timed(lambda: backups.restore_backup(manifest["name"]))
+        report("BackupService.restore_backup", seconds, manifest["size"])
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Бенчмарк: звичайні рядки habit_logs проти стиснутих бітмапів по роках
+(StorageService.compact_habit_logs). 30 звичок x 10 років історії.
+
+Порівнюються розмір файлу БД (після VACUUM) та затримки читання.
+
+Запуск з кореня проєкту:
+    python benchmarks/bench_habit_bitmaps.py
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.storage import StorageService
+from src.models import Habit
+
+HABITS = 30
+YEARS = 10
+DENSITY = 0.7
+REPEAT = 20
+
+
+def fill(storage, user_id):
+    rng = random.Random(42)
+    today = date.today()
+    habits = [Habit(title=f"Звичка {i}", user_id=user_id) for i in range(HABITS)]
+    rows = []
+    for h in habits:
+        storage.save_habit(h)
+        rows.extend((h.id, (today - timedelta(days=d)).isoformat())
+                    for d in range(YEARS * 365) if rng.random() < DENSITY)
+    with storage.transaction() as c:
+        c.executemany("INSERT INTO habit_logs (habit_id, date) VALUES (?, ?)", rows)
+    return habits, len(rows)
+
+
+def db_size(storage):
+    conn = storage._connect()
+    conn.execute("VACUUM")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return os.path.getsize(storage.db_path)
+
+
+def timed(fn, repeat=REPEAT):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def measure(storage, user_id, habits):
+    today = date.today()
+    monday = today - timedelta(days=today.weekday())
+    year_ago = (today - timedelta(days=365 * 3)).isoformat()
+    h = habits[0]
+    old_day = (today - timedelta(days=365 * 5)).isoformat()
+
+    def toggle_twice():
+        storage.toggle_habit_date(h.id, old_day)
+        storage.toggle_habit_date(h.id, old_day)
+
+    return {
+        "get_habit_logs (рік, 3 роки тому)": timed(
+            lambda: storage.get_habit_logs(h.id, year_ago, (today - timedelta(days=365 * 2)).isoformat())),
+        "get_habit_logs (вся історія)": timed(lambda: storage.get_habit_logs(h.id, "1900-01-01", "2999-12-31")),
+        "get_habit_week_matrix": timed(
+            lambda: storage.get_habit_week_matrix(user_id, monday.isoformat(),
+                                                  (monday + timedelta(days=6)).isoformat())),
+        "toggle старого дня x2": timed(toggle_twice),
+        "recalc_all_streaks": timed(storage.recalc_all_streaks, repeat=3),
+        "export_user_data": timed(lambda: storage.export_user_data(user_id), repeat=3),
+    }
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = StorageService(os.path.join(tmp, "bench.db"))
+        habits, n_rows = fill(storage, "bench")
+        print(f"{HABITS} звичок x {YEARS} років: {n_rows} відміток")
+
+        size_rows = db_size(storage)
+        rows_times = measure(storage, "bench", habits)
+
+        result = storage.compact_habit_logs(keep_days=365)
+        print(f"compact_habit_logs: {result['rows']} рядків -> {result['bitmaps']} бітмапів "
+              f"за {result['seconds'] * 1000:.0f} ms")
+        size_bitmaps = db_size(storage)
+        bitmap_times = measure(storage, "bench", habits)
+        storage.close()
+
+    print(f"\n{'Розмір БД':<36} {size_rows / 1024:9.0f} KB {size_bitmaps / 1024:9.0f} KB"
+          f"  (x{size_rows / size_bitmaps:.1f} менше)")
+    print(f"{'Операція (мін. час)':<36} {'рядки':>12} {'бітмапи':>12}")
+    for name, before in rows_times.items():
+        print(f"{name:<36} {before:9.2f} ms {bitmap_times[name]:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
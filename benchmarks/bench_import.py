@@ -0,0 +1,109 @@
+"""
+Бенчмарк: імпорт синтетичного бекапу на 200 000 рядків.
+
+Порівнюються попередній імпорт (INSERT OR REPLACE по одному рядку)
+та import_user_data (перевірка колонок + executemany з ON CONFLICT DO UPDATE
+порціями), у порожню БД і повторно поверх тих самих даних.
+
+Запуск з кореня проєкту:
+    python benchmarks/bench_import.py
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.storage import StorageService
+
+GOALS = 2_000
+SUBGOALS_PER_GOAL = 50
+HABITS = 50
+LOG_DAYS = 1_900
+USER_ID = "bench"
+
+
+def make_backup():
+    """Синтетичний бекап версії 1: 2 000 цілей, 100 000 підцілей, 95 000 відміток."""
+    rng = random.Random(7)
+    today = date.today()
+    goals, subgoals = [], []
+    for g in range(GOALS):
+        goal_id = f"goal-{g:06d}"
+        goals.append({"id": goal_id, "user_id": USER_ID, "title": f"Ціль {g}", "description": "Опис цілі",
+                      "deadline": (today + timedelta(days=g % 365)).isoformat() + " 12:00", "priority": "Середній",
+                      "status": "Запланована", "created_at": "2024-01-01T10:00:00", "category_id": None,
+                      "link": None})
+        subgoals.extend({"id": f"sub-{g:06d}-{s:03d}", "goal_id": goal_id, "title": f"Крок {s}",
+                         "is_completed": rng.randint(0, 1), "description": "", "created_at": "2024-01-01T10:00:00"}
+                        for s in range(SUBGOALS_PER_GOAL))
+    habits, logs = [], []
+    for h in range(HABITS):
+        habit_id = f"habit-{h:04d}"
+        habits.append({"id": habit_id, "user_id": USER_ID, "title": f"Звичка {h}", "streak": 0,
+                       "last_completed_date": "", "run_length": 0, "best_streak": 0})
+        logs.extend({"habit_id": habit_id, "date": (today - timedelta(days=d)).isoformat()}
+                    for d in range(LOG_DAYS))
+    courses = [{"id": f"course-{i}", "user_id": USER_ID, "title": f"Курс {i}", "type": "Курс",
+                "status": "В процесі", "total_units": 10, "completed_units": 3, "link": "", "description": "",
+                "created_at": "2024-01-01T10:00:00", "topic_id": None} for i in range(2_950)]
+    return {"version": 1, "goals": goals, "subgoals": subgoals, "habits": habits,
+            "habit_logs": logs, "courses": courses}
+
+
+def legacy_import(storage, data, user_id):
+    """Попередня реалізація: копія кожного рядка та INSERT OR REPLACE по одному."""
+    def upsert(c, table, rows):
+        if not rows:
+            return
+        processed_rows = []
+        for row in rows:
+            new_row = row.copy()
+            if 'user_id' in new_row:
+                new_row['user_id'] = user_id
+            processed_rows.append(new_row)
+        keys = processed_rows[0].keys()
+        sql = f"INSERT OR REPLACE INTO {table} ({', '.join(keys)}) VALUES ({', '.join(['?'] * len(keys))})"
+        for row in processed_rows:
+            c.execute(sql, list(row.values()))
+
+    with storage.transaction() as c:
+        for table in StorageService.IMPORT_TABLES:
+            upsert(c, table, data.get(table, []))
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<44} {elapsed:7.2f} s")
+    return elapsed
+
+
+def main():
+    data = make_backup()
+    rows = sum(len(data[t]) for t in StorageService.IMPORT_TABLES if t in data)
+    print(f"Синтетичний бекап: {rows} рядків")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = StorageService(os.path.join(tmp, "legacy.db"))
+        old_fresh = timed("INSERT OR REPLACE по рядку, порожня БД", lambda: legacy_import(legacy, data, USER_ID))
+        old_again = timed("INSERT OR REPLACE по рядку, повторно", lambda: legacy_import(legacy, data, USER_ID))
+        legacy.close()
+
+        storage = StorageService(os.path.join(tmp, "new.db"))
+        calls = []
+        new_fresh = timed("import_user_data, порожня БД",
+                          lambda: storage.import_user_data(data, USER_ID, progress=lambda *a: calls.append(a)))
+        new_again = timed("import_user_data, повторно", lambda: storage.import_user_data(data, USER_ID))
+        storage.close()
+
+    print(f"Прискорення: x{old_fresh / new_fresh:.1f} (порожня БД), x{old_again / new_again:.1f} (повторно); "
+          f"викликів progress: {len(calls)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Бенчмарк: повнотекстовий пошук (StorageService.search) на 10 000 цілей з 30 000 підцілей
+проти попереднього пошуку в пам'яті (regex по кожному полю кожного елемента).
+
+Запуск з кореня проєкту:
+    python benchmarks/bench_search.py
+"""
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.storage import StorageService
+from src.models import LearningGoal, SubGoal
+
+GOALS = 10_000
+SUBGOALS_PER_GOAL = 3
+VOCABULARY = 3_000
+REPEAT = 20
+QUERIES = ["граматика", "грам", "англ грам", "слово1234", "слово12", "неіснуюче"]
+
+
+def fill(storage, user_id):
+    rng = random.Random(1)
+    words = ("вивчити англійську граматика python алгоритми йога біг читання книга проєкт "
+             "курс тренування словник математика фізика").split()
+    words += [f"слово{i}" for i in range(VOCABULARY)]
+    goals = [LearningGoal(title=" ".join(rng.sample(words, 3)), description=" ".join(rng.sample(words, 8)),
+                          user_id=user_id) for _ in range(GOALS)]
+    storage.save_goals_many(goals)
+    subgoals = [SubGoal(title=" ".join(rng.sample(words, 2)), goal_id=g.id)
+                for g in goals for _ in range(SUBGOALS_PER_GOAL)]
+    storage.save_subgoals_many(subgoals)
+    return goals, subgoals
+
+
+def regex_search(goals, subgoals_by_goal, query):
+    """Попередній SearchDialog: регулярний вираз на кожне поле кожного елемента."""
+    found = []
+    for g in goals:
+        fields = [g.title, g.description] + [s.title for s in subgoals_by_goal.get(g.id, [])]
+        if any(re.compile(f"({re.escape(query)})", re.IGNORECASE).search(f) for f in fields if f):
+            found.append(g)
+    return found
+
+
+def timed(fn):
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = StorageService(os.path.join(tmp, "bench.db"))
+        goals, subgoals = fill(storage, "bench")
+        subgoals_by_goal = storage.get_subgoals_by_goal([g.id for g in goals])
+        print(f"{len(goals)} цілей, {len(subgoals)} підцілей")
+        print(f"{'Запит':<14} {'FTS5 (top 50)':>16} {'збігів':>8} {'regex у пам`яті':>18} {'збігів':>8}")
+        for query in QUERIES:
+            fts_ms, hits = timed(lambda: storage.search("bench", query, limit=50))
+            regex_ms, found = timed(lambda: regex_search(goals, subgoals_by_goal, query))
+            print(f"{query:<14} {fts_ms:13.3f} ms {len(hits):8} {regex_ms:15.1f} ms {len(found):8}")
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
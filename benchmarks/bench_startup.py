@@ -0,0 +1,152 @@
+"""
+Звіт про час старту: від запуску процесу до першого відмальовування MainWindow.
+
+Кожен вимір - окремий процес (імпорти кешуються в межах процесу), на згенерованій БД (src/datagen.py),
+QT_QPA_PLATFORM=offscreen. Режим eager відтворює попередній старт для порівняння: matplotlib і Gemini SDK
+імпортуються одразу, а всі вкладки будуються разом із вікном.
+
+Запуск з кореня проєкту:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --size medium --runs 7
+"""
+import time
+
+STARTED = time.perf_counter()
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results", "bench_startup.json")
+MODES = ("eager", "lazy")
+# Етапи дочірнього процесу в порядку виконання
+STAGES = ("imports", "qapplication", "main_window", "first_paint")
+HEAVY_MODULES = ("matplotlib", "google.generativeai")
+
+
+def measure(db_path, user_id, eager):
+    """Виконується в дочірньому процесі: мс від старту скрипта до кінця кожного етапу."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    marks = {}
+
+    def mark(stage):
+        marks[stage] = (time.perf_counter() - STARTED) * 1000
+
+    from PyQt5.QtWidgets import QApplication
+    from src.storage import StorageService
+    from src.ui.main_window import MainWindow
+    if eager:
+        from src.ui.tabs import stats_tab
+        from src.logic import ai_service
+        stats_tab._load_matplotlib()
+        ai_service._load_genai()
+    mark("imports")
+
+    app = QApplication(sys.argv)
+    storage = StorageService(db_path)
+    mark("qapplication")
+
+    mw = MainWindow(user_id, storage)
+    if eager:
+        for index in range(len(mw.TABS)):
+            mw.ensure_tab(index)
+    mw.db.wait()
+    mark("main_window")
+
+    mw.show()
+    app.processEvents()
+    mw.grab()
+    mark("first_paint")
+    painted_at = time.time()
+
+    loaded = [m for m in HEAVY_MODULES if m in sys.modules]
+    mw.close()
+    storage.close()
+    return {"stages_ms": marks, "painted_at": painted_at, "loaded": loaded}
+
+
+def run_child(db_path, user_id, mode):
+    """Окремий процес на вимір; spawn_ms - від запуску процесу (разом зі стартом інтерпретатора) до відмальовування."""
+    spawned = time.time()
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode, "--db", db_path,
+                           "--user", user_id], capture_output=True, text=True, cwd=ROOT_DIR, timeout=300)
+    for line in proc.stdout.splitlines():
+        if line.startswith("RESULT "):
+            result = json.loads(line[len("RESULT "):])
+            result["spawn_ms"] = (result.pop("painted_at") - spawned) * 1000
+            return result
+    raise RuntimeError(f"Дочірній процес ({mode}) завершився з кодом {proc.returncode}:\n{proc.stderr[-2000:]}")
+
+
+def summarize(samples):
+    summary = {stage: statistics.median(s["stages_ms"][stage] for s in samples) for stage in STAGES}
+    summary["spawn_ms"] = statistics.median(s["spawn_ms"] for s in samples)
+    summary["loaded"] = samples[-1]["loaded"]
+    summary["runs"] = len(samples)
+    return summary
+
+
+def run(size, runs):
+    from src.storage import StorageService
+    from src.datagen import SIZES, DatasetGenerator
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, f"{size}.db")
+        storage = StorageService(db_path)
+        try:
+            user_id = DatasetGenerator(storage, SIZES[size]).generate()["users"][0]
+        finally:
+            storage.close()
+        # Режими чергуються, щоб фоновий шум машини розподілявся між ними порівну
+        samples = {mode: [] for mode in MODES}
+        for _ in range(runs):
+            for mode in MODES:
+                samples[mode].append(run_child(db_path, user_id, mode))
+    return {mode: summarize(s) for mode, s in samples.items()}
+
+
+def print_report(size, results):
+    print(f"Старт ({size}), медіана, мс від запуску скрипта:")
+    print(f"  {'етап':<14}" + "".join(f"{mode:>12}" for mode in MODES))
+    for stage in STAGES + ("spawn_ms",):
+        print(f"  {stage:<14}" + "".join(f"{results[mode][stage]:12.0f}" for mode in MODES))
+    for mode in MODES:
+        print(f"  {mode}: завантажено до першого кадру: {', '.join(results[mode]['loaded']) or '-'}")
+    eager, lazy = results["eager"]["first_paint"], results["lazy"]["first_paint"]
+    print(f"Час до першого відмальовування: {eager:.0f} -> {lazy:.0f} мс ({eager / lazy:.1f}x)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Час старту до першого відмальовування")
+    parser.add_argument("--size", default="small", help="набір з src/datagen.SIZES")
+    parser.add_argument("--runs", type=int, default=5, help="процесів на режим")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    parser.add_argument("--user", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.child:
+        print("RESULT " + json.dumps(measure(args.db, args.user, args.child == "eager")))
+        return
+
+    results = run(args.size, args.runs)
+    print_report(args.size, results)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"size": args.size, "modes": results}, f, indent=2, ensure_ascii=False)
+    print(f"Результати: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
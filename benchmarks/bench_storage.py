@@ -0,0 +1,533 @@
+"""
+Набір бенчмарків StorageService: кожен публічний метод на згенерованих наборах даних
+(src/datagen.py: small, medium, large) з порогами регресії. Qt не потрібен.
+
+Для кожного методу - p50/p95 затримки та кількість SQL-запитів за виклик (StorageProfiler,
+в окремому невиміряному виклику).
+Кеш читань скидається перед кожним виміром, тож міряється робота з БД.
+Результати пишуться в JSON; якщо є базовий файл, метод, що повільніший за базу більше
+ніж на --tolerance (і на --min-delta мс) за p50 і за мінімумом, або робить більше запитів,
+- регресія (код виходу 1).
+
+Запуск з кореня проєкту:
+    python benchmarks/bench_storage.py                          # small і medium, порівняння з базою
+    python benchmarks/bench_storage.py --sizes large --repeat 5 --budget 10
+    python benchmarks/bench_storage.py --update-baseline        # записати поточні результати як базу
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.storage import StorageService
+from src.datagen import SIZES, DatasetGenerator
+from src.models import User, LearningGoal, GoalStatus, SubGoal, Category, Course, CourseStatus, Habit, Topic
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results", "bench_storage.json")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline_storage.json")
+# Дата, відносно якої генеруються дані: однакова база при кожному запуску
+TODAY = date(2026, 1, 15)
+
+MIN_SAMPLES = 3
+
+# Службові методи без роботи з даними
+SKIPPED = {"close", "release_thread_connection", "enable_profiling", "disable_profiling", "profile_scope",
+           "add_change_listener", "remove_change_listener"}
+
+
+class Case:
+    def __init__(self, setup, once=False):
+        self.setup = setup
+        self.once = once  # змінює дані безповоротно - один вимір у кінці
+
+
+CASES = {}
+
+
+def case(name=None, once=False):
+    """
+    Реєструє сценарій: setup(ctx) готує дані (поза виміром) і повертає функцію для виміру.
+    Назва - метод StorageService, варіанти - "метод[варіант]".
+    """
+    def register(setup):
+        CASES[name or setup.__name__] = Case(setup, once)
+        return setup
+    return register
+
+
+def method_of(name):
+    return name.split("[")[0]
+
+
+class Context:
+    """Дані для сценаріїв, вибрані з першого користувача згенерованої бази."""
+
+    def __init__(self, storage, user_ids, tmp):
+        self.storage = storage
+        self.tmp = tmp
+        self.user_id = user_ids[0]
+        self.user = storage.get_user_by_id(self.user_id)
+        self.goals = storage.get_goals(self.user_id, sort="created_at")
+        self.goal = self.goals[len(self.goals) // 2]
+        # Одна сторінка вкладки цілей
+        self.goal_ids = [g.id for g in self.goals[:30]]
+        subgoals = storage.get_subgoals_by_goal(self.goal_ids)
+        self.subgoal = next(s for group in subgoals.values() for s in group)
+        self.category = storage.get_categories(self.user_id)[0]
+        self.topic = storage.get_topics(self.user_id)[0]
+        self.course = storage.get_courses(self.user_id, limit=1)[0]
+        self.habits = storage.get_habits(self.user_id)
+        self.habit = self.habits[0]
+        self.week_start = TODAY - timedelta(days=TODAY.weekday())
+        # Невеликий бекап для імпорту: повторний імпорт тих самих рядків (upsert)
+        export = storage.export_user_data(self.user_id)
+        self.import_payload = {"goals": export["goals"][:200], "subgoals": export["subgoals"][:400],
+                               "habit_logs": export["habit_logs"][:1000]}
+        self.sync_token = export.get("sync_token")
+        self.counter = 0
+
+    def next_name(self, prefix):
+        self.counter += 1
+        return f"{prefix} {self.counter}"
+
+
+# Читання
+
+@case()
+def get_user_by_id(ctx):
+    return lambda: ctx.storage.get_user_by_id(ctx.user_id)
+
+
+@case()
+def get_user_by_username(ctx):
+    return lambda: ctx.storage.get_user_by_username(ctx.user.username)
+
+
+@case()
+def get_categories(ctx):
+    return lambda: ctx.storage.get_categories(ctx.user_id)
+
+
+@case()
+def get_topics(ctx):
+    return lambda: ctx.storage.get_topics(ctx.user_id)
+
+
+@case()
+def get_goals(ctx):
+    return lambda: ctx.storage.get_goals(ctx.user_id)
+
+
+@case("get_goals[open, deadline]")
+def get_goals_open_by_deadline(ctx):
+    statuses = [GoalStatus.PLANNED, GoalStatus.IN_PROGRESS]
+    now = datetime.combine(TODAY, datetime.min.time())
+    return lambda: ctx.storage.get_goals(ctx.user_id, statuses=statuses, deadline_from=now,
+                                         deadline_to=now + timedelta(days=7), sort="deadline")
+
+
+@case("get_goals_page[first]")
+def get_goals_page(ctx):
+    return lambda: ctx.storage.get_goals_page(ctx.user_id, limit=30)
+
+
+@case("get_goals_page[priority, next]")
+def get_goals_page_next(ctx):
+    _, cursor = ctx.storage.get_goals_page(ctx.user_id, sort="priority", limit=30)
+    return lambda: ctx.storage.get_goals_page(ctx.user_id, sort="priority", limit=30, after=cursor)
+
+
+@case("get_goals_page[category]")
+def get_goals_page_category(ctx):
+    return lambda: ctx.storage.get_goals_page(ctx.user_id, category_id=ctx.category.id, limit=30)
+
+
+@case()
+def get_goals_progress(ctx):
+    return lambda: ctx.storage.get_goals_progress(ctx.user_id)
+
+
+@case()
+def get_deadline_days(ctx):
+    return lambda: ctx.storage.get_deadline_days(ctx.user_id)
+
+
+@case()
+def get_subgoals(ctx):
+    return lambda: ctx.storage.get_subgoals(ctx.goal.id)
+
+
+@case()
+def get_subgoals_by_goal(ctx):
+    return lambda: ctx.storage.get_subgoals_by_goal(ctx.goal_ids)
+
+
+@case()
+def get_courses(ctx):
+    return lambda: ctx.storage.get_courses(ctx.user_id)
+
+
+@case("get_courses_page[first]")
+def get_courses_page(ctx):
+    return lambda: ctx.storage.get_courses_page(ctx.user_id, statuses=[CourseStatus.IN_PROGRESS],
+                                                sort="progress", limit=30)
+
+
+@case()
+def get_courses_avg_progress(ctx):
+    return lambda: ctx.storage.get_courses_avg_progress(ctx.user_id)
+
+
+@case()
+def get_stats_counts(ctx):
+    return lambda: ctx.storage.get_stats_counts(ctx.user_id, "goal_status", "goal_priority", "goal_category",
+                                                "course_status", "course_type")
+
+
+@case()
+def get_habits(ctx):
+    return lambda: ctx.storage.get_habits(ctx.user_id)
+
+
+@case()
+def get_habit_logs(ctx):
+    start = (TODAY - timedelta(days=365)).isoformat()
+    return lambda: ctx.storage.get_habit_logs(ctx.habit.id, start, TODAY.isoformat())
+
+
+@case()
+def get_habit_week_matrix(ctx):
+    start = ctx.week_start.isoformat()
+    end = (ctx.week_start + timedelta(days=6)).isoformat()
+    return lambda: ctx.storage.get_habit_week_matrix(ctx.user_id, start, end)
+
+
+@case()
+def search(ctx):
+    return lambda: ctx.storage.search(ctx.user_id, "вивч")
+
+
+@case("search[two words]")
+def search_two_words(ctx):
+    return lambda: ctx.storage.search(ctx.user_id, "етап частину")
+
+
+@case()
+def export_user_data(ctx):
+    return lambda: ctx.storage.export_user_data(ctx.user_id)
+
+
+@case("export_user_data[delta]")
+def export_user_data_delta(ctx):
+    return lambda: ctx.storage.export_user_data(ctx.user_id, since=ctx.sync_token)
+
+
+@case()
+def export_user_data_to_file(ctx):
+    path = os.path.join(ctx.tmp, "export.json")
+    return lambda: ctx.storage.export_user_data_to_file(ctx.user_id, path)
+
+
+# Запис
+
+@case()
+def transaction(ctx):
+    def run():
+        with ctx.storage.transaction("goals"):
+            pass
+    return run
+
+
+@case()
+def data_replaced(ctx):
+    return ctx.storage.data_replaced
+
+
+@case()
+def create_user(ctx):
+    user = User(username=ctx.next_name("bench-user"), password_hash="x")
+    return lambda: ctx.storage.create_user(user)
+
+
+@case()
+def update_user_stats(ctx):
+    return lambda: ctx.storage.update_user_stats(ctx.user_id, ctx.counter)
+
+
+@case()
+def save_goal(ctx):
+    return lambda: ctx.storage.save_goal(ctx.goal)
+
+
+@case()
+def save_goals_many(ctx):
+    goals = ctx.goals[:100]
+    return lambda: ctx.storage.save_goals_many(goals)
+
+
+@case()
+def delete_goal(ctx):
+    goal = LearningGoal(title=ctx.next_name("Тимчасова ціль"), user_id=ctx.user_id)
+    ctx.storage.save_goal(goal)
+    ctx.storage.save_subgoals_many([SubGoal(title=f"Крок {i}", goal_id=goal.id) for i in range(3)])
+    return lambda: ctx.storage.delete_goal(goal.id)
+
+
+@case()
+def delete_goals_many(ctx):
+    goals = [LearningGoal(title=ctx.next_name("Тимчасова ціль"), user_id=ctx.user_id) for _ in range(50)]
+    ctx.storage.save_goals_many(goals)
+    return lambda: ctx.storage.delete_goals_many([g.id for g in goals])
+
+
+@case()
+def save_subgoal(ctx):
+    return lambda: ctx.storage.save_subgoal(ctx.subgoal)
+
+
+@case()
+def save_subgoals_many(ctx):
+    subgoals = [SubGoal(title=f"Крок {i}", goal_id=ctx.goal.id) for i in range(100)]
+    return lambda: ctx.storage.save_subgoals_many(subgoals)
+
+
+@case()
+def delete_subgoal(ctx):
+    subgoal = SubGoal(title=ctx.next_name("Тимчасовий крок"), goal_id=ctx.goal.id)
+    ctx.storage.save_subgoal(subgoal)
+    return lambda: ctx.storage.delete_subgoal(subgoal.id)
+
+
+@case()
+def save_category(ctx):
+    return lambda: ctx.storage.save_category(ctx.category)
+
+
+@case()
+def delete_category(ctx):
+    category = Category(name=ctx.next_name("Тимчасова"), user_id=ctx.user_id)
+    ctx.storage.save_category(category)
+    return lambda: ctx.storage.delete_category(category.id)
+
+
+@case()
+def save_topic(ctx):
+    return lambda: ctx.storage.save_topic(ctx.topic)
+
+
+@case()
+def delete_topic(ctx):
+    topic = Topic(name=ctx.next_name("Тимчасова"), user_id=ctx.user_id)
+    ctx.storage.save_topic(topic)
+    return lambda: ctx.storage.delete_topic(topic.id)
+
+
+@case()
+def save_course(ctx):
+    return lambda: ctx.storage.save_course(ctx.course)
+
+
+@case()
+def delete_course(ctx):
+    course = Course(title=ctx.next_name("Тимчасовий"), user_id=ctx.user_id, topic_id=ctx.topic.id)
+    ctx.storage.save_course(course)
+    return lambda: ctx.storage.delete_course(course.id)
+
+
+@case()
+def save_habit(ctx):
+    return lambda: ctx.storage.save_habit(ctx.habit)
+
+
+@case()
+def delete_habit(ctx):
+    habit = Habit(title=ctx.next_name("Тимчасова"), user_id=ctx.user_id)
+    ctx.storage.save_habit(habit)
+    for i in range(30):
+        ctx.storage.toggle_habit_date(habit.id, (TODAY - timedelta(days=i)).isoformat())
+    return lambda: ctx.storage.delete_habit(habit.id)
+
+
+@case()
+def toggle_habit_date(ctx):
+    # Почергово відмічає і знімає відмітку; серія перераховується щоразу
+    return lambda: ctx.storage.toggle_habit_date(ctx.habit.id, TODAY.isoformat())
+
+
+@case()
+def import_user_data(ctx):
+    return lambda: ctx.storage.import_user_data(ctx.import_payload, ctx.user_id)
+
+
+@case()
+def recalc_all_streaks(ctx):
+    return ctx.storage.recalc_all_streaks
+
+
+@case(once=True)
+def compact_habit_logs(ctx):
+    return lambda: ctx.storage.compact_habit_logs(keep_days=(date.today() - TODAY).days + 180)
+
+
+def check_coverage():
+    """Кожен публічний метод StorageService має сценарій або явно пропущений."""
+    public = {name for name in dir(StorageService) if not name.startswith("_")
+              and callable(getattr(StorageService, name))}
+    missing = public - SKIPPED - {method_of(name) for name in CASES}
+    if missing:
+        raise SystemExit(f"Немає сценаріїв для: {', '.join(sorted(missing))}")
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))]
+
+
+def count_queries(ctx, name, fn):
+    """SQL-запити одного виклику (StorageProfiler); кеш читань скинуто."""
+    profiler = ctx.storage.enable_profiling(slow_ms=float("inf"))
+    try:
+        ctx.storage.cache.invalidate()
+        with profiler.scope(name):
+            fn()
+        return profiler.scopes()[name]["statements"]
+    finally:
+        ctx.storage.disable_profiling()
+
+
+def run_case(ctx, name, bench_case, repeat, budget):
+    # Запити рахуються в окремому виклику без виміру: trace-callback sqlite3 помітно
+    # сповільнює оператори з тригерами. Одноразовий сценарій рахується у тому ж виклику
+    queries = None if bench_case.once else count_queries(ctx, name, bench_case.setup(ctx))
+    samples = []
+    # Не більше repeat вимірів і не довше budget секунд, але щонайменше MIN_SAMPLES
+    deadline = time.perf_counter() + budget
+    for i in range(1 if bench_case.once else repeat):
+        if i >= MIN_SAMPLES and time.perf_counter() > deadline:
+            break
+        fn = bench_case.setup(ctx)
+        ctx.storage.cache.invalidate()
+        start = time.perf_counter()
+        if queries is None:
+            queries = count_queries(ctx, name, fn)
+        else:
+            fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"p50_ms": percentile(samples, 0.5), "p95_ms": percentile(samples, 0.95), "min_ms": min(samples),
+            "mean_ms": sum(samples) / len(samples), "samples": len(samples), "queries": queries}
+
+
+def run_size(size, spec, repeat, budget, only=None):
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = StorageService(os.path.join(tmp, f"{size}.db"))
+        try:
+            dataset = DatasetGenerator(storage, spec, today=TODAY).generate()
+            ctx = Context(storage, dataset["users"], tmp)
+            names = [n for n in CASES if not only or method_of(n) in only or n in only]
+            # Сценарії, що змінюють дані безповоротно, - в кінці
+            names.sort(key=lambda n: CASES[n].once)
+            methods = {}
+            for name in names:
+                methods[name] = run_case(ctx, name, CASES[name], repeat, budget)
+                m = methods[name]
+                print(f"  {name:<36} p50 {m['p50_ms']:9.3f} ms  p95 {m['p95_ms']:9.3f} ms  "
+                      f"SQL {m['queries']:>4}  (n={m['samples']})")
+        finally:
+            storage.close()
+    rows = {k: v for k, v in dataset.items() if k not in ("users", "seconds")}
+    return {"spec": asdict(spec), "rows": rows, "generate_seconds": dataset["seconds"], "methods": methods}
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """
+    Список регресій відносно бази: більше SQL-запитів або сповільнення більше ніж у (1 + tolerance)
+    рази і на min_delta_ms. Сповільнення має бути і в p50, і в мінімумі - короткі стрибки
+    навантаження машини піднімають p50, але рідко мінімум.
+    """
+    def limit(value):
+        return max(value * (1 + tolerance), value + min_delta_ms)
+
+    regressions = []
+    for size, current in results["sizes"].items():
+        base_methods = baseline.get("sizes", {}).get(size, {}).get("methods", {})
+        for name, m in current["methods"].items():
+            base = base_methods.get(name)
+            if base is None:
+                continue
+            # Один вимір (одноразовий сценарій) надто шумний для порогу часу - лише запити
+            timed = min(m["samples"], base["samples"]) >= MIN_SAMPLES
+            if timed and m["p50_ms"] > limit(base["p50_ms"]) and m["min_ms"] > limit(base["min_ms"]):
+                regressions.append(f"{size}/{name}: p50 {m['p50_ms']:.3f} ms, мін. {m['min_ms']:.3f} ms "
+                                   f"(база {base['p50_ms']:.3f} / {base['min_ms']:.3f} ms)")
+            if m["queries"] > base["queries"]:
+                regressions.append(f"{size}/{name}: {m['queries']} SQL-запитів замість {base['queries']}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарки StorageService з порогами регресії")
+    parser.add_argument("--sizes", default="small,medium", help="набори з src/datagen.SIZES через кому")
+    parser.add_argument("--repeat", type=int, default=20, help="вимірів на метод")
+    parser.add_argument("--budget", type=float, default=1.0, help="секунд на метод (але не менше 3 вимірів)")
+    parser.add_argument("--methods", help="лише ці методи або сценарії, через кому")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="записати результати як нову базу")
+    parser.add_argument("--tolerance", type=float, default=1.0,
+                        help="допустиме сповільнення, частка (1.0 - удвічі; на спільних машинах шум до ~70%%)")
+    parser.add_argument("--min-delta", type=float, default=0.5, help="сповільнення, менше за це (мс), - шум")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    check_coverage()
+    only = set(args.methods.split(",")) if args.methods else None
+    results = {"created": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+               "sqlite": sqlite3.sqlite_version, "machine": platform.platform(), "repeat": args.repeat,
+               "sizes": {}}
+    for size in args.sizes.split(","):
+        print(f"{size}:")
+        results["sizes"][size] = run_size(size, SIZES[size], args.repeat, args.budget, only)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"Результати: {args.output}")
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+        # Оновлюються лише виміряні набори; решта бази лишається
+        baseline.update({k: v for k, v in results.items() if k != "sizes"})
+        baseline.setdefault("sizes", {}).update(results["sizes"])
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, ensure_ascii=False)
+        print(f"Базу оновлено: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("Бази немає - порівняння пропущено (створіть її через --update-baseline)")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        regressions = compare(results, json.load(f), args.tolerance, args.min_delta)
+    for line in regressions:
+        print(f"РЕГРЕСІЯ {line}")
+    if not regressions:
+        print("Регресій немає")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
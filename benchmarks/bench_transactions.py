@@ -0,0 +1,59 @@
+"""
+Бенчмарк: 1000 вставок підцілей по одній (commit на кожну)
+проти однієї транзакції з save_subgoals_many.
+
+Запуск з кореня проєкту:
+    python benchmarks/bench_transactions.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.storage import StorageService
+from src.models import LearningGoal, SubGoal
+
+N = 1000
+
+
+def make_subgoals(goal_id):
+    return [SubGoal(title=f"Крок {i}", goal_id=goal_id) for i in range(N)]
+
+
+def bench(storage, label, fn):
+    goal = LearningGoal(title=label, user_id="bench")
+    storage.save_goal(goal)
+    subs = make_subgoals(goal.id)
+
+    start = time.perf_counter()
+    fn(subs)
+    elapsed = time.perf_counter() - start
+
+    assert len(storage.get_subgoals(goal.id)) == N
+    print(f"{label:<32} {elapsed * 1000:9.1f} ms  ({elapsed / N * 1e6:7.1f} µs/рядок)")
+    return elapsed
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = StorageService(os.path.join(tmp, "bench.db"))
+
+        def one_by_one(subs):
+            for s in subs:
+                storage.save_subgoal(s)
+
+        def bulk(subs):
+            with storage.transaction():
+                storage.save_subgoals_many(subs)
+
+        print(f"Вставка {N} підцілей:")
+        before = bench(storage, "save_subgoal x N (N commit)", one_by_one)
+        after = bench(storage, "save_subgoals_many (1 commit)", bulk)
+        print(f"Прискорення: x{before / after:.1f}")
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
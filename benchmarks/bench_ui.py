@@ -0,0 +1,276 @@
+"""
+Бенчмарк побудови UI без дисплея (QT_QPA_PLATFORM=offscreen) на згенерованих наборах даних
+(src/datagen.py): побудова MainWindow, перемальовування QuestTab, DevelopmentTab,
+HabitTab, StatsTab і CalendarTab та додавання N карток цілей у список QuestTab.
+
+Час міряється до доставки фонових читань (AsyncStorage.wait) і відмальовування (grab),
+пам'ять - поточний RSS до/після сценарію та піковий RSS процесу.
+Кожен запуск дописується в історію (JSONL з комітом git) і порівнюється з попереднім запуском.
+
+Запуск з кореня проєкту:
+    python benchmarks/bench_ui.py
+    python benchmarks/bench_ui.py --sizes large --cards 2000
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path[:0] = [os.path.dirname(BENCH_DIR), BENCH_DIR]
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from PyQt5.QtCore import QEvent
+from PyQt5.QtWidgets import QApplication
+
+from src.storage import StorageService
+from src.datagen import SIZES, DatasetGenerator
+from src.ui.main_window import MainWindow
+from bench_storage import MIN_SAMPLES, percentile
+
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results", "bench_ui.json")
+DEFAULT_HISTORY = os.path.join(BENCH_DIR, "results", "bench_ui_history.jsonl")
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    """Реєструє сценарій: setup(ctx) готує стан поза виміром і повертає функцію для виміру."""
+    def register(setup):
+        SCENARIOS[name] = setup
+        return setup
+    return register
+
+
+def rss_mb():
+    """Поточний RSS процесу (Linux), МБ."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux повертає КіБ, macOS - байти
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+class Context:
+    def __init__(self, app, storage, user_id, cards):
+        self.app = app
+        self.storage = storage
+        self.user_id = user_id
+        self.cards = cards
+        self.garbage = []
+        self.mw = self.new_window()
+        self.mw.show()
+        self.settle()
+
+    def new_window(self):
+        mw = MainWindow(self.user_id, self.storage)
+        mw.db.wait()
+        return mw
+
+    def settle(self):
+        """Обробляє події, зокрема відкладені видалення віджетів (deleteLater)."""
+        self.app.processEvents()
+        QApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+        self.app.processEvents()
+
+    def dispose(self):
+        for widget in self.garbage:
+            widget.close()
+            widget.deleteLater()
+        self.garbage.clear()
+        self.settle()
+
+    def show_tab(self, index):
+        self.mw.switch_tab(index)
+        self.mw.db.wait()
+        self.settle()
+        return self.mw.stack.widget(index)
+
+
+@scenario("MainWindow()")
+def main_window(ctx):
+    def run():
+        ctx.garbage.append(ctx.new_window())
+    return run
+
+
+@scenario("MainWindow.show (перше відмальовування)")
+def main_window_show(ctx):
+    mw = ctx.new_window()
+    ctx.garbage.append(mw)
+
+    def run():
+        mw.show()
+        ctx.app.processEvents()
+        mw.grab()
+    return run
+
+
+def tab_refresh(index, method):
+    def setup(ctx):
+        tab = ctx.show_tab(index)
+
+        def run():
+            getattr(tab, method)()
+            ctx.mw.db.wait()
+            ctx.app.processEvents()
+            tab.grab()
+        return run
+    return setup
+
+
+scenario("QuestTab.update_list")(tab_refresh(0, "update_list"))
+scenario("DevelopmentTab.update_list")(tab_refresh(1, "update_list"))
+scenario("HabitTab.load_data")(tab_refresh(2, "load_data"))
+scenario("StatsTab.update_charts")(tab_refresh(3, "update_charts"))
+scenario("CalendarTab.highlight_dates")(tab_refresh(4, "highlight_dates"))
+
+
+@scenario("QuestTab.add_cards (N карток)")
+def quest_cards(ctx):
+    tab = ctx.show_tab(0)
+    goals = ctx.storage.get_goals(ctx.user_id, limit=ctx.cards)
+    tab.clear_list()
+    tab.model.categories = {c.id: c for c in ctx.storage.get_categories(ctx.user_id)}
+    tab.model.progress = ctx.storage.get_goals_progress(ctx.user_id)
+    ctx.settle()
+
+    def run():
+        tab.add_cards(goals)
+        ctx.app.processEvents()
+        tab.grab()
+    return run
+
+
+def run_scenario(ctx, name, setup, repeat, budget):
+    samples = []
+    rss_before = rss_mb()
+    rss_after = None
+    deadline = time.perf_counter() + budget
+    for i in range(repeat):
+        if i >= MIN_SAMPLES and time.perf_counter() > deadline:
+            break
+        fn = setup(ctx)
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+        # Пам'ять, яку тримає результат сценарію (вікно, картки), - до прибирання
+        rss_after = rss_mb()
+        ctx.dispose()
+    result = {"p50_ms": percentile(samples, 0.5), "p95_ms": percentile(samples, 0.95), "min_ms": min(samples),
+              "samples": len(samples), "peak_rss_mb": peak_rss_mb()}
+    if rss_before is not None and rss_after is not None:
+        result["rss_delta_mb"] = rss_after - rss_before
+    return result
+
+
+def run_size(app, size, spec, repeat, budget, cards):
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = StorageService(os.path.join(tmp, f"{size}.db"))
+        ctx = None
+        try:
+            dataset = DatasetGenerator(storage, spec).generate()
+            ctx = Context(app, storage, dataset["users"][0], cards)
+            results = {}
+            for name, setup in SCENARIOS.items():
+                results[name] = r = run_scenario(ctx, name, setup, repeat, budget)
+                memory = f"RSS +{r['rss_delta_mb']:6.1f} МБ" if "rss_delta_mb" in r else ""
+                print(f"  {name:<42} p50 {r['p50_ms']:9.1f} ms  p95 {r['p95_ms']:9.1f} ms  {memory}")
+        finally:
+            if ctx is not None:
+                ctx.garbage.append(ctx.mw)
+                ctx.dispose()
+            storage.close()
+    rows = {k: v for k, v in dataset.items() if k not in ("users", "seconds")}
+    return {"rows": rows, "cards": cards, "scenarios": results}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def previous_run(history_path):
+    if not os.path.exists(history_path):
+        return None
+    last = None
+    with open(history_path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                last = line
+    return json.loads(last) if last else None
+
+
+def print_changes(results, previous):
+    """Зміна p50 і пам'яті відносно попереднього запуску з історії."""
+    print(f"Порівняно з {previous.get('created')} ({previous.get('commit') or 'без коміту'}):")
+    for size, current in results["sizes"].items():
+        before = previous.get("sizes", {}).get(size, {}).get("scenarios", {})
+        for name, r in current["scenarios"].items():
+            old = before.get(name)
+            if not old:
+                continue
+            change = (r["p50_ms"] / old["p50_ms"] - 1) * 100 if old["p50_ms"] else 0
+            memory = ""
+            if "rss_delta_mb" in r and "rss_delta_mb" in old:
+                memory = f"  RSS {old['rss_delta_mb']:+.1f} -> {r['rss_delta_mb']:+.1f} МБ"
+            print(f"  {size}/{name:<42} {old['p50_ms']:9.1f} -> {r['p50_ms']:9.1f} ms ({change:+.0f}%){memory}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк побудови UI (offscreen)")
+    parser.add_argument("--sizes", default="small,medium", help="набори з src/datagen.SIZES через кому")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--budget", type=float, default=3.0, help="секунд на сценарій (але не менше 3 вимірів)")
+    parser.add_argument("--cards", type=int, default=500, help="скільки цілей додавати в список у add_cards")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--history", default=DEFAULT_HISTORY)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = {"created": datetime.now().isoformat(timespec="seconds"), "commit": git_commit(),
+               "python": platform.python_version(), "machine": platform.platform(),
+               "qpa": os.environ.get("QT_QPA_PLATFORM"), "sizes": {}}
+    for size in args.sizes.split(","):
+        print(f"{size}:")
+        results["sizes"][size] = run_size(app, size, SIZES[size], args.repeat, args.budget, args.cards)
+    results["peak_rss_mb"] = peak_rss_mb()
+
+    previous = previous_run(args.history)
+    for path in (args.output, args.history):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    with open(args.history, "a", encoding="utf-8") as f:
+        f.write(json.dumps(results, ensure_ascii=False) + "\n")
+    print(f"Результати: {args.output}, історія: {args.history}")
+    if previous:
+        print_changes(results, previous)
+
+
+if __name__ == "__main__":
+    main()
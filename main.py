@@ -8,6 +8,7 @@ from src.ui.auth import LoginWindow
 from src.ui.main_window import MainWindow
 from src.ui.sleep_mode import SleepWindow
 from src.logic.notification_service import NotificationService
+from src.logic.backup_service import BackupService
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(BASE_DIR, "data", "app.db")
@@ -23,6 +24,12 @@ class AppController:
                 self.app.setStyleSheet(f.read())
 
         self.storage = StorageService(DB_PATH)
+        # STORAGE_PROFILE=1 - профілювання сховища; звіт друкується при виході,
+        # виклики повільніші за STORAGE_SLOW_MS пишуться в data/storage_slow.log
+        if os.getenv("STORAGE_PROFILE"):
+            self.storage.enable_profiling(slow_ms=float(os.getenv("STORAGE_SLOW_MS", "50")),
+                                          log_path=os.path.join(BASE_DIR, "data", "storage_slow.log"))
+        self.backup_service = BackupService(self.storage)
         self.auth_service = AuthService(self.storage)
 
         self.login_window = None
@@ -46,12 +53,15 @@ class AppController:
         if self.notifier:
             self.notifier.stop()
 
-        self.notifier = NotificationService(self.storage, user_id)
+        self.notifier = NotificationService(self.storage, user_id, self.backup_service)
         self.notifier.start()
 
     def show_login(self):
         if self.main_window:
             self.main_window.close()
+            # Видаляємо явно, як і при переході в сон: інакше вікно прибере збирач сміття
+            # у довільний момент, можливо посеред порційної розкладки списку цілей
+            self.main_window.deleteLater()
             self.main_window = None
         if self.sleep_window:
             self.sleep_window.close()
@@ -130,7 +140,13 @@ class AppController:
         self.show_login()
 
     def run(self):
-        sys.exit(self.app.exec_())
+        exit_code = self.app.exec_()
+        if self.notifier:
+            self.notifier.stop()
+        if self.storage.profiler:
+            print(self.storage.profiler.report())
+        self.storage.close()
+        sys.exit(exit_code)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,63 @@
+"""
+Кеш читань StorageService з інвалідацією за таблицями.
+"""
+import threading
+from collections import OrderedDict
+
+
+class ReadCache:
+    """
+    Обмежений LRU-кеш результатів читання. Ключ - (назва читання, user_id, аргументи);
+    кожен запис пам'ятає таблиці, з яких прочитаний, і видаляється після commit запису в будь-яку з них.
+
+    Значення тут - незмінний оригінал: StorageService віддає викликачам його копії.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.enabled = max_entries > 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # ключ -> (таблиці, значення)
+        # Змінюється при кожній інвалідації: результат, прочитаний до неї, не кешується
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Повертає (знайдено, значення) і рахує попадання/промахи."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def put(self, key, tables, value, generation):
+        """Кешує value, якщо з моменту generation (початку читання) не було інвалідацій."""
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (frozenset(tables), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tables=None):
+        """Видаляє записи, що залежать від tables; без tables - увесь кеш."""
+        with self._lock:
+            self.generation += 1
+            self.invalidations += 1
+            if tables is None:
+                self._entries.clear()
+                return
+            tables = set(tables)
+            for key in [k for k, (deps, _) in self._entries.items() if deps & tables]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"enabled": self.enabled, "size": len(self._entries), "max_entries": self.max_entries,
+                    "hits": self.hits, "misses": self.misses, "invalidations": self.invalidations}
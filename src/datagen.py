@@ -0,0 +1,332 @@
+"""
+Відтворюваний генератор синтетичних даних (seed.py, бенчмарки).
+
+Однаковий DatasetSpec (разом із seed) і однакова дата today дають ту саму базу:
+всі випадкові значення, включно з id, беруться з random.Random(seed).
+Рядки пишуться напряму багаторядковими INSERT через executemany в одній транзакції;
+серії звичок рахуються під час генерації. Найдовше триває індексація пошуку (FTS5) цілей і підцілей.
+"""
+import hashlib
+import random
+import time
+from dataclasses import dataclass, replace
+from datetime import date, datetime, timedelta
+
+from .models import User, GoalPriority, GoalStatus, CourseType, CourseStatus
+
+VERBS = [
+    "Вивчити", "Зробити", "Написати", "Купити", "Відвідати", "Завершити",
+    "Підготувати", "Організувати", "Прочитати", "Переробити", "Проаналізувати",
+    "Створити", "Запустити", "Протестувати", "Оптимізувати"
+]
+
+NOUNS = [
+    "звіт", "проект", "курс Python", "статтю", "подарунок", "презентацію",
+    "документи", "квартиру", "сайт", "модуль", "дизайн",
+    "бюджет", "резюме", "портфоліо", "план тренувань"
+]
+
+CONTEXTS = [
+    "для роботи", "до дедлайну", "для замовника", "на вихідних",
+    "терміново", "для душі", "для саморозвитку", "разом з другом",
+    "для підвищення", "на завтра", "для курсової"
+]
+
+HABITS_LIST = [
+    "Пити воду (2л)", "Зарядка вранці", "Читання 30 хв", "Медитація",
+    "Коміт на GitHub", "Англійська (Duolingo)", "Не їсти цукор", "Лягати до 23:00",
+    "Планування дня", "Прогулянка 5км", "Вітаміни", "Прибирання столу",
+    "Дзвінок батькам", "Облік фінансів", "Без соцмереж перед сном"
+]
+
+CATEGORIES = [
+    ("Робота", "#3b82f6"), ("Здоров'я", "#ef4444"), ("Навчання", "#10b981"), ("Фінанси", "#f59e0b"),
+    ("Подорожі", "#8b5cf6"), ("Хобі", "#ec4899"), ("IT & Code", "#6366f1"), ("Побут", "#64748b")
+]
+
+TOPICS = ["GameDev 🎮", "Data Science 📊", "Digital Art 🎨", "Crypto 🪙", "Psychology 🧠", "Music 🎸", "Biohacking 🧬"]
+
+DEV_PREFIXES = ["Основи", "Просунутий курс", "Майстер-клас", "Книга по", "Проект:", "Лекція:"]
+DEV_SUFFIXES = ["для новачків", "PRO", "2025", "за 30 днів", "Part 1", "Ultimate Guide"]
+
+DEFAULT_PASSWORD = "123123"
+
+
+def hash_password(password: str) -> str:
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+@dataclass
+class DatasetSpec:
+    """Розмір синтетичної бази; кількості - на одного користувача."""
+    users: int = 1
+    goals_per_user: int = 100
+    subgoals_per_goal: tuple = (2, 6)  # мінімум і максимум
+    habits_per_user: int = 15
+    history_years: float = 0.2
+    # Частка днів історії, в які звичка виконана
+    habit_density: float = 0.7
+    courses_per_user: int = 25
+    seed: int = 42
+
+    def scaled(self, **changes):
+        return replace(self, **changes)
+
+
+# Набори для бенчмарків; large - 100 000 цілей і ~1 000 000 відміток звичок
+SIZES = {
+    "small": DatasetSpec(),
+    "medium": DatasetSpec(users=2, goals_per_user=5_000, habits_per_user=20, history_years=2, courses_per_user=200),
+    "large": DatasetSpec(users=10, goals_per_user=10_000, subgoals_per_goal=(0, 3), habits_per_user=40,
+                         history_years=10, courses_per_user=1_000),
+}
+
+
+class DatasetGenerator:
+    # Скільки рядків передавати в один executemany
+    BATCH = 10_000
+    # Кеш сторінок SQLite на час генерації, КіБ: випадкові id інакше постійно витісняють сторінки індексів
+    CACHE_KIB = 256 * 1024
+
+    def __init__(self, storage, spec: DatasetSpec = None, today: date = None, username="tester"):
+        """
+        username - ім'я першого користувача (решта - username2, username3, ...);
+        існуючий користувач з таким ім'ям доповнюється новими даними (категорії й теми з тими ж назвами
+        не дублюються). На порожній БД однакові параметри дають ідентичні дані.
+        """
+        self.storage = storage
+        self.spec = spec or DatasetSpec()
+        self.today = today or date.today()
+        self.username = username
+        self.rng = random.Random(self.spec.seed)
+        self.counts = {}
+        self.midnight = datetime.combine(self.today, datetime.min.time())
+        # Час змін для колонки updated_at: заданий явно, тригер не оновлює кожен рядок окремо
+        self.stamp = self.midnight.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+    def _id(self):
+        # Той самий вигляд, що й uuid4 у моделях, але з відтворюваного генератора (див. generate)
+        h = f"{self.ids.getrandbits(128):032x}"
+        return f"{h[:8]}-{h[8:12]}-4{h[13:16]}-{'89ab'[int(h[16], 16) & 3]}{h[17:20]}-{h[20:]}"
+
+    def _moment(self, days_ago):
+        """Момент у минулому (формат str(datetime), як у моделях)."""
+        return str(self.midnight - timedelta(days=days_ago, seconds=int(self.rng.random() * 86400)))
+
+    def _insert(self, c, table, columns, rows):
+        """
+        Вставляє рядки з генератора багаторядковими INSERT, по BATCH рядків в одному executemany.
+        Як і в import_user_data: FTS5 скидає буфер індексу пошуку після кожного оператора,
+        тож оператор на рядок робив би це для кожної цілі й підцілі.
+        Повертає кількість вставлених рядків.
+        """
+        per_statement = max(1, self.storage.MAX_SQL_PARAMS // len(columns))
+        head = f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+        row_sql = f"({', '.join('?' * len(columns))})"
+        sql = head + ", ".join([row_sql] * per_statement)
+        total = 0
+        batch = []
+        for row in rows:
+            batch.extend(row)
+            if len(batch) >= self.BATCH * len(columns):
+                total += self._flush(c, sql, batch, len(columns), per_statement, head, row_sql)
+                batch = []
+        total += self._flush(c, sql, batch, len(columns), per_statement, head, row_sql)
+        self.counts[table] = self.counts.get(table, 0) + total
+        return total
+
+    @staticmethod
+    def _flush(c, sql, values, width, per_statement, head, row_sql):
+        step = width * per_statement
+        full = len(values) // step * step
+        c.executemany(sql, (values[i:i + step] for i in range(0, full, step)))
+        if full < len(values):
+            c.execute(head + ", ".join([row_sql] * ((len(values) - full) // width)), values[full:])
+        return len(values) // width
+
+    def generate(self) -> dict:
+        """Заповнює БД; повертає {таблиця: кількість рядків, "users": [id], "seconds": ...}."""
+        started = time.perf_counter()
+        tables = ("categories", "goals", "subgoals", "habits", "habit_logs", "topics", "courses")
+        # id - з окремого генератора, зерно якого залежить і від уже наявних даних цих користувачів:
+        # повторний запуск на тій самій БД доповнює її, а не повторює ті самі id
+        self.ids = random.Random(f"{self.spec.seed}:{self._owned_rows()}")
+        user_ids = [self._user(i) for i in range(self.spec.users)]
+        conn = self.storage._connect()
+        cache_size = conn.execute("PRAGMA cache_size").fetchone()[0]
+        conn.execute(f"PRAGMA cache_size = -{self.CACHE_KIB}")
+        try:
+            with self.storage.transaction(*tables) as c:
+                for user_id in user_ids:
+                    categories = self._categories(c, user_id)
+                    goal_ids = self._goals(c, user_id, categories)
+                    self._subgoals(c, goal_ids)
+                    self._habits(c, user_id)
+                    self._courses(c, user_id, self._topics(c, user_id))
+        finally:
+            conn.execute(f"PRAGMA cache_size = {cache_size}")
+        return dict(self.counts, users=user_ids, seconds=time.perf_counter() - started)
+
+    def _username(self, i):
+        return self.username if i == 0 else f"{self.username}{i + 1}"
+
+    def _owned_rows(self):
+        """Скільки рядків уже належить користувачам набору (0 на порожній БД)."""
+        users = [self.storage.get_user_by_username(self._username(i)) for i in range(self.spec.users)]
+        ids = [u.id for u in users if u is not None]
+        if not ids:
+            return 0
+        marks = ", ".join("?" * len(ids))
+        c = self.storage._connect().cursor()
+        return sum(c.execute(f"SELECT COUNT(*) FROM {table} WHERE user_id IN ({marks})", ids).fetchone()[0]
+                   for table in ("categories", "goals", "habits", "topics", "courses"))
+
+    def _existing(self, c, table, user_id):
+        """{назва: id} категорій чи тем, які користувач уже має."""
+        c.execute(f"SELECT name, id FROM {table} WHERE user_id = ?", (user_id,))
+        return dict(c.fetchall())
+
+    def _user(self, i):
+        username = self._username(i)
+        user = self.storage.get_user_by_username(username)
+        if user is None:
+            user = User(username=username, password_hash=hash_password(DEFAULT_PASSWORD))
+            user.id = self._id()
+            user.created_at = self._moment(365 * self.spec.history_years)
+            self.storage.create_user(user)
+        return user.id
+
+    def _categories(self, c, user_id):
+        existing = self._existing(c, "categories", user_id)
+        rows = [(self._id(), user_id, name, color, self.stamp) for name, color in CATEGORIES if name not in existing]
+        self._insert(c, "categories", ("id", "user_id", "name", "color", "updated_at"), rows)
+        ids = {r[2]: r[0] for r in rows}
+        return [existing.get(name) or ids[name] for name, _ in CATEGORIES]
+
+    def _goals(self, c, user_id, categories):
+        rng = self.rng
+        priorities = [p.name for p in GoalPriority]
+        goal_ids = []
+
+        def rows():
+            for i in range(self.spec.goals_per_user):
+                title = f"{rng.choice(VERBS)} {rng.choice(NOUNS)}"
+                if rng.random() > 0.5:
+                    title += f" ({rng.choice(CONTEXTS)})"
+                days_offset = rng.randint(-60, 90)
+                if rng.random() < 0.1:
+                    deadline = None
+                else:
+                    deadline = (self.today + timedelta(days=days_offset)).isoformat()
+                    if rng.random() < 0.3:
+                        deadline += f" {rng.randrange(8, 22):02d}:{rng.choice((0, 15, 30, 45)):02d}"
+                if days_offset < -5:
+                    status = rng.choices([GoalStatus.MISSED, GoalStatus.COMPLETED], weights=[70, 30])[0]
+                elif days_offset < 0:
+                    status = rng.choices([GoalStatus.MISSED, GoalStatus.COMPLETED], weights=[40, 60])[0]
+                else:
+                    status = rng.choices([GoalStatus.PLANNED, GoalStatus.IN_PROGRESS], weights=[60, 40])[0]
+                goal_id = self._id()
+                goal_ids.append((goal_id, status == GoalStatus.COMPLETED))
+                category = rng.choice(categories) if rng.random() < 0.9 else None
+                yield (goal_id, user_id, title, f"Це автоматично згенерована ціль №{i + 1}...", deadline,
+                       rng.choices(priorities, weights=[20, 40, 30, 10])[0], status.name,
+                       self._moment(rng.randint(0, 30)), category, None, self.stamp)
+
+        self._insert(c, "goals", ("id", "user_id", "title", "description", "deadline", "priority", "status",
+                                  "created_at", "category_id", "link", "updated_at"), rows())
+        return goal_ids
+
+    def _subgoals(self, c, goal_ids):
+        rng = self.rng
+        low, high = self.spec.subgoals_per_goal
+
+        def rows():
+            for goal_id, done in goal_ids:
+                for j in range(rng.randint(low, high)):
+                    yield (self._id(), goal_id, f"Етап {j + 1}: {rng.choice(VERBS)} частину",
+                           1 if done or rng.random() < 0.5 else 0, "", self._moment(rng.randint(0, 30)), self.stamp)
+
+        self._insert(c, "subgoals", ("id", "goal_id", "title", "is_completed", "description", "created_at",
+                                     "updated_at"), rows())
+
+    def _habits(self, c, user_id):
+        rng = self.rng
+        days = int(365 * self.spec.history_years)
+        titles = {}
+        for i in range(self.spec.habits_per_user):
+            title = HABITS_LIST[i % len(HABITS_LIST)]
+            if i >= len(HABITS_LIST):
+                title += f" #{i // len(HABITS_LIST) + 1}"
+            titles[self._id()] = title
+        first_day = self.today - timedelta(days=days)
+        dates = [(first_day + timedelta(days=i)).isoformat() for i in range(days + 1)]
+        streaks = {}  # habit_id -> (остання дата, довжина останньої серії, рекорд)
+
+        def rows():
+            # У порядку первинного ключа (habit_id, date) - вставка дописує B-дерево, а не вставляє в середину
+            for habit_id in sorted(titles):
+                # Кожна звичка - своя регулярність і дата початку
+                density = min(1.0, max(0.05, rng.gauss(self.spec.habit_density, 0.15)))
+                start = rng.randint(0, days // 4) if days else 0
+                last, run, best = -2, 0, 0
+                for i in range(start, len(dates)):
+                    if rng.random() < density:
+                        run = run + 1 if last == i - 1 else 1
+                        best = max(best, run)
+                        last = i
+                        yield habit_id, dates[i], self.stamp
+                streaks[habit_id] = (dates[last] if last >= 0 else "", run, best)
+
+        self._insert(c, "habit_logs", ("habit_id", "date", "updated_at"), rows())
+        # Серії пораховані під час генерації - як у StorageService._write_streak, але відносно self.today
+        yesterday = (self.today - timedelta(days=1)).isoformat()
+        habits = []
+        for habit_id, title in titles.items():
+            last_date, run, best = streaks[habit_id]
+            streak = run if last_date and last_date >= yesterday else 0
+            habits.append((habit_id, user_id, title, streak, last_date, run, best, self.stamp))
+        self._insert(c, "habits", ("id", "user_id", "title", "streak", "last_completed_date", "run_length",
+                                   "best_streak", "updated_at"), habits)
+
+    def _topics(self, c, user_id):
+        existing = self._existing(c, "topics", user_id)
+        rows = [(self._id(), user_id, name, self.stamp) for name in TOPICS if name not in existing]
+        self._insert(c, "topics", ("id", "user_id", "name", "updated_at"), rows)
+        ids = {r[2]: r[0] for r in rows}
+        return [(existing.get(name) or ids[name], user_id, name, self.stamp) for name in TOPICS]
+
+    def _courses(self, c, user_id, topics):
+        rng = self.rng
+        types = list(CourseType)
+
+        def rows():
+            for i in range(self.spec.courses_per_user):
+                topic_id, _, topic_name, _ = rng.choice(topics)
+                title = f"{rng.choice(DEV_PREFIXES)} {topic_name.split()[0]} {rng.choice(DEV_SUFFIXES)}"
+                course_type = rng.choice(types)
+                if course_type == CourseType.BOOK:
+                    total = rng.randint(200, 800)
+                elif course_type == CourseType.PROJECT:
+                    total = 100
+                else:
+                    total = rng.randint(10, 100)
+                r = rng.random()
+                completed = 0 if r < 0.1 else total if r > 0.9 else rng.randint(0, total)
+                if completed == 0:
+                    status = CourseStatus.PLANNED
+                elif completed == total:
+                    status = CourseStatus.COMPLETED
+                else:
+                    status = CourseStatus.IN_PROGRESS
+                yield (self._id(), user_id, title, course_type.name, status.name, total, completed, None,
+                       f"Автоматично згенерований матеріал №{i + 1}", self._moment(rng.randint(0, 60)), topic_id,
+                       self.stamp)
+
+        self._insert(c, "courses", ("id", "user_id", "title", "type", "status", "total_units", "completed_units",
+                                    "link", "description", "created_at", "topic_id", "updated_at"), rows())
+
+
+def generate_dataset(storage, spec: DatasetSpec = None, **kwargs) -> dict:
+    """Скорочення для DatasetGenerator(storage, spec, ...).generate()."""
+    return DatasetGenerator(storage, spec, **kwargs).generate()
@@ -1,10 +1,20 @@
-import google.generativeai as genai
 import json
 import re
 from datetime import datetime
 from src.config import Config
 from src.models import GoalPriority
 
+# Gemini SDK важкий (~1 с імпорту) - вантажиться при створенні першого AIService, а не на старті програми
+genai = None
+
+
+def _load_genai():
+    global genai
+    if genai is None:
+        import google.generativeai
+        genai = google.generativeai
+    return genai
+
 
 class AIService:
     def __init__(self):
@@ -12,10 +22,11 @@ class AIService:
             print("Warning: API Key not found. AI features might fail.")
             pass
 
+        sdk = _load_genai()
         try:
-            genai.configure(api_key=Config.GEMINI_API_KEY)
+            sdk.configure(api_key=Config.GEMINI_API_KEY)
             # 5. Використовуємо gemini-2.5-flash
-            self.model = genai.GenerativeModel('gemini-2.5-flash')
+            self.model = sdk.GenerativeModel('gemini-2.5-flash')
         except Exception as e:
             print(f"Failed to configure AI: {e}")
 
@@ -0,0 +1,144 @@
+import os
+import json
+import gzip
+import hashlib
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+from ..migrations import SCHEMA_VERSION, get_schema_version, migrate
+
+
+class BackupService:
+    """
+    Гарячі резервні копії всієї БД через SQLite online backup API.
+
+    Кожна копія - пара файлів у backup_dir:
+        app-<час>.db.gz   - стиснутий знімок БД
+        app-<час>.json    - маніфест (версія схеми, кількість рядків, sha256 знімка)
+    Зберігаються лише keep найновіших копій.
+    """
+    PREFIX = "app-"
+    CHUNK = 1024 * 1024
+
+    def __init__(self, storage, backup_dir=None, keep=7):
+        self.storage = storage
+        self.backup_dir = backup_dir or os.path.join(os.path.dirname(storage.db_path) or ".", "backups")
+        self.keep = keep
+
+    def create_backup(self) -> dict:
+        """Знімає консистентний знімок працюючої БД, стискає його і повертає маніфест."""
+        started = time.perf_counter()
+        os.makedirs(self.backup_dir, exist_ok=True)
+        name = self.PREFIX + datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        archive_path = os.path.join(self.backup_dir, name + ".db.gz")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            snapshot_path = os.path.join(tmp, "snapshot.db")
+            snapshot = sqlite3.connect(snapshot_path)
+            try:
+                # Копія за один крок - знімок однієї транзакції читання
+                self.storage._connect().backup(snapshot)
+                # Знімок без WAL, щоб увесь вміст був в одному файлі
+                snapshot.execute("PRAGMA journal_mode=DELETE")
+                schema_version = get_schema_version(snapshot)
+                row_counts = self._row_counts(snapshot)
+            finally:
+                snapshot.close()
+
+            digest = hashlib.sha256()
+            with open(snapshot_path, 'rb') as src, gzip.open(archive_path + ".part", 'wb', compresslevel=6) as dst:
+                for chunk in iter(lambda: src.read(self.CHUNK), b""):
+                    digest.update(chunk)
+                    dst.write(chunk)
+            size = os.path.getsize(snapshot_path)
+        os.replace(archive_path + ".part", archive_path)
+
+        manifest = {
+            "name": name,
+            "file": os.path.basename(archive_path),
+            "created_at": datetime.now().isoformat(),
+            "schema_version": schema_version,
+            "row_counts": row_counts,
+            "sha256": digest.hexdigest(),
+            "size": size,
+            "compressed_size": os.path.getsize(archive_path),
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        with open(os.path.join(self.backup_dir, name + ".json"), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=4)
+
+        self.rotate()
+        return manifest
+
+    def _row_counts(self, conn) -> dict:
+        tables = [r[0] for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+        return {t: conn.execute(f'SELECT COUNT(*) FROM "{t}"').fetchone()[0] for t in tables}
+
+    def list_backups(self) -> list:
+        """Маніфести наявних копій, від найновішої."""
+        if not os.path.isdir(self.backup_dir):
+            return []
+        manifests = []
+        for file_name in sorted(os.listdir(self.backup_dir), reverse=True):
+            if file_name.startswith(self.PREFIX) and file_name.endswith(".json"):
+                try:
+                    with open(os.path.join(self.backup_dir, file_name), 'r', encoding='utf-8') as f:
+                        manifests.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return manifests
+
+    def rotate(self):
+        """Видаляє всі копії, крім keep найновіших."""
+        for manifest in self.list_backups()[self.keep:]:
+            for file_name in (manifest["file"], manifest["name"] + ".json"):
+                path = os.path.join(self.backup_dir, file_name)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def backup_if_due(self, max_age=timedelta(days=1)):
+        """Створює копію, якщо остання старша за max_age. Повертає маніфест або None."""
+        backups = self.list_backups()
+        if backups and datetime.now() - datetime.fromisoformat(backups[0]["created_at"]) < max_age:
+            return None
+        return self.create_backup()
+
+    def restore_backup(self, name: str) -> dict:
+        """
+        Відновлює БД з копії name поверх робочої (через той самий backup API).
+        Перед записом перевіряє контрольну суму та версію схеми; старіші знімки
+        після відновлення доводяться до поточної схеми міграціями.
+        """
+        with open(os.path.join(self.backup_dir, name + ".json"), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            snapshot_path = os.path.join(tmp, "restore.db")
+            digest = hashlib.sha256()
+            with gzip.open(os.path.join(self.backup_dir, manifest["file"]), 'rb') as src, \
+                    open(snapshot_path, 'wb') as dst:
+                for chunk in iter(lambda: src.read(self.CHUNK), b""):
+                    digest.update(chunk)
+                    dst.write(chunk)
+            if digest.hexdigest() != manifest["sha256"]:
+                raise ValueError(f"Копія {name} пошкоджена: контрольна сума не збігається")
+
+            snapshot = sqlite3.connect(snapshot_path)
+            try:
+                version = get_schema_version(snapshot)
+                if version > SCHEMA_VERSION:
+                    raise RuntimeError(
+                        f"Схема копії (v{version}) новіша за підтримувану програмою (v{SCHEMA_VERSION})")
+                if snapshot.execute("PRAGMA quick_check").fetchone()[0] != "ok":
+                    raise ValueError(f"Копія {name} пошкоджена: перевірка цілісності не пройдена")
+                conn = self.storage._connect()
+                snapshot.backup(conn)
+            finally:
+                snapshot.close()
+
+        migrate(conn)
+        # Дані змінено в обхід transaction(): кеш читань і вкладки UI застаріли
+        self.storage.data_replaced()
+        return manifest
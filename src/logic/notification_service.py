@@ -3,17 +3,32 @@ from plyer import notification
 from datetime import datetime, timedelta
 import os
 
+from ..models import GoalStatus
+
+# Незавершені цілі
+OPEN_STATUSES = [s for s in GoalStatus if s != GoalStatus.COMPLETED]
+
 
 class NotificationService:
-    def __init__(self, storage, user_id):
+    def __init__(self, storage, user_id, backup_service=None):
         self.storage = storage
         self.user_id = user_id
+        self.backup_service = backup_service
         self.scheduler = BackgroundScheduler()
         self.notified_goals = set()
 
     def start(self):
         if not self.scheduler.running:
             self.scheduler.add_job(self.check_deadlines, 'interval', minutes=1)
+            # Перерахунок серій звичок опівночі за місцевим часом
+            self.scheduler.add_job(self.refresh_streaks, 'cron', hour=0, minute=0,
+                                   id='streak_rollover', coalesce=True, misfire_grace_time=3600)
+            # І одразу при старті - програма могла бути закрита опівночі
+            self.scheduler.add_job(self.refresh_streaks, id='streak_catchup')
+            if self.backup_service:
+                # Щогодини перевіряємо, чи настав час добової резервної копії
+                self.scheduler.add_job(self.run_backup, 'interval', hours=1, id='auto_backup',
+                                       next_run_time=datetime.now(), coalesce=True)
             self.scheduler.start()
 
     def stop(self):
@@ -21,30 +36,36 @@ class NotificationService:
             self.scheduler.shutdown()
 
     def check_deadlines(self):
-        goals = self.storage.get_goals(self.user_id)
-        now = datetime.now()
+        now = datetime.now().replace(microsecond=0)
+        # Дедлайни в найближчі 10 хвилин - діапазонний запит за індексом deadline_ts.
+        # Дедлайн на весь день настає о 23:59, як і в решті програми
+        goals = self.storage.get_goals(self.user_id, statuses=OPEN_STATUSES,
+                                       deadline_from=now + timedelta(seconds=1),
+                                       deadline_to=now + timedelta(minutes=10))
 
         for g in goals:
-            if not g.deadline or g.status.name == "COMPLETED":
-                continue
-
-            try:
-                if len(g.deadline) == 10:
-                    deadline_dt = datetime.strptime(g.deadline, "%Y-%m-%d")
-                    deadline_dt = deadline_dt.replace(hour=9, minute=0)
-                else:
-                    deadline_dt = datetime.strptime(g.deadline, "%Y-%m-%d %H:%M")
-
-                diff = deadline_dt - now
+            # Ще не нагадували
+            if g.id not in self.notified_goals:
+                self.send_windows_notification(g.title)
+                self.notified_goals.add(g.id)
 
-                # Якщо залишилось менше 10 хвилин (і ми ще не нагадували)
-                if 0 < diff.total_seconds() <= 600:
-                    if g.id not in self.notified_goals:
-                        self.send_windows_notification(g.title)
-                        self.notified_goals.add(g.id)
+    def refresh_streaks(self):
+        try:
+            result = self.storage.recalc_all_streaks()
+            print(f"Streaks refreshed: {result['habits']} habits in {result['seconds'] * 1000:.1f} ms")
+            return result
+        except Exception as e:
+            print(f"Streak refresh error: {e}")
 
-            except ValueError:
-                continue
+    def run_backup(self):
+        try:
+            manifest = self.backup_service.backup_if_due()
+            if manifest:
+                print(f"Backup created: {manifest['file']} ({manifest['compressed_size'] // 1024} KB "
+                      f"in {manifest['seconds'] * 1000:.0f} ms)")
+            return manifest
+        except Exception as e:
+            print(f"Backup error: {e}")
 
     def send_windows_notification(self, title):
         try:
@@ -0,0 +1,355 @@
+"""
+Версіоновані міграції схеми БД.
+
+Поточна версія схеми зберігається у PRAGMA user_version. Кожна міграція
+виконується один раз, у власній транзакції, строго за порядком у MIGRATIONS.
+Нові зміни схеми додаються ТІЛЬКИ в кінець списку.
+"""
+import re
+
+
+def _add_column(c, table, column, decl):
+    """ALTER TABLE ADD COLUMN, якщо колонки ще немає."""
+    c.execute(f"PRAGMA table_info({table})")
+    if column not in {r[1] for r in c.fetchall()}:
+        c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+def _m001_base_schema(c):
+    """Базові таблиці (ідемпотентно для баз, створених до появи міграцій)."""
+    c.execute('''CREATE TABLE IF NOT EXISTS users (
+        id TEXT PRIMARY KEY, username TEXT, password_hash TEXT,
+        total_completed_goals INTEGER, avatar_path TEXT, created_at TEXT
+    )''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS categories (
+        id TEXT PRIMARY KEY, user_id TEXT, name TEXT, color TEXT
+    )''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS goals (
+        id TEXT PRIMARY KEY, user_id TEXT, title TEXT, description TEXT,
+        deadline TEXT, priority TEXT, status TEXT, created_at TEXT, category_id TEXT, link TEXT
+    )''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS subgoals (
+        id TEXT PRIMARY KEY, goal_id TEXT, title TEXT, is_completed INTEGER, description TEXT, created_at TEXT
+    )''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS habits (
+        id TEXT PRIMARY KEY, user_id TEXT, title TEXT, streak INTEGER, last_completed_date TEXT
+    )''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS habit_logs (
+        habit_id TEXT, date TEXT,
+        PRIMARY KEY (habit_id, date)
+    )''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS topics (
+        id TEXT PRIMARY KEY, user_id TEXT, name TEXT
+    )''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS courses (
+        id TEXT PRIMARY KEY, user_id TEXT, title TEXT, type TEXT,
+        status TEXT, total_units INTEGER, completed_units INTEGER,
+        link TEXT, description TEXT, created_at TEXT, topic_id TEXT
+    )''')
+
+    # Старі бази могли не мати topic_id
+    _add_column(c, "courses", "topic_id", "TEXT")
+
+
+def _m002_secondary_indexes(c):
+    """Індекси на всі зовнішні ключі та колонки фільтрації."""
+    # habit_logs(habit_id, ...) вже покривається первинним ключем
+    c.execute("CREATE INDEX IF NOT EXISTS idx_users_username ON users(username)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_categories_user ON categories(user_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_goals_user_deadline ON goals(user_id, deadline)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_goals_user_created ON goals(user_id, created_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_goals_category ON goals(category_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_subgoals_goal ON subgoals(goal_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_habits_user ON habits(user_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_habit_logs_date ON habit_logs(date)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_topics_user ON topics(user_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_courses_user_created ON courses(user_id, created_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_courses_topic ON courses(topic_id)")
+
+
+def _m003_habit_streak_state(c):
+    """Стан для інкрементального підрахунку серій: довжина останньої серії та рекорд."""
+    _add_column(c, "habits", "run_length", "INTEGER DEFAULT 0")
+    _add_column(c, "habits", "best_streak", "INTEGER DEFAULT 0")
+    # Заповнюємо з наявних логів: серії = групи днів з однаковим (дата - номер рядка)
+    c.execute('''WITH runs AS (
+                     SELECT habit_id, MAX(date) AS end_date, COUNT(*) AS len FROM (
+                         SELECT habit_id, date,
+                                julianday(date) - ROW_NUMBER() OVER (PARTITION BY habit_id ORDER BY date) AS grp
+                         FROM habit_logs)
+                     GROUP BY habit_id, grp)
+                 UPDATE habits SET
+                     best_streak = COALESCE((SELECT MAX(len) FROM runs WHERE runs.habit_id = habits.id), 0),
+                     run_length = COALESCE((SELECT len FROM runs WHERE runs.habit_id = habits.id
+                                            ORDER BY end_date DESC LIMIT 1), 0)''')
+
+
+def _m004_habit_log_bitmaps(c):
+    """
+    Компактне зберігання старих відміток: один BLOB на звичку і рік
+    (біт i = день року i, рахуючи від 1 січня з нуля; молодший біт байта - перший).
+    Представлення habit_log_days повертає відмітки з обох сховищ.
+    """
+    c.execute('''CREATE TABLE IF NOT EXISTS habit_log_bitmaps (
+        habit_id TEXT, year INTEGER, bits BLOB,
+        PRIMARY KEY (habit_id, year)
+    )''')
+    # hex() дає два символи на байт, старший півбайт першим
+    c.execute('''CREATE VIEW IF NOT EXISTS habit_log_days AS
+        WITH RECURSIVE doy(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM doy WHERE i < 365)
+        SELECT habit_id, date FROM habit_logs
+        UNION ALL
+        SELECT b.habit_id, date(printf('%04d-01-01', b.year), '+' || doy.i || ' days')
+        FROM habit_log_bitmaps b JOIN doy
+        WHERE ((instr('0123456789ABCDEF',
+                      substr(hex(b.bits), (doy.i / 8) * 2 + CASE WHEN doy.i % 8 >= 4 THEN 1 ELSE 2 END, 1)) - 1)
+               >> (doy.i % 4)) & 1''')
+
+
+# Час зміни у UTC з мілісекундами: рядки порівнюються лексикографічно
+NOW_SQL = "strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+
+# Сутності з відстеженням змін: таблиця -> (ключ рядка, день для habit_logs, власник)
+TRACKED_TABLES = {
+    "categories": ("OLD.id", "''", "OLD.user_id"),
+    "topics": ("OLD.id", "''", "OLD.user_id"),
+    "goals": ("OLD.id", "''", "OLD.user_id"),
+    "subgoals": ("OLD.id", "''", "(SELECT user_id FROM goals WHERE id = OLD.goal_id)"),
+    "habits": ("OLD.id", "''", "OLD.user_id"),
+    "habit_logs": ("OLD.habit_id", "OLD.date", "(SELECT user_id FROM habits WHERE id = OLD.habit_id)"),
+    "courses": ("OLD.id", "''", "OLD.user_id"),
+}
+
+
+def _m005_change_tracking(c):
+    """
+    updated_at на кожній сутності та журнал видалень (tombstones) для дельта-експорту.
+    Тригери ставлять updated_at, лише якщо запис не передав його сам (імпорт зберігає час джерела).
+    Видалення дочірніх рядків разом з батьківським (цілі, звички) не журналюються:
+    власника вже немає, а видалення батька каскадно застосовується при імпорті.
+    """
+    c.execute('''CREATE TABLE IF NOT EXISTS deleted_rows (
+        table_name TEXT, row_id TEXT, row_date TEXT DEFAULT '', user_id TEXT, deleted_at TEXT,
+        PRIMARY KEY (table_name, row_id, row_date)
+    )''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_deleted_rows_user ON deleted_rows(user_id, deleted_at)")
+
+    for table, (row_id, row_date, owner) in TRACKED_TABLES.items():
+        _add_column(c, table, "updated_at", "TEXT")
+        c.execute(f"UPDATE {table} SET updated_at = {NOW_SQL} WHERE updated_at IS NULL")
+        if table == "habit_logs":
+            key = "habit_id = NEW.habit_id AND date = NEW.date"
+        else:
+            key = "id = NEW.id"
+
+        c.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_insert_stamp AFTER INSERT ON {table}
+                     WHEN NEW.updated_at IS NULL
+                     BEGIN UPDATE {table} SET updated_at = {NOW_SQL} WHERE {key}; END''')
+        c.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_update_stamp AFTER UPDATE ON {table}
+                     WHEN NEW.updated_at IS OLD.updated_at
+                     BEGIN UPDATE {table} SET updated_at = {NOW_SQL} WHERE {key}; END''')
+        c.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_delete_tombstone AFTER DELETE ON {table}
+                     WHEN {owner} IS NOT NULL
+                     BEGIN
+                         INSERT OR REPLACE INTO deleted_rows (table_name, row_id, row_date, user_id, deleted_at)
+                         VALUES ('{table}', {row_id}, {row_date}, {owner}, {NOW_SQL});
+                     END''')
+
+
+def _m006_keyset_indexes(c):
+    """
+    Індекси під сортування за замовчуванням у get_goals_page/get_courses_page:
+    вираз і порядок колонок збігаються з ORDER BY, тож сторінка читається без сортування в пам'яті.
+    Замінюють індекси (user_id, created_at) з _m002.
+    """
+    c.execute("DROP INDEX IF EXISTS idx_goals_user_created")
+    c.execute("DROP INDEX IF EXISTS idx_courses_user_created")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_goals_user_created_id ON goals(user_id, COALESCE(created_at, ''), id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_courses_user_created_id "
+              "ON courses(user_id, COALESCE(created_at, ''), id)")
+
+
+# Сутності в повнотекстовому індексі: таблиця -> (вид, заголовок, текст, ціль-власник, користувач);
+# {r} - NEW, OLD або псевдонім рядка таблиці
+SEARCH_SOURCES = {
+    "goals": ("goal", "{r}.title", "{r}.description", "{r}.id", "{r}.user_id"),
+    "subgoals": ("subgoal", "{r}.title", "{r}.description", "{r}.goal_id",
+                 "(SELECT user_id FROM goals WHERE id = {r}.goal_id)"),
+    "habits": ("habit", "{r}.title", "''", "{r}.id", "{r}.user_id"),
+    "courses": ("course", "{r}.title", "{r}.description", "{r}.id", "{r}.user_id"),
+}
+
+
+def _m007_search_index(c):
+    """
+    Повнотекстовий пошук FTS5. search_docs зіставляє документ (вид, id) зі стабільним
+    rowid індексу (INTEGER PRIMARY KEY не змінюється після VACUUM), тож тригери
+    оновлюють і видаляють документ за rowid, а не скануванням індексу.
+    unicode61 без remove_diacritics: регістр кирилиці знімається, а й/ї лишаються окремими літерами.
+    """
+    c.execute('''CREATE TABLE IF NOT EXISTS search_docs (
+        id INTEGER PRIMARY KEY, kind TEXT, item_id TEXT, owner_id TEXT, user_id TEXT,
+        UNIQUE (kind, item_id)
+    )''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_search_docs_user ON search_docs(user_id)")
+    c.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+        title, body, tokenize = "unicode61 remove_diacritics 0", prefix = '2 3'
+    )''')
+    # Збіг у заголовку важить більше, ніж в описі
+    c.execute("INSERT INTO search_index (search_index, rank) VALUES ('rank', 'bm25(10.0, 1.0)')")
+
+    for table, (kind, title, body, owner, user) in SEARCH_SOURCES.items():
+        doc = "(SELECT id FROM search_docs WHERE kind = '%s' AND item_id = {r}.id)" % kind
+        # INSERT OR REPLACE не викликає тригер видалення, тож вставка спершу прибирає старий документ
+        index_new = f'''
+            DELETE FROM search_index WHERE rowid = {doc.format(r="NEW")};
+            DELETE FROM search_docs WHERE kind = '{kind}' AND item_id = NEW.id;
+            INSERT INTO search_docs (kind, item_id, owner_id, user_id)
+            VALUES ('{kind}', NEW.id, {owner.format(r="NEW")}, {user.format(r="NEW")});
+            INSERT INTO search_index (rowid, title, body)
+            VALUES (last_insert_rowid(), COALESCE({title.format(r="NEW")}, ''), COALESCE({body.format(r="NEW")}, ''));'''
+        changed = " OR ".join(f"{e.format(r='NEW')} IS NOT {e.format(r='OLD')}" for e in (title, body) if e != "''")
+
+        c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{table}_search_insert AFTER INSERT ON {table} "
+                  f"BEGIN {index_new} END")
+        c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{table}_search_update AFTER UPDATE ON {table} "
+                  f"WHEN {changed} BEGIN {index_new} END")
+        c.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_search_delete AFTER DELETE ON {table}
+                     BEGIN
+                         DELETE FROM search_index WHERE rowid = {doc.format(r="OLD")};
+                         DELETE FROM search_docs WHERE kind = '{kind}' AND item_id = OLD.id;
+                     END''')
+
+        c.execute(f'''INSERT OR IGNORE INTO search_docs (kind, item_id, owner_id, user_id)
+                     SELECT '{kind}', r.id, {owner.format(r="r")}, {user.format(r="r")} FROM {table} r''')
+        c.execute(f'''INSERT INTO search_index (rowid, title, body)
+                     SELECT d.id, COALESCE({title.format(r="r")}, ''), COALESCE({body.format(r="r")}, '')
+                     FROM {table} r JOIN search_docs d ON d.kind = '{kind}' AND d.item_id = r.id''')
+
+
+# Виміри агрегатів статистики: таблиця -> [(вимір, ключ, сума)]; {r} - NEW, OLD або псевдонім рядка.
+# Ключ NULL чи '' - значення відсутнє (ціль без категорії чи дедлайну, курс без обсягу)
+STATS_SOURCES = {
+    "goals": [
+        ("goal_status", "{r}.status", "0"),
+        ("goal_priority", "{r}.priority", "0"),
+        ("goal_category", "{r}.category_id", "0"),
+        ("goal_deadline_month", "CASE WHEN {r}.deadline GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-*' "
+                                "THEN substr({r}.deadline, 1, 7) ELSE '' END", "0"),
+    ],
+    "courses": [
+        ("course_status", "{r}.status", "0"),
+        ("course_type", "{r}.type", "0"),
+        ("course_topic", "{r}.topic_id", "0"),
+        # Сума часток пройденого по курсах з обсягом - для середнього прогресу
+        ("course_progress", "CASE WHEN {r}.total_units > 0 THEN 'rated' ELSE '' END",
+         "CASE WHEN {r}.total_units > 0 THEN CAST({r}.completed_units AS REAL) / {r}.total_units ELSE 0 END"),
+    ],
+}
+
+
+def _m008_stats_counts(c):
+    """
+    Матеріалізовані агрегати для вкладки статистики: кількість рядків (n) і сума (amount)
+    на користувача, вимір і ключ. Тригери додають +1 для NEW і -1 для OLD одним upsert;
+    рядки з n = 0 лишаються і відкидаються при читанні.
+    Розраховано на upsert (ON CONFLICT DO UPDATE): INSERT OR REPLACE не викликає тригер видалення.
+    """
+    c.execute('''CREATE TABLE IF NOT EXISTS stats_counts (
+        user_id TEXT NOT NULL, dimension TEXT NOT NULL, key TEXT NOT NULL,
+        n INTEGER NOT NULL DEFAULT 0, amount REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, dimension, key)
+    ) WITHOUT ROWID''')
+    upsert = (" ON CONFLICT (user_id, dimension, key) "
+              "DO UPDATE SET n = n + excluded.n, amount = amount + excluded.amount")
+
+    for table, dims in STATS_SOURCES.items():
+        def values(r, sign):
+            return ", ".join(f"({r}.user_id, '{dim}', COALESCE({key.format(r=r)}, ''), "
+                             f"{sign}1, {sign}({amount.format(r=r)}))" for dim, key, amount in dims)
+
+        insert = "INSERT INTO stats_counts (user_id, dimension, key, n, amount) VALUES "
+        columns = sorted({"user_id"} | {col for _, key, amount in dims
+                                        for col in re.findall(r"\{r\}\.(\w+)", f"{key} {amount}")})
+        c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{table}_stats_insert AFTER INSERT ON {table} "
+                  f"WHEN NEW.user_id IS NOT NULL BEGIN {insert}{values('NEW', '+')}{upsert}; END")
+        c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{table}_stats_delete AFTER DELETE ON {table} "
+                  f"WHEN OLD.user_id IS NOT NULL BEGIN {insert}{values('OLD', '-')}{upsert}; END")
+        # Лише коли змінилась колонка, від якої залежить хоч один вимір
+        changed = " OR ".join(f"NEW.{col} IS NOT OLD.{col}" for col in columns)
+        c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{table}_stats_update AFTER UPDATE OF {', '.join(columns)} "
+                  f"ON {table} WHEN NEW.user_id IS NOT NULL AND OLD.user_id IS NOT NULL AND ({changed}) BEGIN "
+                  f"{insert}{values('OLD', '-')}{upsert}; {insert}{values('NEW', '+')}{upsert}; END")
+
+        for dim, key, amount in dims:
+            c.execute(f'''INSERT INTO stats_counts (user_id, dimension, key, n, amount)
+                         SELECT r.user_id, '{dim}', COALESCE({key.format(r="r")}, ''),
+                                COUNT(*), TOTAL({amount.format(r="r")})
+                         FROM {table} r WHERE r.user_id IS NOT NULL GROUP BY 1, 3''')
+
+
+# Момент дедлайну: секунди від 1970-01-01 за настінним (місцевим) часом, без часового поясу.
+# Дедлайн без часу - "весь день", тобто до 23:59; рядок не у форматі 'YYYY-MM-DD[ HH:MM]' - NULL
+DEADLINE_TS_SQL = ("CAST(strftime('%s', CASE WHEN length(deadline) = 10 THEN deadline || ' 23:59' "
+                   "ELSE deadline END) AS INTEGER)")
+
+
+def _m009_deadline_timestamp(c):
+    """
+    deadline_ts і deadline_all_day - генеровані з deadline колонки: їх не треба підтримувати
+    ні в save_goal, ні в імпорті, ні тригерами. Значення обчислюються один раз - при записі в індекс,
+    тож діапазонні запити за часом дедлайну не розбирають рядки. Замінює індекс (user_id, deadline) з _m002.
+    """
+    _add_column(c, "goals", "deadline_ts", f"INTEGER GENERATED ALWAYS AS ({DEADLINE_TS_SQL}) VIRTUAL")
+    _add_column(c, "goals", "deadline_all_day",
+                "INTEGER GENERATED ALWAYS AS (deadline IS NOT NULL AND length(deadline) = 10) VIRTUAL")
+    c.execute("DROP INDEX IF EXISTS idx_goals_user_deadline")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_goals_user_deadline_ts ON goals(user_id, deadline_ts)")
+
+
+# Порядок важливий: міграція MIGRATIONS[i] переводить схему з версії i до i + 1
+MIGRATIONS = [
+    _m001_base_schema,
+    _m002_secondary_indexes,
+    _m003_habit_streak_state,
+    _m004_habit_log_bitmaps,
+    _m005_change_tracking,
+    _m006_keyset_indexes,
+    _m007_search_index,
+    _m008_stats_counts,
+    _m009_deadline_timestamp,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn) -> int:
+    """Застосовує всі невиконані міграції. Повертає кінцеву версію схеми."""
+    version = get_schema_version(conn)
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Схема БД (v{version}) новіша за підтримувану програмою (v{SCHEMA_VERSION})")
+
+    for target in range(version + 1, SCHEMA_VERSION + 1):
+        c = conn.cursor()
+        try:
+            c.execute("BEGIN")
+            MIGRATIONS[target - 1](c)
+            # PRAGMA не підтримує параметри, версія - це завжди ціле число
+            c.execute(f"PRAGMA user_version = {int(target)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return get_schema_version(conn)
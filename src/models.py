@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import datetime, timedelta
 from enum import Enum
 import uuid
 
@@ -66,6 +66,16 @@ class LearningGoal:
     link: str = ""
     created_at: datetime = field(default_factory=datetime.now)
     id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    # Обчислюються БД з deadline (колонки deadline_ts, deadline_all_day); при збереженні ігноруються
+    deadline_ts: int = None
+    all_day: bool = False
+
+    @property
+    def due_at(self):
+        """Момент дедлайну (настінний час) або None; дедлайн на весь день - о 23:59."""
+        if self.deadline_ts is None:
+            return None
+        return datetime(1970, 1, 1) + timedelta(seconds=self.deadline_ts)
 
 @dataclass
 class SubGoal:
@@ -82,6 +92,7 @@ class Habit:
     user_id: str
     streak: int = 0
     last_completed_date: str = ""
+    best_streak: int = 0
     id: str = field(default_factory=lambda: str(uuid.uuid4()))
 
 @dataclass
@@ -97,4 +108,18 @@ class Course:
     # Зберігаємо id теми
     topic_id: str = ""
     created_at: datetime = field(default_factory=datetime.now)
-    id: str = field(default_factory=lambda: str(uuid.uuid4()))
\ No newline at end of file
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    """Подія зміни даних StorageService: сутність (таблиця), операція і змінені id (None - невідомо які)."""
+    entity: str
+    op: str = "save"
+    ids: frozenset = None
+
+    def touches(self, entities) -> bool:
+        return self.entity == "*" or self.entity in entities
+
+
+# Змінилось усе (імпорт, відновлення з копії)
+ChangeEvent.RELOAD = ChangeEvent("*", "reload")
@@ -0,0 +1,312 @@
+"""
+Профілювання StorageService (вмикається явно: StorageService.enable_profiling або змінна STORAGE_PROFILE).
+
+Публічні методи сервісу обгортаються таймером, а кожне з'єднання отримує trace-callback
+(текст кожного SQL-запиту) і progress-handler (кроки віртуальної машини SQLite).
+Запити приписуються найглибшому методу, що виконується в цьому потоці, тож видно,
+скільки запитів робить один виклик (N+1) і які саме. Внутрішні запити SQLite (FTS5 до своїх
+таблиць, текст починається з "--") рахуються окремо як nested, а повтор тексту того самого
+оператора (sqlite3 повідомляє його знову на кожне спрацювання тригера) - не рахується.
+Повільні виклики пишуться в журнал з ротацією разом з їхніми SQL - нормалізованими, без значень
+(у запитах бувають хеші паролів та інші дані користувача).
+scope("екран") підписує всі запити блоку, щоб порівняти екрани між собою.
+"""
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from bisect import bisect_left
+from collections import Counter
+from functools import wraps
+from logging.handlers import RotatingFileHandler
+
+# Рядкові та числові літерали в тексті запиту -> ?, щоб однакові запити з різними значеннями збігались
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PARAM_LISTS = re.compile(r"\?(?:\s*,\s*\?)+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    sql = _LITERALS.sub("?", sql)
+    return _SPACES.sub(" ", _PARAM_LISTS.sub("?, ...", sql)).strip()
+
+
+class _MethodStats:
+    def __init__(self, buckets):
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.histogram = [0] * (len(buckets) + 1)
+        self.rows = 0
+        self.statements = 0
+        self.max_statements = 0
+        self.nested = 0
+        self.steps = 0
+        self.errors = 0
+
+
+class StorageProfiler:
+    # Межі кошиків гістограми затримок, мс (останній кошик - понад 1 с)
+    BUCKETS_MS = (0.1, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+    # Методи, які не обгортаються: службові та контекстні менеджери
+    SKIP_METHODS = {"transaction", "close", "release_thread_connection", "add_change_listener",
+                    "remove_change_listener", "enable_profiling", "disable_profiling", "profile_scope"}
+    # Скільки SQL-запитів повільного виклику писати в журнал
+    LOG_STATEMENTS = 20
+
+    def __init__(self, slow_ms=50.0, log_path=None, max_bytes=1_000_000, backup_count=3, progress_steps=1000):
+        """
+        slow_ms - поріг повільного виклику; log_path - файл журналу повільних викликів
+        (None - лише лічильник slow у stats); progress_steps - як часто (у кроках VM) рахувати роботу SQLite.
+        """
+        self.slow_ms = slow_ms
+        self.progress_steps = progress_steps
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._methods = {}
+        self._sql = Counter()
+        self._sql_by_method = {}
+        self._scopes = {}  # мітка -> Counter(calls, statements, ms)
+        self.slow_calls = 0
+        self._storage = None
+        self._originals = {}
+
+        self.log = None
+        if log_path:
+            self.log = logging.getLogger(f"{__name__}.{id(self)}")
+            self.log.propagate = False
+            self.log.setLevel(logging.INFO)
+            handler = RotatingFileHandler(log_path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self.log.addHandler(handler)
+
+    # Підключення
+
+    def attach(self, storage):
+        """Обгортає публічні методи storage та підключає callback-и до вже відкритих з'єднань."""
+        self._storage = storage
+        for name in dir(type(storage)):
+            attr = getattr(type(storage), name)
+            if name.startswith("_") or name in self.SKIP_METHODS or not callable(attr) or isinstance(attr, type):
+                continue
+            method = getattr(storage, name)
+            self._originals[name] = method
+            setattr(storage, name, self._wrap(name, method))
+        with storage._connections_lock:
+            connections = list(storage._connections)
+        for conn in connections:
+            self.install(conn)
+
+    def detach(self):
+        storage, self._storage = self._storage, None
+        if storage is None:
+            return
+        for name in self._originals:
+            # Обгортки лежать в атрибутах екземпляра - видаляємо, щоб знову працювали методи класу
+            storage.__dict__.pop(name, None)
+        self._originals.clear()
+        with storage._connections_lock:
+            connections = list(storage._connections)
+        for conn in connections:
+            conn.set_trace_callback(None)
+            conn.set_progress_handler(None, 0)
+        if self.log:
+            for handler in list(self.log.handlers):
+                handler.close()
+                self.log.removeHandler(handler)
+
+    def install(self, conn):
+        conn.set_trace_callback(self._on_statement)
+        conn.set_progress_handler(self._on_progress, self.progress_steps)
+
+    # Збір
+
+    def _frames(self):
+        frames = getattr(self._local, "frames", None)
+        if frames is None:
+            frames = self._local.frames = []
+        return frames
+
+    @contextmanager
+    def scope(self, label):
+        """Рахує виклики та SQL-запити блоку (у цьому потоці) під міткою label, напр. назвою вкладки."""
+        totals = Counter()
+        scopes = getattr(self._local, "scopes", None)
+        if scopes is None:
+            scopes = self._local.scopes = []
+        scopes.append(totals)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            scopes.pop()
+            totals["ms"] += (time.perf_counter() - start) * 1000
+            totals["entries"] += 1
+            with self._lock:
+                self._scopes.setdefault(label, Counter()).update(totals)
+
+    def _on_statement(self, sql):
+        frames = self._frames()
+        if sql.startswith("--"):
+            if frames:
+                frames[-1]["nested"] += 1
+            return
+        # Тригер оператора - той самий текст ще раз; порівняння рядків дешевше за нормалізацію
+        if sql == getattr(self._local, "last_sql", None):
+            return
+        self._local.last_sql = sql
+        for totals in getattr(self._local, "scopes", ()):
+            totals["statements"] += 1
+        method = frames[-1]["name"] if frames else "<поза методами>"
+        key = normalize_sql(sql)
+        if frames:
+            frames[-1]["statements"] += 1
+            if len(frames[-1]["sql"]) < self.LOG_STATEMENTS:
+                frames[-1]["sql"].append(key)
+        with self._lock:
+            self._sql[key] += 1
+            self._sql_by_method.setdefault(method, Counter())[key] += 1
+
+    def _on_progress(self):
+        frames = self._frames()
+        if frames:
+            frames[-1]["steps"] += self.progress_steps
+        return 0  # 0 - продовжити виконання запиту
+
+    def _wrap(self, name, method):
+        @wraps(method)
+        def timed(*args, **kwargs):
+            for totals in getattr(self._local, "scopes", ()):
+                totals["calls"] += 1
+            frames = self._frames()
+            frame = {"name": name, "statements": 0, "nested": 0, "steps": 0, "sql": []}
+            frames.append(frame)
+            # Однаковий запит з іншого виклику - новий запит, а не повтор для тригера
+            self._local.last_sql = None
+            start = time.perf_counter()
+            failed = True
+            try:
+                result = method(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                frames.pop()
+                self._local.last_sql = None
+                self._record(frame, elapsed_ms, None if failed else result, failed, args)
+        return timed
+
+    @staticmethod
+    def _count_rows(result):
+        # Сторінки повертаються як (рядки, курсор)
+        if isinstance(result, tuple) and len(result) == 2 and isinstance(result[0], list):
+            result = result[0]
+        # Групування {id: [елементи]} - рахуємо елементи, а не групи
+        if isinstance(result, dict) and result and all(isinstance(v, list) for v in result.values()):
+            return sum(len(v) for v in result.values())
+        if isinstance(result, (list, dict, set)):
+            return len(result)
+        return 0 if result is None else 1
+
+    @staticmethod
+    def _shown_arg(arg):
+        # Моделі (User з password_hash тощо) - лише назва типу
+        if arg is None or isinstance(arg, (str, int, float)):
+            return repr(arg)[:60]
+        return f"<{type(arg).__name__}>"
+
+    def _record(self, frame, elapsed_ms, result, failed, args):
+        name = frame["name"]
+        with self._lock:
+            stats = self._methods.get(name)
+            if stats is None:
+                stats = self._methods[name] = _MethodStats(self.BUCKETS_MS)
+            stats.calls += 1
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.histogram[bisect_left(self.BUCKETS_MS, elapsed_ms)] += 1
+            stats.rows += self._count_rows(result) if not failed else 0
+            stats.statements += frame["statements"]
+            stats.max_statements = max(stats.max_statements, frame["statements"])
+            stats.nested += frame["nested"]
+            stats.steps += frame["steps"]
+            stats.errors += failed
+            slow = elapsed_ms >= self.slow_ms
+            self.slow_calls += slow
+        if slow and self.log:
+            shown_args = ", ".join(self._shown_arg(a) for a in args)
+            sql = "\n    ".join(s[:500] for s in frame["sql"])
+            more = frame["statements"] - len(frame["sql"])
+            self.log.info(f"SLOW {name}({shown_args}) {elapsed_ms:.1f} ms, {frame['statements']} SQL"
+                          f"{f' (+{more} не показано)' if more > 0 else ''}\n    {sql}")
+
+    # Результати
+
+    def stats(self) -> dict:
+        """{метод: {calls, total_ms, mean_ms, p50_ms, p95_ms, max_ms, histogram, rows, statements, ...}}"""
+        with self._lock:
+            result = {}
+            for name, s in self._methods.items():
+                result[name] = {
+                    "calls": s.calls, "total_ms": s.total_ms, "mean_ms": s.total_ms / s.calls,
+                    "p50_ms": self._percentile(s, 0.5), "p95_ms": self._percentile(s, 0.95), "max_ms": s.max_ms,
+                    "histogram": dict(zip([f"<={b}" for b in self.BUCKETS_MS] + [f">{self.BUCKETS_MS[-1]}"],
+                                          s.histogram)),
+                    "rows": s.rows, "statements": s.statements, "max_statements": s.max_statements,
+                    "statements_per_call": s.statements / s.calls, "nested_statements": s.nested,
+                    "vm_steps": s.steps, "errors": s.errors,
+                    "top_sql": self._sql_by_method.get(name, Counter()).most_common(5),
+                }
+            return result
+
+    def _percentile(self, stats, q):
+        """Верхня межа кошика гістограми, в який потрапляє квантиль q (оцінка зверху)."""
+        target = q * stats.calls
+        seen = 0
+        for bound, count in zip(self.BUCKETS_MS, stats.histogram):
+            seen += count
+            if seen >= target:
+                return min(bound, stats.max_ms)
+        return stats.max_ms
+
+    def scopes(self) -> dict:
+        """{мітка: {entries, calls, statements, ms}} - скільки викликів і запитів робить один вхід у scope."""
+        with self._lock:
+            return {label: {"entries": c["entries"], "calls": c["calls"], "statements": c["statements"],
+                            "ms": c["ms"], "statements_per_entry": c["statements"] / c["entries"]}
+                    for label, c in self._scopes.items()}
+
+    def top_sql(self, n=20):
+        """Найчастіші запити (нормалізований текст, кількість) - повтори одного запиту видають N+1."""
+        with self._lock:
+            return self._sql.most_common(n)
+
+    def reset(self):
+        with self._lock:
+            self._methods.clear()
+            self._sql.clear()
+            self._sql_by_method.clear()
+            self._scopes.clear()
+            self.slow_calls = 0
+
+    def report(self, top=20) -> str:
+        """Текстова таблиця методів за сумарним часом і найчастіші запити."""
+        stats = sorted(self.stats().items(), key=lambda item: item[1]["total_ms"], reverse=True)[:top]
+        lines = [f"{'Метод':<32} {'викл.':>6} {'всього мс':>10} {'p50':>7} {'p95':>7} {'макс':>8} "
+                 f"{'SQL/викл.':>9} {'рядків':>8}"]
+        for name, s in stats:
+            lines.append(f"{name:<32} {s['calls']:>6} {s['total_ms']:>10.1f} {s['p50_ms']:>7.2f} {s['p95_ms']:>7.2f} "
+                         f"{s['max_ms']:>8.2f} {s['statements_per_call']:>9.1f} {s['rows']:>8}")
+        scopes = sorted(self.scopes().items(), key=lambda item: item[1]["statements"], reverse=True)
+        if scopes:
+            lines.append("")
+            lines.append(f"{'Екран':<32} {'входів':>6} {'викл.':>6} {'SQL':>8} {'SQL/вхід':>9} {'мс':>10}")
+            for label, c in scopes:
+                lines.append(f"{label:<32} {c['entries']:>6} {c['calls']:>6} {c['statements']:>8} "
+                             f"{c['statements_per_entry']:>9.1f} {c['ms']:>10.1f}")
+        lines.append("")
+        lines.append("Найчастіші запити:")
+        for sql, count in self.top_sql(top):
+            lines.append(f"{count:>8}  {sql[:150]}")
+        return "\n".join(lines)
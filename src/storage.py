@@ -1,179 +1,530 @@
+import copy
 import sqlite3
 import os
 import json
-from datetime import datetime, date, timedelta
+import threading
+import time
+from calendar import timegm
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, date, time as dt_time, timedelta
+from itertools import groupby, islice
+from operator import itemgetter
+from .cache import ReadCache
+from .migrations import migrate, NOW_SQL, STATS_SOURCES
 from .models import User, LearningGoal, GoalStatus, GoalPriority, Habit, SubGoal, Category, Course, CourseType, \
-    CourseStatus, Topic
+    CourseStatus, Topic, ChangeEvent
+
+
+class _ExportCancelled(Exception):
+    """Внутрішній сигнал скасування потокового експорту."""
 
 
 class StorageService:
-    def __init__(self, db_path="data/app.db"):
+    # Розмір кешу підготовлених запитів для кожного з'єднання
+    STATEMENT_CACHE_SIZE = 256
+    # Скільки значень передавати в один IN (...)
+    MAX_SQL_PARAMS = 900
+
+    def __init__(self, db_path="data/app.db", cache_size=256):
+        """cache_size - скільки результатів читання тримати в кеші (ReadCache); 0 вимикає кеш."""
         self.db_path = db_path
+        self.cache = ReadCache(cache_size)
+        self._change_listeners = []
+        # Одне довготривале з'єднання на потік (UI, APScheduler тощо)
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self.profiler = None
         self._init_db()
 
-    def _init_db(self):
-        """Ініціалізація бази даних та створення таблиць."""
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
+    # Connection management
+
+    def _connect(self):
+        """Повертає з'єднання поточного потоку, створюючи його при першому зверненні."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # check_same_thread=False лише для того, щоб close() міг закрити з'єднання інших потоків;
+            # кожен потік працює тільки зі своїм з'єднанням.
+            conn = sqlite3.connect(self.db_path, cached_statements=self.STATEMENT_CACHE_SIZE,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.create_function("py_lower", 1, lambda v: v.lower() if isinstance(v, str) else v,
+                                 deterministic=True)
+            if self.profiler is not None:
+                self.profiler.install(conn)
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def enable_profiling(self, **options):
+        """
+        Вмикає профілювання (src.profiler.StorageProfiler): час, рядки і SQL кожного публічного методу.
+        options передаються в StorageProfiler (slow_ms, log_path, ...). Повертає профайлер.
+        """
+        from .profiler import StorageProfiler
+        self.disable_profiling()
+        self.profiler = StorageProfiler(**options)
+        self.profiler.attach(self)
+        return self.profiler
+
+    def disable_profiling(self):
+        if self.profiler is not None:
+            self.profiler.detach()
+            self.profiler = None
+
+    def profile_scope(self, label):
+        """Підписує запити блоку міткою (екран, канал) для профайлера; без профілювання нічого не робить."""
+        return self.profiler.scope(label) if self.profiler is not None else nullcontext()
+
+    def close(self):
+        """Закриває всі відкриті з'єднання. Наступний виклик створить нові."""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            self._local = threading.local()
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
 
-        # Users
-        c.execute('''CREATE TABLE IF NOT EXISTS users (
-            id TEXT PRIMARY KEY, username TEXT, password_hash TEXT,
-            total_completed_goals INTEGER, avatar_path TEXT, created_at TEXT
-        )''')
-
-        # Categories
-        c.execute('''CREATE TABLE IF NOT EXISTS categories (
-            id TEXT PRIMARY KEY, user_id TEXT, name TEXT, color TEXT
-        )''')
-
-        # Goals
-        c.execute('''CREATE TABLE IF NOT EXISTS goals (
-            id TEXT PRIMARY KEY, user_id TEXT, title TEXT, description TEXT,
-            deadline TEXT, priority TEXT, status TEXT, created_at TEXT, category_id TEXT, link TEXT
-        )''')
-
-        # Subgoals
-        c.execute('''CREATE TABLE IF NOT EXISTS subgoals (
-            id TEXT PRIMARY KEY, goal_id TEXT, title TEXT, is_completed INTEGER, description TEXT, created_at TEXT
-        )''')
-
-        # Habits
-        c.execute('''CREATE TABLE IF NOT EXISTS habits (
-            id TEXT PRIMARY KEY, user_id TEXT, title TEXT, streak INTEGER, last_completed_date TEXT
-        )''')
-
-        # Habit logs
-        c.execute('''CREATE TABLE IF NOT EXISTS habit_logs (
-            habit_id TEXT, date TEXT,
-            PRIMARY KEY (habit_id, date)
-        )''')
-
-        # Topics
-        c.execute('''CREATE TABLE IF NOT EXISTS topics (
-            id TEXT PRIMARY KEY, user_id TEXT, name TEXT
-        )''')
-
-        # Courses
-        c.execute('''CREATE TABLE IF NOT EXISTS courses (
-            id TEXT PRIMARY KEY, user_id TEXT, title TEXT, type TEXT, 
-            status TEXT, total_units INTEGER, completed_units INTEGER, 
-            link TEXT, description TEXT, created_at TEXT, topic_id TEXT
-        )''')
-
-        # Migration: add topic_id if missing
+    def release_thread_connection(self):
+        """
+        Закриває з'єднання поточного потоку. Викликається потоками, що завершуються (воркери, пул
+        AsyncStorage), інакше їхні з'єднання лишаються в _connections до close().
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._connections_lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
         try:
-            c.execute("ALTER TABLE courses ADD COLUMN topic_id TEXT")
-        except sqlite3.OperationalError:
+            conn.close()
+        except sqlite3.Error:
             pass
 
-        conn.commit()
-        conn.close()
-
-    # Import / export methods
+    @contextmanager
+    def transaction(self, *tables):
+        """
+        Unit of work: усі записи всередині блоку фіксуються одним commit.
+        Вкладені блоки приєднуються до зовнішньої транзакції; виняток, що
+        виходить із зовнішнього блоку, відкочує всі зміни.
+        tables - таблиці, які змінює блок: після commit з кешу читань видаляються лише
+        залежні від них результати. Блок без tables, що щось змінив, очищає весь кеш.
+        Після commit, що щось змінив, слухачі (add_change_listener) отримують список ChangeEvent:
+        записані через _changed, а для решти tables - подію без id.
+        """
+        conn = self._connect()
+        depth = getattr(self._local, "tx_depth", 0)
+        if depth == 0:
+            if not conn.in_transaction:
+                # Явний BEGIN: sqlite3 не відкриває транзакцію сам для запитів, що починаються з WITH
+                conn.execute("BEGIN")
+            self._local.tx_changes = conn.total_changes
+            self._local.tx_tables = set()
+            self._local.tx_events = []
+        if self._local.tx_tables is not None:
+            self._local.tx_tables = self._local.tx_tables | set(tables) if tables else None
+        self._local.tx_depth = depth + 1
+        try:
+            yield conn.cursor()
+            if depth == 0:
+                conn.commit()
+                if conn.total_changes != self._local.tx_changes:
+                    self.cache.invalidate(self._local.tx_tables)
+                    self._notify(self._tx_events())
+        except Exception:
+            if depth == 0:
+                conn.rollback()
+            raise
+        finally:
+            self._local.tx_depth = depth
+
+    def _changed(self, entity, op="save", ids=None):
+        """Записує подію зміни entity (op: save/delete, ids - змінені id або None) у поточну транзакцію."""
+        self._local.tx_events.append(ChangeEvent(entity, op, frozenset(ids) if ids is not None else None))
+
+    def _tx_events(self):
+        if self._local.tx_tables is None:
+            return [ChangeEvent.RELOAD]
+        events = self._local.tx_events
+        described = {e.entity for e in events}
+        return events + [ChangeEvent(t) for t in sorted(self._local.tx_tables - described)]
+
+    def add_change_listener(self, callback):
+        """
+        callback(events) викликається після кожного commit зі змінами - у потоці, що писав.
+        UI має сам передати події у свій потік (див. MainWindow.storage_changed).
+        """
+        self._change_listeners.append(callback)
+
+    def remove_change_listener(self, callback):
+        if callback in self._change_listeners:
+            self._change_listeners.remove(callback)
+
+    def _notify(self, events):
+        for callback in tuple(self._change_listeners):
+            callback(events)
+
+    def _cached(self, name, user_id, tables, load, **args):
+        """
+        Читання через кеш: load() виконується лише при промаху. Ключ - (name, user_id, args),
+        tables - таблиці, від яких залежить результат. Усередині транзакції кеш не використовується,
+        щоб не закешувати незафіксовані зміни. Викликач отримує копію: змінені ним моделі
+        (напр. streak звички до збереження) не потрапляють у кеш.
+        """
+        if not self.cache.enabled or getattr(self._local, "tx_depth", 0):
+            return load()
+        key = (name, user_id, tuple(sorted((k, self._hashable(v)) for k, v in args.items())))
+        found, value = self.cache.get(key)
+        if found:
+            return self._detached(value)
+        generation = self.cache.generation
+        value = load()
+        self.cache.put(key, tables, value, generation)
+        return self._detached(value)
+
+    @classmethod
+    def _detached(cls, value):
+        """Копія закешованого результату: контейнери - нові, моделі - поверхневі копії (полів-контейнерів у них немає)."""
+        if isinstance(value, list):
+            return [cls._detached(v) for v in value]
+        if isinstance(value, tuple):
+            return tuple(cls._detached(v) for v in value)
+        if isinstance(value, dict):
+            return {k: cls._detached(v) for k, v in value.items()}
+        return copy.copy(value)
+
+    @staticmethod
+    def _hashable(value):
+        if isinstance(value, (set, frozenset)):
+            return frozenset(value)
+        if isinstance(value, (list, tuple)):
+            return tuple(value)
+        return value
+
+    def data_replaced(self):
+        """
+        Викликається після змін БД в обхід transaction() (напр. відновлення з копії):
+        скидає кеш читань і повідомляє слухачів, що застаріло все.
+        """
+        self.cache.invalidate()
+        self._notify([ChangeEvent.RELOAD])
 
-    def export_user_data(self, user_id: str) -> dict:
-        """Експортує всі дані користувача у словник."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
+    def _init_db(self):
+        """Ініціалізація бази даних: застосовує всі невиконані міграції схеми."""
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        migrate(self._connect())
 
-        data = {"version": 1, "export_date": datetime.now().isoformat()}
+    # Import / export methods
 
-        # 1. User info (optional, mainly for stats)
+    EXPORT_BATCH = 500
+
+    def _export_sections(self, user_id: str, since: str = None):
+        """
+        Розділи експорту версії 1 у порядку запису: (назва, SQL-запит, параметри).
+        Підцілі й логи вибираються через JOIN, без завантаження списку id у пам'ять.
+        З since - лише рядки, змінені з цього моменту, і розділ deleted з видаленими.
+        """
+        sections = [
+            ("categories", "SELECT * FROM categories x WHERE user_id=?"),
+            ("topics", "SELECT * FROM topics x WHERE user_id=?"),
+            # Без генерованих колонок (deadline_ts тощо): їх не можна записати при імпорті
+            ("goals", f"SELECT {self._stored_columns('goals')} FROM goals x WHERE user_id=?"),
+            ("subgoals", "SELECT x.* FROM subgoals x JOIN goals g ON g.id = x.goal_id WHERE g.user_id=?"),
+            ("habits", "SELECT * FROM habits x WHERE user_id=?"),
+            ("habit_logs", "SELECT x.* FROM habit_logs x JOIN habits h ON h.id = x.habit_id WHERE h.user_id=?"),
+            ("courses", "SELECT * FROM courses x WHERE user_id=?"),
+        ]
+        if since is None:
+            return [(name, sql, (user_id,)) for name, sql in sections]
+
+        delta = [(name, sql + " AND x.updated_at >= ?", (user_id, since)) for name, sql in sections]
+        delta.append(("deleted", '''SELECT table_name AS "table", row_id AS id, row_date AS date, deleted_at
+                                     FROM deleted_rows WHERE user_id=? AND deleted_at >= ?''', (user_id, since)))
+        return delta
+
+    def _iter_export_rows(self, name, sql, params, user_id, since=None):
+        """Рядки розділу експорту порціями по EXPORT_BATCH (fetchmany)."""
+        c = self._connect().cursor()
+        # row_factory лише для цього курсора, щоб не змінювати спільне з'єднання
+        c.row_factory = sqlite3.Row
+        c.execute(sql, params)
+        while True:
+            batch = c.fetchmany(self.EXPORT_BATCH)
+            if not batch:
+                break
+            for r in batch:
+                yield dict(r)
+
+        if name == "habit_logs" and since is None:
+            # Стиснуті в бітмапи відмітки експортуються звичайними рядками
+            # (у дельту не потрапляють: стискаються лише давно не змінені відмітки)
+            c.execute('''SELECT b.habit_id, b.year, b.bits FROM habit_log_bitmaps b
+                         JOIN habits h ON h.id = b.habit_id WHERE h.user_id=?''', (user_id,))
+            for r in c:
+                for d in self._bitmap_dates(r["year"], r["bits"]):
+                    yield {"habit_id": r["habit_id"], "date": d}
+
+    def _export_header(self, user_id: str, since: str = None) -> dict:
+        c = self._connect().cursor()
+        c.row_factory = sqlite3.Row
+        # sync_token - мітка часу БД на початок експорту, її передають як since наступного разу
+        c.execute(f"SELECT {NOW_SQL}")
+        data = {"version": 1, "export_date": datetime.now().isoformat(), "sync_token": c.fetchone()[0]}
+        if since is not None:
+            data["since"] = since
+        # User info (optional, mainly for stats)
         c.execute("SELECT * FROM users WHERE id=?", (user_id,))
         user_row = c.fetchone()
         if user_row:
             data["user"] = dict(user_row)
-
-        # 2. Categories
-        c.execute("SELECT * FROM categories WHERE user_id=?", (user_id,))
-        data["categories"] = [dict(r) for r in c.fetchall()]
-
-        # 3. Topics
-        c.execute("SELECT * FROM topics WHERE user_id=?", (user_id,))
-        data["topics"] = [dict(r) for r in c.fetchall()]
-
-        # 4. Goals & subgoals
-        c.execute("SELECT * FROM goals WHERE user_id=?", (user_id,))
-        goals = [dict(r) for r in c.fetchall()]
-        data["goals"] = goals
-
-        goal_ids = [g['id'] for g in goals]
-        if goal_ids:
-            placeholders = ','.join(['?'] * len(goal_ids))
-            c.execute(f"SELECT * FROM subgoals WHERE goal_id IN ({placeholders})", goal_ids)
-            data["subgoals"] = [dict(r) for r in c.fetchall()]
-        else:
-            data["subgoals"] = []
-
-        # 5. Habits & logs
-        c.execute("SELECT * FROM habits WHERE user_id=?", (user_id,))
-        habits = [dict(r) for r in c.fetchall()]
-        data["habits"] = habits
-
-        habit_ids = [h['id'] for h in habits]
-        if habit_ids:
-            placeholders = ','.join(['?'] * len(habit_ids))
-            c.execute(f"SELECT * FROM habit_logs WHERE habit_id IN ({placeholders})", habit_ids)
-            data["habit_logs"] = [dict(r) for r in c.fetchall()]
-        else:
-            data["habit_logs"] = []
-
-        # 6. Courses
-        c.execute("SELECT * FROM courses WHERE user_id=?", (user_id,))
-        data["courses"] = [dict(r) for r in c.fetchall()]
-
-        conn.close()
         return data
 
-    def import_user_data(self, data: dict, user_id: str):
-        """Імпортує дані зі словника в БД, прив'язуючи їх до поточного user_id."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-
-        def upsert(table, rows):
-            if not rows: return
-
-            # Важлива зміна: переписуємо user_id
-            processed_rows = []
-            for row in rows:
-                new_row = row.copy()
-                # Якщо в таблиці є поле user_id, підставляємо поточного користувача
-                if 'user_id' in new_row:
-                    new_row['user_id'] = user_id
-                processed_rows.append(new_row)
-
-            keys = processed_rows[0].keys()
-            columns = ', '.join(keys)
-            placeholders = ', '.join(['?'] * len(keys))
-            sql = f"INSERT OR REPLACE INTO {table} ({columns}) VALUES ({placeholders})"
-
-            for row in processed_rows:
-                c.execute(sql, list(row.values()))
+    def export_user_data(self, user_id: str, since: str = None) -> dict:
+        """
+        Експортує всі дані користувача у словник.
+        since (sync_token попереднього експорту) - лише зміни з того моменту плюс видалення.
+        """
+        data = self._export_header(user_id, since)
+        for name, sql, params in self._export_sections(user_id, since):
+            data[name] = list(self._iter_export_rows(name, sql, params, user_id, since))
+        return data
 
+    def export_user_data_to_file(self, user_id: str, file_path: str, progress=None, is_cancelled=None,
+                                 since: str = None):
+        """
+        Потоковий експорт у JSON-файл (той самий формат, що json.dump(export_user_data(...), indent=4)).
+        Розділи пишуться порціями, тож пам'ять не залежить від обсягу даних.
+        progress(done, total) викликається після кожної порції; якщо is_cancelled()
+        повертає True, експорт зупиняється, а недописаний файл видаляється.
+        Повертає кількість записаних рядків або None при скасуванні.
+        Безпечно викликати з робочого потоку: він отримає власне з'єднання.
+        """
+        sections = self._export_sections(user_id, since)
+        c = self._connect().cursor()
+        total = 0
+        for name, sql, params in sections:
+            c.execute(f"SELECT COUNT(*) FROM ({sql})", params)
+            total += c.fetchone()[0]
+        if since is None:
+            c.execute('''SELECT b.bits FROM habit_log_bitmaps b JOIN habits h ON h.id = b.habit_id
+                         WHERE h.user_id=?''', (user_id,))
+            total += sum(bin(int.from_bytes(r[0], "little")).count("1") for r in c)
+
+        encode = json.JSONEncoder(ensure_ascii=False).encode
+
+        def dump(obj, level):
+            # Плаский рядок таблиці з відступами, як у json.dump(..., indent=4)
+            if not isinstance(obj, dict) or not obj:
+                return encode(obj)
+            pad = "    " * level
+            fields = ",\n".join(f"{pad}    {encode(k)}: {encode(v)}" for k, v in obj.items())
+            return "{\n" + fields + "\n" + pad + "}"
+
+        tmp_path = file_path + ".part"
+        done = 0
         try:
-            # Import categories
-            upsert("categories", data.get("categories", []))
-
-            # Import topics
-            upsert("topics", data.get("topics", []))
-
-            # Import goals
-            upsert("goals", data.get("goals", []))
-
-            # Import subgoals (тут user_id немає, прив'язка йде через goal_id, який ми зберегли)
-            upsert("subgoals", data.get("subgoals", []))
-
-            # Import habits
-            upsert("habits", data.get("habits", []))
-
-            # Import habit logs
-            upsert("habit_logs", data.get("habit_logs", []))
-
-            # Import courses
-            upsert("courses", data.get("courses", []))
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                header = self._export_header(user_id, since)
+                f.write("{")
+                first_key = True
+                for key, value in header.items():
+                    f.write(("" if first_key else ",") + f"\n    {json.dumps(key)}: {dump(value, 1)}")
+                    first_key = False
+
+                for name, sql, params in sections:
+                    f.write(f",\n    {json.dumps(name)}: [")
+                    empty = True
+                    for row in self._iter_export_rows(name, sql, params, user_id, since):
+                        f.write(("\n" if empty else ",\n") + "        " + dump(row, 2))
+                        empty = False
+                        done += 1
+                        if done % self.EXPORT_BATCH == 0:
+                            if is_cancelled and is_cancelled():
+                                raise _ExportCancelled()
+                            if progress:
+                                progress(done, total)
+                    f.write("]" if empty else "\n    ]")
+                f.write("\n}")
+            os.replace(tmp_path, file_path)
+        except _ExportCancelled:
+            os.remove(tmp_path)
+            return None
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if progress:
+            progress(done, max(total, done))
+        return done
+
+    # Порядок імпорту і ключ конфлікту кожної таблиці
+    IMPORT_TABLES = {
+        "categories": ("id",),
+        "topics": ("id",),
+        "goals": ("id",),
+        "subgoals": ("id",),  # user_id немає, прив'язка йде через goal_id
+        "habits": ("id",),
+        "habit_logs": ("habit_id", "date"),
+        "courses": ("id",),
+    }
+    IMPORT_CHUNK = 1000
+
+    def _table_columns(self, cursor, table) -> set:
+        cursor.execute(f"PRAGMA table_info({table})")
+        return {r[1] for r in cursor.fetchall()}
+
+    def _stored_columns(self, table) -> str:
+        """Список 'x.колонка' без генерованих колонок (PRAGMA table_info їх не показує)."""
+        c = self._connect().execute(f"PRAGMA table_info({table})")
+        return ", ".join(f"x.{r[1]}" for r in c.fetchall())
+
+    def _validate_import(self, cursor, data: dict) -> dict:
+        """
+        Перевіряє набір колонок кожного рядка до будь-якого запису.
+        Невідомі колонки (вони потрапили б у SQL) або відсутній ключ - ValueError.
+        Повертає {таблиця: множина колонок у БД}.
+        """
+        table_columns = {}
+        for table, key in self.IMPORT_TABLES.items():
+            rows = data.get(table) or []
+            if not isinstance(rows, list):
+                raise ValueError(f"Розділ '{table}' має бути списком")
+            columns = table_columns[table] = self._table_columns(cursor, table)
+            checked = set()
+            for row in rows:
+                if not isinstance(row, dict):
+                    raise ValueError(f"Розділ '{table}': очікувався об'єкт, отримано {type(row).__name__}")
+                keys = tuple(row)
+                if keys in checked:
+                    continue
+                unknown = set(keys) - columns
+                if unknown:
+                    raise ValueError(f"Розділ '{table}': невідомі колонки {', '.join(sorted(unknown))}")
+                missing = set(key) - set(keys)
+                if missing:
+                    raise ValueError(f"Розділ '{table}': бракує ключових колонок {', '.join(sorted(missing))}")
+                checked.add(keys)
+
+        deleted = data.get("deleted") or []
+        if not isinstance(deleted, list):
+            raise ValueError("Розділ 'deleted' має бути списком")
+        for row in deleted:
+            if not isinstance(row, dict) or row.get("table") not in self.IMPORT_TABLES or not row.get("id"):
+                raise ValueError(f"Розділ 'deleted': невірний запис {row!r}")
+            if row["table"] == "habit_logs" and not row.get("date"):
+                raise ValueError(f"Розділ 'deleted': для habit_logs потрібна дата {row!r}")
+        return table_columns
+
+    def _apply_tombstones(self, cursor, tombstones, user_id) -> set:
+        """
+        Застосовує видалення з дельта-експорту лише до рядків цього користувача,
+        тими самими методами delete_*, що й UI (з їхніми каскадами).
+        Повертає id звичок, відмітки яких змінились.
+        """
+        owner_sql = {
+            "subgoals": "SELECT 1 FROM subgoals s JOIN goals g ON g.id = s.goal_id WHERE s.id = ? AND g.user_id = ?",
+            "habit_logs": "SELECT 1 FROM habits WHERE id = ? AND user_id = ?",
+        }
+        delete = {
+            "categories": self.delete_category,
+            "topics": self.delete_topic,
+            "goals": self.delete_goal,
+            "subgoals": self.delete_subgoal,
+            "habits": self.delete_habit,
+            "courses": self.delete_course,
+        }
+        touched_habits = set()
+        for row in tombstones:
+            table, row_id = row["table"], row["id"]
+            cursor.execute(owner_sql.get(table, f"SELECT 1 FROM {table} WHERE id = ? AND user_id = ?"),
+                           (row_id, user_id))
+            if cursor.fetchone() is None:
+                continue
+            if table == "habit_logs":
+                cursor.execute("DELETE FROM habit_logs WHERE habit_id = ? AND date = ?", (row_id, row["date"]))
+                if cursor.rowcount == 0:
+                    self._unset_bitmap_day(cursor, row_id, row["date"])
+                touched_habits.add(row_id)
+            else:
+                delete[table](row_id)
+        return touched_habits
+
+    def _upsert_sql(self, table, columns, key, rows=1) -> str:
+        placeholders = ', '.join(['(' + ', '.join(['?'] * len(columns)) + ')'] * rows)
+        updates = [f"{col}=excluded.{col}" for col in columns if col not in key]
+        action = f"DO UPDATE SET {', '.join(updates)}" if updates else "DO NOTHING"
+        return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES {placeholders} "
+                f"ON CONFLICT({', '.join(key)}) {action}")
+
+    def import_user_data(self, data: dict, user_id: str, progress=None) -> int:
+        """
+        Імпортує дані зі словника в БД, прив'язуючи їх до поточного user_id.
+        Дельта-експорт (export_user_data(since=...)) застосовується так само,
+        разом із розділом deleted. Рядки з однаковим набором колонок пишуться багаторядковими INSERT
+        порціями по IMPORT_CHUNK (upsert без видалення рядків). Все - одна транзакція.
+        progress(done, total) викликається після кожної порції.
+        Повертає кількість імпортованих рядків.
+        """
+        total = sum(len(data.get(table) or []) for table in list(self.IMPORT_TABLES) + ["deleted"])
+        done = 0
+        with self.transaction() as c:
+            table_columns = self._validate_import(c, data)
+            now = c.execute(f"SELECT {NOW_SQL}").fetchone()[0]
+
+            # Видалення з дельти - до оновлень: рядок міг бути видалений і створений знову
+            tombstones = data.get("deleted") or []
+            touched_habits = self._apply_tombstones(c, tombstones, user_id)
+            done += len(tombstones)
+
+            for table, key in self.IMPORT_TABLES.items():
+                rows = data.get(table) or []
+                force_user = "user_id" in table_columns[table]
+                # Послідовні рядки з однаковими колонками - один підготовлений запит
+                for keys, group in groupby(rows, key=tuple):
+                    # user_id завжди переписується на поточного користувача
+                    data_columns = tuple(col for col in keys if col != "user_id")
+                    extra_columns, extra = ("user_id",) * force_user, (user_id,) * force_user
+                    if "updated_at" not in keys:
+                        # Старий бекап: ставимо час одразу, без окремого UPDATE з тригера на кожен рядок
+                        extra_columns, extra = extra_columns + ("updated_at",), extra + (now,)
+                    columns = data_columns + extra_columns
+                    # Кілька рядків в одному INSERT: FTS5 скидає буфер індексу пошуку після кожного
+                    # оператора, тож executemany по рядку робив би це для кожного рядка
+                    per_statement = max(1, self.MAX_SQL_PARAMS // len(columns))
+                    sql = self._upsert_sql(table, columns, key, per_statement)
+                    if len(data_columns) == 1:
+                        get = lambda row, col=data_columns[0]: (row[col],)
+                    else:
+                        get = itemgetter(*data_columns)
+                    group = iter(group)
+                    while True:
+                        chunk = list(islice(group, self.IMPORT_CHUNK))
+                        if not chunk:
+                            break
+                        for start in range(0, len(chunk), per_statement):
+                            part = chunk[start:start + per_statement]
+                            params = [value for row in part for value in get(row) + extra]
+                            if len(part) == per_statement:
+                                c.execute(sql, params)
+                            else:
+                                c.execute(self._upsert_sql(table, columns, key, len(part)), params)
+                        done += len(chunk)
+                        if progress:
+                            progress(done, total)
+
+            self._drop_logs_covered_by_bitmaps(c)
+            # Службовий стан серій у бекапі міг бути застарілим або відсутнім
+            touched_habits.update(row["id"] for row in data.get("habits") or [])
+            touched_habits.update(row["habit_id"] for row in data.get("habit_logs") or [])
+            for habit_id in touched_habits:
+                self._recalc_streak(c, habit_id)
 
             # Update user stats if present
             if "user" in data and data["user"]:
@@ -181,21 +532,124 @@ class StorageService:
                 if "total_completed_goals" in u:
                     c.execute("UPDATE users SET total_completed_goals=? WHERE id=?",
                               (u["total_completed_goals"], user_id))
-
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
+        return done
+
+    # Filtering / keyset pagination
+
+    @staticmethod
+    def _where_in(where, params, column, values):
+        """Додає умову column IN (...); порожній набір значень не відбирає жодного рядка."""
+        values = list(values)
+        where.append(f"{column} IN ({', '.join(['?'] * len(values)) or 'NULL'})")
+        params.extend(values)
+
+    def _keyset_page(self, columns, table, where, params, keys, limit=None, after=None):
+        """
+        Один запит сторінки: WHERE-фільтри, ORDER BY за ключами сортування
+        [(SQL-вираз, за спаданням?)] та курсор after - значення ключів останнього
+        рядка попередньої сторінки. Останній ключ має бути унікальним (id).
+        Повертає (рядки, курсор наступної сторінки або None).
+        """
+        params = list(params)
+        where = list(where)
+        if after:
+            # (k1, k2, ...) строго після курсора з урахуванням напряму кожного ключа
+            branches = []
+            for i, (expr, desc) in enumerate(keys):
+                conds = [f"{e} = ?" for e, _ in keys[:i]] + [f"{expr} {'<' if desc else '>'} ?"]
+                branches.append("(" + " AND ".join(conds) + ")")
+                params.extend(after[:i + 1])
+            where.append("(" + " OR ".join(branches) + ")")
+
+        sql = (f"SELECT {columns}, {', '.join(e for e, _ in keys)} FROM {table} "
+               f"WHERE {' AND '.join(where)} "
+               f"ORDER BY {', '.join(e + (' DESC' if d else '') for e, d in keys)}")
+        if limit:
+            # Зайвий рядок показує, чи є наступна сторінка
+            sql += " LIMIT ?"
+            params.append(limit + 1)
+
+        c = self._connect().cursor()
+        c.execute(sql, params)
+        rows = c.fetchall()
+        if not limit or len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, list(rows[-1][-len(keys):])
+
+    # Full-text search
+
+    # Маркери початку/кінця збігу в highlight()/snippet(); у тексті користувача їх не буває
+    SEARCH_MARKS = ("\x02", "\x03")
+    SEARCH_KINDS = ("goal", "subgoal", "habit", "course")
+
+    @staticmethod
+    def _fts_query(text: str) -> str:
+        """
+        Запит користувача -> вираз FTS5: кожне слово - префікс ("слово"*), слова через AND.
+        Лапки всередині слова подвоюються, тож синтаксис FTS5 (OR, NEAR, дужки) не інтерпретується.
+        """
+        terms = ['"' + word.replace('"', '""') + '"*' for word in text.split()]
+        return " ".join(terms)
+
+    @classmethod
+    def _split_marks(cls, marked: str):
+        """Прибирає маркери збігів; повертає (текст, [(початок, кінець), ...]) у символах тексту."""
+        start_mark, end_mark = cls.SEARCH_MARKS
+        text, spans = [], []
+        pos = 0
+        for i, part in enumerate(marked.split(start_mark)):
+            if i and end_mark in part:
+                hit, rest = part.split(end_mark, 1)
+                spans.append((pos, pos + len(hit)))
+                part = hit + rest
+            text.append(part)
+            pos += len(part)
+        return "".join(text), spans
+
+    def search(self, user_id: str, query: str, limit: int = 50, kinds=None) -> list:
+        """
+        Повнотекстовий пошук по цілях, підцілях, звичках і матеріалах користувача.
+        Кожне слово запиту шукається як префікс, регістр не враховується (зокрема кирилиці).
+        Повертає до limit збігів від найрелевантніших:
+            {"kind", "id", "owner_id" (ціль для підцілі, інакше id), "title", "title_spans",
+             "snippet", "snippet_spans", "rank"}
+        де *_spans - позиції збігів [(початок, кінець)] у title та snippet.
+        """
+        match = self._fts_query(query)
+        if not match:
+            return []
+        start_mark, end_mark = self.SEARCH_MARKS
+        where, params = ["search_index MATCH ?", "d.user_id = ?"], [match, user_id]
+        if kinds is not None:
+            self._where_in(where, params, "d.kind", kinds)
+        c = self._connect().cursor()
+        c.execute(f'''SELECT d.kind, d.item_id, d.owner_id,
+                             highlight(search_index, 0, ?, ?),
+                             snippet(search_index, 1, ?, ?, '…', 12),
+                             rank
+                      FROM search_index JOIN search_docs d ON d.id = search_index.rowid
+                      WHERE {' AND '.join(where)}
+                      ORDER BY rank LIMIT ?''',
+                  [start_mark, end_mark, start_mark, end_mark, *params, limit])
+        hits = []
+        for kind, item_id, owner_id, title, snippet, rank in c.fetchall():
+            title, title_spans = self._split_marks(title)
+            snippet, snippet_spans = self._split_marks(snippet)
+            hits.append({"kind": kind, "id": item_id, "owner_id": owner_id,
+                         "title": title, "title_spans": title_spans,
+                         "snippet": snippet, "snippet_spans": snippet_spans, "rank": rank})
+        return hits
 
     # Topics
     def get_topics(self, user_id: str):
-        conn = sqlite3.connect(self.db_path)
+        return self._cached("topics", user_id, ("topics",), lambda: self._load_topics(user_id))
+
+    def _load_topics(self, user_id: str):
+        conn = self._connect()
         c = conn.cursor()
         c.execute("SELECT * FROM topics WHERE user_id = ?", (user_id,))
         rows = c.fetchall()
-        conn.close()
 
         topics = []
         for r in rows:
@@ -211,83 +665,113 @@ class StorageService:
         return topics
 
     def save_topic(self, topic: Topic):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute("INSERT OR REPLACE INTO topics VALUES (?, ?, ?)",
-                  (topic.id, topic.user_id, topic.name))
-        conn.commit()
-        conn.close()
+        with self.transaction("topics") as c:
+            c.execute("INSERT OR REPLACE INTO topics (id, user_id, name) VALUES (?, ?, ?)",
+                      (topic.id, topic.user_id, topic.name))
+            self._changed("topics", ids=[topic.id])
 
     def delete_topic(self, topic_id: str):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute("DELETE FROM topics WHERE id = ?", (topic_id,))
-        c.execute("UPDATE courses SET topic_id = '' WHERE topic_id = ?", (topic_id,))
-        conn.commit()
-        conn.close()
+        with self.transaction("topics", "courses") as c:
+            c.execute("DELETE FROM topics WHERE id = ?", (topic_id,))
+            self._changed("topics", "delete", [topic_id])
+            c.execute("UPDATE courses SET topic_id = '' WHERE topic_id = ?", (topic_id,))
 
     # Courses
     def save_course(self, course: Course):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute('''INSERT OR REPLACE INTO courses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                  (course.id, course.user_id, course.title,
-                   course.course_type.name, course.status.name,
-                   course.total_units, course.completed_units,
-                   course.link, course.description, str(course.created_at),
-                   course.topic_id))
-        conn.commit()
-        conn.close()
-
-    def get_courses(self, user_id: str):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute("SELECT * FROM courses WHERE user_id = ? ORDER BY created_at DESC", (user_id,))
-        rows = c.fetchall()
-        conn.close()
-
-        courses = []
-        for r in rows:
-            c_type = CourseType[r[3]] if r[3] in CourseType.__members__ else CourseType.COURSE
-            c_status = CourseStatus[r[4]] if r[4] in CourseStatus.__members__ else CourseStatus.PLANNED
-            t_id = r[10] if len(r) > 10 else ""
-
-            course = Course(
-                id=r[0], user_id=r[1], title=r[2],
-                course_type=c_type, status=c_status,
-                total_units=r[5], completed_units=r[6],
-                link=r[7], description=r[8], topic_id=t_id
-            )
-            try:
-                course.created_at = datetime.fromisoformat(r[9])
-            except:
-                pass
-            courses.append(course)
-        return courses
+        with self.transaction("courses") as c:
+            # Upsert, а не INSERT OR REPLACE: заміна не викликає тригерів видалення (агрегати статистики).
+            # user_id та created_at при оновленні не змінюються
+            c.execute('''INSERT INTO courses (id, user_id, title, type, status, total_units, completed_units,
+                                              link, description, created_at, topic_id)
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                         ON CONFLICT(id) DO UPDATE SET title=excluded.title, type=excluded.type,
+                             status=excluded.status, total_units=excluded.total_units,
+                             completed_units=excluded.completed_units, link=excluded.link,
+                             description=excluded.description, topic_id=excluded.topic_id''',
+                      (course.id, course.user_id, course.title,
+                       course.course_type.name, course.status.name,
+                       course.total_units, course.completed_units,
+                       course.link, course.description, str(course.created_at),
+                       course.topic_id))
+            self._changed("courses", ids=[course.id])
+
+    COURSE_COLUMNS = ("id, user_id, title, type, status, total_units, completed_units, "
+                      "link, description, created_at, topic_id")
+    # Ключі сортування: (SQL-вираз, за спаданням?); останній - унікальний id для курсора
+    COURSE_SORTS = {
+        "created_at": [("COALESCE(created_at, '')", True), ("id", True)],
+        # Активні - першими, решта - від нових
+        "status": [("status != 'IN_PROGRESS'", False), ("COALESCE(created_at, '')", True), ("id", True)],
+        # SQLite lower() змінює лише ASCII, тому регістр кирилиці прибирає py_lower
+        "title": [("py_lower(title)", False), ("COALESCE(created_at, '')", True), ("id", True)],
+        "progress": [("CASE WHEN total_units > 0 THEN CAST(completed_units AS REAL) / total_units ELSE 0 END", True),
+                     ("COALESCE(created_at, '')", True), ("id", True)],
+    }
+
+    def get_courses(self, user_id: str, **criteria):
+        """Матеріали користувача; фільтри й сортування - як у get_courses_page (без ліміту за замовчуванням)."""
+        return self.get_courses_page(user_id, **criteria)[0]
+
+    def get_courses_page(self, user_id: str, topic_id=None, statuses=None, ids=None, sort="created_at",
+                         limit=None, after=None):
+        """
+        Фільтрація, сортування (COURSE_SORTS) і посторінкове читання в SQL.
+        statuses - набір CourseStatus; after - курсор з попереднього виклику.
+        Повертає (матеріали, курсор наступної сторінки або None).
+        """
+        where, params = ["user_id = ?"], [user_id]
+        if topic_id:
+            where.append("topic_id = ?")
+            params.append(topic_id)
+        if statuses is not None:
+            self._where_in(where, params, "status", [s.name for s in statuses])
+        if ids is not None:
+            self._where_in(where, params, "id", ids)
+
+        def load():
+            rows, cursor = self._keyset_page(self.COURSE_COLUMNS, "courses", where, params,
+                                             self.COURSE_SORTS[sort], limit, after)
+            return [self._map_row_to_course(r) for r in rows], cursor
+
+        return self._cached("courses", user_id, ("courses",), load, topic_id=topic_id,
+                            statuses=statuses, ids=ids, sort=sort, limit=limit, after=after)
+
+    def _map_row_to_course(self, r):
+        c_type = CourseType[r[3]] if r[3] in CourseType.__members__ else CourseType.COURSE
+        c_status = CourseStatus[r[4]] if r[4] in CourseStatus.__members__ else CourseStatus.PLANNED
+        t_id = r[10] or ""
+
+        course = Course(
+            id=r[0], user_id=r[1], title=r[2],
+            course_type=c_type, status=c_status,
+            total_units=r[5], completed_units=r[6],
+            link=r[7], description=r[8], topic_id=t_id
+        )
+        try:
+            course.created_at = datetime.fromisoformat(r[9])
+        except:
+            pass
+        return course
 
     def delete_course(self, course_id: str):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute("DELETE FROM courses WHERE id = ?", (course_id,))
-        conn.commit()
-        conn.close()
+        with self.transaction("courses") as c:
+            c.execute("DELETE FROM courses WHERE id = ?", (course_id,))
+            self._changed("courses", "delete", [course_id])
 
     # Standard methods (user, goals, habits)
     def get_user_by_username(self, username: str):
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         c = conn.cursor()
         c.execute("SELECT * FROM users WHERE username = ?", (username,))
         row = c.fetchone()
-        conn.close()
         return self._map_row_to_user(row)
 
     def get_user_by_id(self, user_id: str):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute("SELECT * FROM users WHERE id = ?", (user_id,))
-        row = c.fetchone()
-        conn.close()
-        return self._map_row_to_user(row)
+        def load():
+            c = self._connect().cursor()
+            c.execute("SELECT * FROM users WHERE id = ?", (user_id,))
+            return self._map_row_to_user(c.fetchone())
+        return self._cached("user", user_id, ("users",), load)
 
     def _map_row_to_user(self, row):
         if row:
@@ -300,111 +784,189 @@ class StorageService:
         return None
 
     def create_user(self, user: User):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute('''INSERT INTO users VALUES (?, ?, ?, ?, ?, ?)''',
-                  (user.id, user.username, user.password_hash, user.total_completed_goals, user.avatar_path,
-                   str(user.created_at)))
-        conn.commit()
-        conn.close()
+        with self.transaction("users") as c:
+            c.execute('''INSERT INTO users (id, username, password_hash, total_completed_goals, avatar_path, created_at)
+                         VALUES (?, ?, ?, ?, ?, ?)''',
+                      (user.id, user.username, user.password_hash, user.total_completed_goals, user.avatar_path,
+                       str(user.created_at)))
+            self._changed("users", ids=[user.id])
         return user
 
     def update_user_stats(self, user_id, completed_goals):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute("UPDATE users SET total_completed_goals = ? WHERE id = ?", (completed_goals, user_id))
-        conn.commit()
-        conn.close()
+        with self.transaction("users") as c:
+            c.execute("UPDATE users SET total_completed_goals = ? WHERE id = ?", (completed_goals, user_id))
+            self._changed("users", ids=[user_id])
 
     def save_category(self, category: Category):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute('''INSERT OR REPLACE INTO categories VALUES (?, ?, ?, ?)''',
-                  (category.id, category.user_id, category.name, category.color))
-        conn.commit()
-        conn.close()
+        with self.transaction("categories") as c:
+            c.execute('''INSERT OR REPLACE INTO categories (id, user_id, name, color) VALUES (?, ?, ?, ?)''',
+                      (category.id, category.user_id, category.name, category.color))
+            self._changed("categories", ids=[category.id])
 
     def get_categories(self, user_id: str):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute("SELECT * FROM categories WHERE user_id = ?", (user_id,))
-        rows = c.fetchall()
-        conn.close()
-        cats = []
-        for r in rows:
-            cats.append(Category(id=r[0], user_id=r[1], name=r[2], color=r[3]))
-        return cats
+        def load():
+            c = self._connect().cursor()
+            c.execute("SELECT * FROM categories WHERE user_id = ?", (user_id,))
+            return [Category(id=r[0], user_id=r[1], name=r[2], color=r[3]) for r in c.fetchall()]
+        return self._cached("categories", user_id, ("categories",), load)
 
     def delete_category(self, cat_id: str):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute("DELETE FROM categories WHERE id = ?", (cat_id,))
-        c.execute("UPDATE goals SET category_id = NULL WHERE category_id = ?", (cat_id,))
-        conn.commit()
-        conn.close()
+        with self.transaction("categories", "goals") as c:
+            c.execute("DELETE FROM categories WHERE id = ?", (cat_id,))
+            self._changed("categories", "delete", [cat_id])
+            c.execute("UPDATE goals SET category_id = NULL WHERE category_id = ?", (cat_id,))
 
     def save_goal(self, goal: LearningGoal):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute("SELECT 1 FROM goals WHERE id = ?", (goal.id,))
-        exists = c.fetchone()
-        deadline_str = str(goal.deadline) if goal.deadline else None
-        if exists:
-            c.execute(
-                '''UPDATE goals SET title=?, description=?, deadline=?, priority=?, status=?, category_id=?, link=? WHERE id=?''',
-                (goal.title, goal.description, deadline_str,
-                 goal.priority.name, goal.status.name, goal.category_id, goal.link, goal.id))
-        else:
-            c.execute('''INSERT INTO goals VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                      (goal.id, goal.user_id, goal.title, goal.description,
-                       deadline_str, goal.priority.name, goal.status.name,
-                       str(goal.created_at), goal.category_id, goal.link))
-        conn.commit()
-        conn.close()
-
-    def get_goals(self, user_id: str):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute("SELECT * FROM goals WHERE user_id = ? ORDER BY created_at DESC", (user_id,))
-        rows = c.fetchall()
-        goals = []
-        for r in rows:
-            g = LearningGoal(title=r[2], description=r[3])
-            g.id = r[0]
-            g.user_id = r[1]
-            g.deadline = r[4]
-            if r[5] in GoalPriority.__members__: g.priority = GoalPriority[r[5]]
-            if r[6] in GoalStatus.__members__: g.status = GoalStatus[r[6]]
-            if len(r) > 8: g.category_id = r[8]
-            if len(r) > 9: g.link = r[9] if r[9] else ""
-            if r[7]:
-                try:
-                    g.created_at = datetime.fromisoformat(r[7])
-                except:
-                    pass
-            goals.append(g)
-        return goals
+        self.save_goals_many([goal])
+
+    def save_goals_many(self, goals):
+        """Зберігає (вставляє або оновлює) кілька цілей одним executemany."""
+        rows = [(g.id, g.user_id, g.title, g.description,
+                 str(g.deadline) if g.deadline else None, g.priority.name, g.status.name,
+                 str(g.created_at), g.category_id, g.link) for g in goals]
+        if not rows:
+            return
+        with self.transaction("goals") as c:
+            # user_id та created_at при оновленні не змінюються
+            c.executemany('''INSERT INTO goals (id, user_id, title, description, deadline, priority, status, created_at,
+                                   category_id, link)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET title=excluded.title, description=excluded.description,
+                    deadline=excluded.deadline, priority=excluded.priority, status=excluded.status,
+                    category_id=excluded.category_id, link=excluded.link''', rows)
+            self._changed("goals", ids=[r[0] for r in rows])
+
+    GOAL_COLUMNS = ("id, user_id, title, description, deadline, priority, status, created_at, category_id, link, "
+                    "deadline_ts, deadline_all_day")
+    # Ключі сортування: (SQL-вираз, за спаданням?); останній - унікальний id для курсора.
+    # Пріоритет - за рангом, а не за назвою; цілі без дедлайну - в кінці
+    GOAL_SORTS = {
+        "created_at": [("COALESCE(created_at, '')", True), ("id", True)],
+        "deadline": [("COALESCE(deadline_ts, 9223372036854775807)", False),
+                     ("COALESCE(created_at, '')", True), ("id", False)],
+        "priority": [("CASE priority WHEN 'CRITICAL' THEN 0 WHEN 'HIGH' THEN 1 WHEN 'MEDIUM' THEN 2 WHEN 'LOW' THEN 3 ELSE 4 END",
+                      False), ("COALESCE(created_at, '')", True), ("id", True)],
+        # Виконані - в кінці, решта - від нових
+        "status": [("status = 'COMPLETED'", False), ("COALESCE(created_at, '')", True), ("id", True)],
+    }
+
+    def get_goals(self, user_id: str, **criteria):
+        """Цілі користувача; фільтри й сортування - як у get_goals_page (без ліміту за замовчуванням)."""
+        return self.get_goals_page(user_id, **criteria)[0]
+
+    def get_goals_page(self, user_id: str, category_id=None, statuses=None, deadline_from=None, deadline_to=None,
+                       ids=None, sort="created_at", limit=None, after=None):
+        """
+        Фільтрація, сортування (GOAL_SORTS) і посторінкове читання в SQL.
+        statuses - набір GoalStatus; deadline_from/deadline_to - межі моменту дедлайну включно
+        (date, datetime або рядок 'YYYY-MM-DD[ HH:MM]'; дата як верхня межа - до кінця дня),
+        цілі без дедлайну тоді не потрапляють; after - курсор з попереднього виклику.
+        Повертає (цілі, курсор наступної сторінки або None).
+        """
+        where, params = ["user_id = ?"], [user_id]
+        if category_id:
+            where.append("category_id = ?")
+            params.append(category_id)
+        if statuses is not None:
+            self._where_in(where, params, "status", [s.name for s in statuses])
+        # Порівняння з індексованим deadline_ts (міграція _m009), без розбору рядків дедлайну
+        if deadline_from:
+            where.append("deadline_ts >= ?")
+            params.append(self._deadline_ts(deadline_from))
+        if deadline_to:
+            where.append("deadline_ts <= ?")
+            params.append(self._deadline_ts(deadline_to, end_of_day=True))
+        if ids is not None:
+            self._where_in(where, params, "id", ids)
+
+        def load():
+            rows, cursor = self._keyset_page(self.GOAL_COLUMNS, "goals", where, params,
+                                             self.GOAL_SORTS[sort], limit, after)
+            return [self._map_row_to_goal(r) for r in rows], cursor
+
+        # Межі з часом ("зараз" у нагадуваннях і режимі сну) щоразу інші - такий запис не повторився б,
+        # а лише витісняв би з LRU інші результати
+        if self._is_instant(deadline_from) or self._is_instant(deadline_to):
+            return load()
+        return self._cached("goals", user_id, ("goals",), load, category_id=category_id,
+                            statuses=statuses, deadline_from=deadline_from, deadline_to=deadline_to,
+                            ids=ids, sort=sort, limit=limit, after=after)
+
+    @staticmethod
+    def _is_instant(value) -> bool:
+        return isinstance(value, datetime) or (isinstance(value, str) and len(value) > 10)
+
+    def _map_row_to_goal(self, r):
+        g = LearningGoal(title=r[2], description=r[3])
+        g.id = r[0]
+        g.user_id = r[1]
+        g.deadline = r[4]
+        if r[5] in GoalPriority.__members__: g.priority = GoalPriority[r[5]]
+        if r[6] in GoalStatus.__members__: g.status = GoalStatus[r[6]]
+        g.category_id = r[8]
+        g.link = r[9] if r[9] else ""
+        g.deadline_ts = r[10]
+        g.all_day = bool(r[11])
+        if r[7]:
+            try:
+                g.created_at = datetime.fromisoformat(r[7])
+            except:
+                pass
+        return g
+
+    @staticmethod
+    def _deadline_ts(value, end_of_day=False) -> int:
+        """Межа для deadline_ts: секунди настінного часу. Дата без часу - початок або (end_of_day) кінець дня."""
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value) if len(value) > 10 else date.fromisoformat(value)
+        if not isinstance(value, datetime):
+            value = datetime.combine(value, dt_time(23, 59, 59) if end_of_day else dt_time.min)
+        return timegm(value.timetuple())
+
+    def get_deadline_days(self, user_id: str) -> list:
+        """Дні (date), на які припадають дедлайни цілей, - лише з індексу (user_id, deadline_ts)."""
+        def load():
+            c = self._connect().cursor()
+            c.execute("SELECT DISTINCT deadline_ts / 86400 FROM goals WHERE user_id = ? AND deadline_ts IS NOT NULL",
+                      (user_id,))
+            epoch = date(1970, 1, 1)
+            return [epoch + timedelta(days=r[0]) for r in c.fetchall()]
+        return self._cached("deadline_days", user_id, ("goals",), load)
 
     def delete_goal(self, goal_id: str):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute("DELETE FROM goals WHERE id = ?", (goal_id,))
-        c.execute("DELETE FROM subgoals WHERE goal_id = ?", (goal_id,))
-        conn.commit()
-        conn.close()
+        self.delete_goals_many([goal_id])
+
+    def delete_goals_many(self, goal_ids):
+        """Видаляє кілька цілей разом з їхніми підцілями в одній транзакції."""
+        params = [(goal_id,) for goal_id in goal_ids]
+        if not params:
+            return
+        with self.transaction("goals", "subgoals") as c:
+            c.executemany("DELETE FROM goals WHERE id = ?", params)
+            c.executemany("DELETE FROM subgoals WHERE goal_id = ?", params)
+            self._changed("goals", "delete", goal_ids)
+            self._changed("subgoals", "delete")
 
     def save_habit(self, habit: Habit):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute('''INSERT OR REPLACE INTO habits VALUES (?, ?, ?, ?, ?)''',
-                  (habit.id, habit.user_id, habit.title, habit.streak, habit.last_completed_date))
-        conn.commit()
-        conn.close()
+        with self.transaction("habits") as c:
+            # run_length (службова довжина останньої серії) при редагуванні не змінюється
+            c.execute('''INSERT INTO habits (id, user_id, title, streak, last_completed_date, best_streak)
+                         VALUES (?, ?, ?, ?, ?, ?)
+                         ON CONFLICT(id) DO UPDATE SET title=excluded.title, streak=excluded.streak,
+                             last_completed_date=excluded.last_completed_date,
+                             best_streak=MAX(best_streak, excluded.best_streak)''',
+                      (habit.id, habit.user_id, habit.title, habit.streak, habit.last_completed_date,
+                       habit.best_streak))
+            self._changed("habits", ids=[habit.id])
 
     def get_habits(self, user_id: str):
-        conn = sqlite3.connect(self.db_path)
+        return self._cached("habits", user_id, ("habits",), lambda: self._load_habits(user_id))
+
+    def _load_habits(self, user_id: str):
+        conn = self._connect()
         c = conn.cursor()
-        c.execute("SELECT * FROM habits WHERE user_id = ?", (user_id,))
+        c.execute("SELECT id, user_id, title, streak, last_completed_date, best_streak FROM habits WHERE user_id = ?",
+                  (user_id,))
         rows = c.fetchall()
         habits = []
         for r in rows:
@@ -412,99 +974,380 @@ class StorageService:
             h.id = r[0]
             h.streak = r[3]
             h.last_completed_date = r[4]
+            h.best_streak = r[5] or 0
             habits.append(h)
         return habits
 
     def delete_habit(self, habit_id: str):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute("DELETE FROM habits WHERE id = ?", (habit_id,))
-        c.execute("DELETE FROM habit_logs WHERE habit_id = ?", (habit_id,))
-        conn.commit()
-        conn.close()
-
-    def toggle_habit_date(self, habit_id: str, date_str: str) -> bool:
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute("SELECT 1 FROM habit_logs WHERE habit_id = ? AND date = ?", (habit_id, date_str))
-        exists = c.fetchone()
-        is_completed = False
-        if exists:
+        with self.transaction("habits", "habit_logs", "habit_log_bitmaps") as c:
+            c.execute("DELETE FROM habits WHERE id = ?", (habit_id,))
+            c.execute("DELETE FROM habit_logs WHERE habit_id = ?", (habit_id,))
+            c.execute("DELETE FROM habit_log_bitmaps WHERE habit_id = ?", (habit_id,))
+            self._changed("habits", "delete", [habit_id])
+            # Для відміток ids - id звичок
+            self._changed("habit_logs", "delete", [habit_id])
+
+    def toggle_habit_date(self, habit_id: str, date_str: str, habit: Habit = None) -> bool:
+        """
+        Відмічає/знімає відмітку дня. Якщо передано habit, його streak,
+        last_completed_date і best_streak оновлюються на місці (без повторного get_habits).
+        """
+        with self.transaction("habits", "habit_logs", "habit_log_bitmaps") as c:
             c.execute("DELETE FROM habit_logs WHERE habit_id = ? AND date = ?", (habit_id, date_str))
-        else:
-            c.execute("INSERT INTO habit_logs VALUES (?, ?)", (habit_id, date_str))
-            is_completed = True
-        conn.commit()
-        self._recalc_streak(c, habit_id)
-        conn.close()
+            # День міг бути вже стиснутий у бітмапу
+            is_completed = c.rowcount == 0 and not self._unset_bitmap_day(c, habit_id, date_str)
+            if is_completed:
+                c.execute("INSERT INTO habit_logs (habit_id, date) VALUES (?, ?)", (habit_id, date_str))
+            state = self._update_streak(c, habit_id, date_str, is_completed)
+            self._changed("habits", ids=[habit_id])
+            self._changed("habit_logs", ids=[habit_id])
+        if habit is not None and state:
+            habit.streak, habit.last_completed_date, habit.best_streak = state
         return is_completed
 
+    def get_habit_week_matrix(self, user_id: str, start_date: str, end_date: str) -> dict:
+        """
+        Матриця виконання звичок користувача за період одним запитом:
+        {habit_id: bitmask}, де біт i означає, що день start_date + i відмічено.
+        Звички без відміток у період до словника не потрапляють.
+        """
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute('''SELECT l.habit_id, SUM(1 << CAST(julianday(l.date) - julianday(?) AS INTEGER))
+                     FROM habits h JOIN habit_logs l ON l.habit_id = h.id
+                     WHERE h.user_id = ? AND l.date BETWEEN ? AND ?
+                     GROUP BY l.habit_id''', (start_date, user_id, start_date, end_date))
+        matrix = {r[0]: r[1] for r in c.fetchall()}
+
+        c.execute('''SELECT b.habit_id, b.year, b.bits FROM habits h JOIN habit_log_bitmaps b ON b.habit_id = h.id
+                     WHERE h.user_id = ? AND b.year BETWEEN ? AND ?''',
+                  (user_id, int(start_date[:4]), int(end_date[:4])))
+        start = date.fromisoformat(start_date)
+        for habit_id, year, bits in c.fetchall():
+            for d in self._bitmap_dates(year, bits):
+                if start_date <= d <= end_date:
+                    matrix[habit_id] = matrix.get(habit_id, 0) | 1 << (date.fromisoformat(d) - start).days
+        return matrix
+
     def get_habit_logs(self, habit_id: str, start_date: str, end_date: str):
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         c = conn.cursor()
         c.execute("SELECT date FROM habit_logs WHERE habit_id = ? AND date BETWEEN ? AND ?",
                   (habit_id, start_date, end_date))
         rows = c.fetchall()
-        return {r[0] for r in rows}
+        days = {r[0] for r in rows}
+
+        c.execute("SELECT year, bits FROM habit_log_bitmaps WHERE habit_id = ? AND year BETWEEN ? AND ?",
+                  (habit_id, int(start_date[:4]), int(end_date[:4])))
+        for year, bits in c.fetchall():
+            days.update(d for d in self._bitmap_dates(year, bits) if start_date <= d <= end_date)
+        return days
+
+    def _update_streak(self, cursor, habit_id, date_str, added):
+        """
+        Інкрементальне оновлення серій після відмітки/зняття одного дня.
+        Використовує лише збережену останню серію (last_completed_date, run_length)
+        та сусідні дні. Повний перерахунок - тільки коли зміна з'єднує або
+        розриває серії в середині історії чи зменшує рекордну серію.
+        Повертає (streak, last_completed_date, best_streak).
+        """
+        cursor.execute("SELECT last_completed_date, run_length, best_streak FROM habits WHERE id = ?",
+                       (habit_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+
+        def logged(day):
+            cursor.execute("SELECT 1 FROM habit_logs WHERE habit_id = ? AND date = ?",
+                           (habit_id, day.isoformat()))
+            return cursor.fetchone() is not None or self._bitmap_has_day(cursor, habit_id, day)
+
+        last_str, run, best = row[0] or "", row[1] or 0, row[2] or 0
+        day = date.fromisoformat(date_str)
+        one = timedelta(days=1)
+
+        if not last_str:
+            if not added or run:
+                return self._recalc_streak(cursor, habit_id)
+            # Перша відмітка
+            return self._write_streak(cursor, habit_id, date_str, 1, max(best, 1))
+
+        last = date.fromisoformat(last_str)
+        # Збережений стан має відповідати логам, інакше рахуємо з нуля
+        if run <= 0 or (last != day and not logged(last)):
+            return self._recalc_streak(cursor, habit_id)
+        top_start = last - timedelta(days=run - 1)
+
+        if added:
+            if day > last:
+                new_run = run + 1 if day == last + one else 1
+                return self._write_streak(cursor, habit_id, date_str, new_run, max(best, new_run))
+            if day == top_start - one:
+                if logged(day - one):
+                    return self._recalc_streak(cursor, habit_id)  # з'єднання з серією нижче
+                return self._write_streak(cursor, habit_id, last_str, run + 1, max(best, run + 1))
+            if logged(day - one) or logged(day + one):
+                return self._recalc_streak(cursor, habit_id)  # з'єднання серій у середині
+            return self._write_streak(cursor, habit_id, last_str, run, max(best, 1))
+
+        # Зняття відмітки
+        if day == last:
+            if run == 1 or run == best:
+                return self._recalc_streak(cursor, habit_id)
+            return self._write_streak(cursor, habit_id, (last - one).isoformat(), run - 1, best)
+        if top_start <= day < last:
+            if run == best:
+                return self._recalc_streak(cursor, habit_id)
+            return self._write_streak(cursor, habit_id, last_str, (last - day).days, best)
+        if logged(day - one) or logged(day + one):
+            return self._recalc_streak(cursor, habit_id)  # розрив серії в середині
+        # Ізольований день під останньою серією: рекорд не змінюється
+        return self._write_streak(cursor, habit_id, last_str, run, best)
+
+    def _write_streak(self, cursor, habit_id, last_date, run_length, best):
+        # Поточна серія зараховується, лише якщо остання відмітка не старша за вчора
+        yesterday = (date.today() - timedelta(days=1)).isoformat()
+        streak = run_length if last_date and last_date >= yesterday else 0
+        cursor.execute('''UPDATE habits SET streak = ?, last_completed_date = ?, run_length = ?, best_streak = ?
+                          WHERE id = ?''', (streak, last_date, run_length, best, habit_id))
+        return streak, last_date, best
 
     def _recalc_streak(self, cursor, habit_id):
-        cursor.execute("SELECT date FROM habit_logs WHERE habit_id = ? ORDER BY date DESC", (habit_id,))
-        rows = cursor.fetchall()
-        dates = [datetime.strptime(r[0], "%Y-%m-%d").date() for r in rows]
-        if not dates:
-            streak = 0
-            last_date = ""
+        """Повний перерахунок серій звички одним SQL-запитом (без розбору дат у Python)."""
+        cursor.execute('''WITH runs AS (
+                              SELECT MAX(date) AS end_date, COUNT(*) AS len FROM (
+                                  SELECT date, julianday(date) - ROW_NUMBER() OVER (ORDER BY date) AS grp
+                                  FROM habit_log_days WHERE habit_id = ?)
+                              GROUP BY grp)
+                          SELECT end_date, len, (SELECT MAX(len) FROM runs) FROM runs
+                          ORDER BY end_date DESC LIMIT 1''', (habit_id,))
+        row = cursor.fetchone()
+        last_date, run_length, best = row if row else ("", 0, 0)
+        return self._write_streak(cursor, habit_id, last_date, run_length, best)
+
+    def recalc_all_streaks(self) -> dict:
+        """
+        Перераховує серії всіх звичок усіх користувачів за один прохід по відмітках
+        (викликається щодня опівночі, щоб серії "згасали" без дій користувача).
+        Повертає кількість оновлених звичок і тривалість.
+        """
+        started = time.perf_counter()
+        yesterday = (date.today() - timedelta(days=1)).isoformat()
+        with self.transaction("habits") as c:
+            c.execute('''WITH runs AS (
+                                SELECT habit_id, MAX(date) AS end_date, COUNT(*) AS len FROM (
+                                    SELECT habit_id, date,
+                                           julianday(date) - ROW_NUMBER() OVER (PARTITION BY habit_id ORDER BY date) AS grp
+                                    FROM habit_log_days)
+                                GROUP BY habit_id, grp),
+                            ranked AS (
+                                SELECT habit_id, end_date, len,
+                                       MAX(len) OVER (PARTITION BY habit_id) AS best,
+                                       ROW_NUMBER() OVER (PARTITION BY habit_id ORDER BY end_date DESC) AS rn
+                                FROM runs)
+                         UPDATE habits SET
+                             streak = CASE WHEN ranked.end_date >= ? THEN ranked.len ELSE 0 END,
+                             last_completed_date = ranked.end_date,
+                             run_length = ranked.len,
+                             best_streak = ranked.best
+                         FROM ranked
+                         WHERE ranked.habit_id = habits.id AND ranked.rn = 1''', (yesterday,))
+            # rowcount не заповнюється для запитів, що починаються з WITH
+            updated = c.execute("SELECT changes()").fetchone()[0]
+            # Звички без жодної відмітки
+            c.execute('''UPDATE habits SET streak = 0, last_completed_date = '', run_length = 0, best_streak = 0
+                         WHERE NOT EXISTS (SELECT 1 FROM habit_log_days l WHERE l.habit_id = habits.id)
+                           AND (streak != 0 OR run_length != 0 OR COALESCE(last_completed_date, '') != '')''')
+            updated += c.rowcount
+        return {"habits": updated, "seconds": time.perf_counter() - started}
+
+    # Стиснуті відмітки звичок: один бітмап на звичку і рік (див. міграцію _m004)
+
+    BITMAP_BYTES = 46  # 366 днів
+
+    # Діапазонні читання декодують лише бітмапи потрібних років у Python;
+    # представлення habit_log_days - для SQL-перерахунку серій по всій історії
+
+    @staticmethod
+    def _day_bit(day: date):
+        """(рік, номер байта, маска) для дня в бітмапі року."""
+        i = day.timetuple().tm_yday - 1
+        return day.year, i >> 3, 1 << (i & 7)
+
+    @staticmethod
+    def _bitmap_dates(year, bits):
+        """Дати (ISO), відмічені в бітмапі року."""
+        first = date(year, 1, 1)
+        return [(first + timedelta(days=(byte << 3) + bit)).isoformat()
+                for byte, value in enumerate(bits) if value
+                for bit in range(8) if value >> bit & 1]
+
+    def _bitmap_has_day(self, cursor, habit_id, day: date) -> bool:
+        year, byte, mask = self._day_bit(day)
+        cursor.execute("SELECT bits FROM habit_log_bitmaps WHERE habit_id = ? AND year = ?", (habit_id, year))
+        row = cursor.fetchone()
+        return bool(row and row[0][byte] & mask)
+
+    def _unset_bitmap_day(self, cursor, habit_id, date_str) -> bool:
+        """Знімає відмітку дня в бітмапі. Повертає True, якщо день був відмічений."""
+        year, byte, mask = self._day_bit(date.fromisoformat(date_str))
+        cursor.execute("SELECT bits FROM habit_log_bitmaps WHERE habit_id = ? AND year = ?", (habit_id, year))
+        row = cursor.fetchone()
+        if not row or not row[0][byte] & mask:
+            return False
+        bits = bytearray(row[0])
+        bits[byte] &= ~mask
+        if any(bits):
+            cursor.execute("UPDATE habit_log_bitmaps SET bits = ? WHERE habit_id = ? AND year = ?",
+                           (bytes(bits), habit_id, year))
         else:
-            streak = 0
-            current_check = dates[0]
-            if dates[0] >= date.today() - timedelta(days=1):
-                streak = 1
-                for i in range(1, len(dates)):
-                    if dates[i] == current_check - timedelta(days=1):
-                        streak += 1
-                        current_check = dates[i]
-                    else:
-                        break
-            last_date = dates[0].isoformat()
-        cursor.execute("UPDATE habits SET streak = ?, last_completed_date = ? WHERE id = ?",
-                       (streak, last_date, habit_id))
-        cursor.connection.commit()
+            cursor.execute("DELETE FROM habit_log_bitmaps WHERE habit_id = ? AND year = ?", (habit_id, year))
+        # Для рядків habit_logs це робить тригер видалення
+        cursor.execute(f'''INSERT OR REPLACE INTO deleted_rows (table_name, row_id, row_date, user_id, deleted_at)
+                           SELECT 'habit_logs', id, ?, user_id, {NOW_SQL} FROM habits WHERE id = ?''',
+                       (date_str, habit_id))
+        return True
+
+    def _forget_tombstones(self, cursor, log_keys):
+        """Прибирає записи журналу видалень для відміток, які лише перенесено в бітмапи."""
+        cursor.executemany("DELETE FROM deleted_rows WHERE table_name = 'habit_logs' AND row_id = ? AND row_date = ?",
+                           log_keys)
+
+    def _drop_logs_covered_by_bitmaps(self, cursor):
+        """Видаляє рядки habit_logs, дні яких уже є в бітмапах (щоб відмітки не дублювались)."""
+        cursor.execute('''SELECT l.habit_id, l.date, b.bits FROM habit_logs l
+                          JOIN habit_log_bitmaps b
+                            ON b.habit_id = l.habit_id AND b.year = CAST(substr(l.date, 1, 4) AS INTEGER)''')
+        covered = []
+        for habit_id, date_str, bits in cursor.fetchall():
+            _, byte, mask = self._day_bit(date.fromisoformat(date_str))
+            if bits[byte] & mask:
+                covered.append((habit_id, date_str))
+        if covered:
+            cursor.executemany("DELETE FROM habit_logs WHERE habit_id = ? AND date = ?", covered)
+            self._forget_tombstones(cursor, covered)
+
+    def compact_habit_logs(self, keep_days: int = 365) -> dict:
+        """
+        Обслуговування: переносить відмітки, старші за keep_days, з habit_logs
+        у бітмапи по роках. Читання (логи, серії, експорт) бачить обидва сховища.
+        Відмітки, змінені за останні keep_days, лишаються рядками для дельта-експорту.
+        Повертає кількість перенесених рядків, оновлених бітмапів і тривалість.
+        """
+        started = time.perf_counter()
+        cutoff = (date.today() - timedelta(days=keep_days)).isoformat()
+        with self.transaction("habit_logs", "habit_log_bitmaps") as c:
+            c.execute('''SELECT habit_id, date FROM habit_logs
+                         WHERE date < ? AND (updated_at IS NULL OR updated_at < ?)''', (cutoff, cutoff))
+            rows = c.fetchall()
+            bitmaps = {}
+            for habit_id, date_str in rows:
+                year, byte, mask = self._day_bit(date.fromisoformat(date_str))
+                key = (habit_id, year)
+                if key not in bitmaps:
+                    c.execute("SELECT bits FROM habit_log_bitmaps WHERE habit_id = ? AND year = ?", key)
+                    existing = c.fetchone()
+                    bitmaps[key] = bytearray(existing[0] if existing else bytes(self.BITMAP_BYTES))
+                bitmaps[key][byte] |= mask
+            c.executemany('''INSERT INTO habit_log_bitmaps (habit_id, year, bits) VALUES (?, ?, ?)
+                             ON CONFLICT(habit_id, year) DO UPDATE SET bits = excluded.bits''',
+                          [(h, y, bytes(bits)) for (h, y), bits in bitmaps.items()])
+            c.executemany("DELETE FROM habit_logs WHERE habit_id = ? AND date = ?", rows)
+            self._forget_tombstones(c, rows)
+        return {"rows": len(rows), "bitmaps": len(bitmaps), "seconds": time.perf_counter() - started}
 
     def save_subgoal(self, subgoal: SubGoal):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute('''INSERT OR REPLACE INTO subgoals VALUES (?, ?, ?, ?, ?, ?)''',
-                  (subgoal.id, subgoal.goal_id, subgoal.title,
-                   1 if subgoal.is_completed else 0,
-                   subgoal.description,
-                   str(subgoal.created_at)))
-        conn.commit()
-        conn.close()
+        self.save_subgoals_many([subgoal])
+
+    def save_subgoals_many(self, subgoals):
+        """Зберігає кілька підцілей одним executemany."""
+        rows = [(s.id, s.goal_id, s.title, 1 if s.is_completed else 0, s.description, str(s.created_at))
+                for s in subgoals]
+        if not rows:
+            return
+        with self.transaction("subgoals") as c:
+            c.executemany('''INSERT OR REPLACE INTO subgoals (id, goal_id, title, is_completed, description, created_at)
+                             VALUES (?, ?, ?, ?, ?, ?)''', rows)
+            self._changed("subgoals", ids=[r[0] for r in rows])
+
+    def _map_row_to_subgoal(self, r):
+        s = SubGoal(title=r[2], goal_id=r[1])
+        s.id = r[0]
+        s.is_completed = bool(r[3])
+        s.description = r[4] if len(r) > 4 else ""
+        if len(r) > 5 and r[5]:
+            try:
+                s.created_at = datetime.fromisoformat(r[5])
+            except:
+                pass
+        return s
 
     def get_subgoals(self, goal_id: str):
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         c = conn.cursor()
         c.execute("SELECT * FROM subgoals WHERE goal_id = ?", (goal_id,))
-        rows = c.fetchall()
-        subgoals = []
-        for r in rows:
-            s = SubGoal(title=r[2], goal_id=r[1])
-            s.id = r[0]
-            s.is_completed = bool(r[3])
-            s.description = r[4] if len(r) > 4 else ""
-            if len(r) > 5 and r[5]:
-                try:
-                    s.created_at = datetime.fromisoformat(r[5])
-                except:
-                    pass
-            subgoals.append(s)
+        subgoals = [self._map_row_to_subgoal(r) for r in c.fetchall()]
         subgoals.sort(key=lambda x: (x.is_completed, x.created_at))
-        conn.close()
         return subgoals
 
-    def delete_subgoal(self, subgoal_id: str):
-        conn = sqlite3.connect(self.db_path)
+    def get_subgoals_by_goal(self, goal_ids) -> dict:
+        """Підцілі для багатьох цілей за один прохід: {goal_id: [SubGoal, ...]}."""
+        goal_ids = list(goal_ids)
+        result = {goal_id: [] for goal_id in goal_ids}
+        conn = self._connect()
         c = conn.cursor()
-        c.execute("DELETE FROM subgoals WHERE id = ?", (subgoal_id,))
-        conn.commit()
-        conn.close()
\ No newline at end of file
+        # Обмеження SQLite на кількість параметрів - ділимо на частини
+        for i in range(0, len(goal_ids), self.MAX_SQL_PARAMS):
+            chunk = goal_ids[i:i + self.MAX_SQL_PARAMS]
+            placeholders = ','.join(['?'] * len(chunk))
+            c.execute(f"SELECT * FROM subgoals WHERE goal_id IN ({placeholders})", chunk)
+            for r in c.fetchall():
+                result[r[1]].append(self._map_row_to_subgoal(r))
+        for subgoals in result.values():
+            subgoals.sort(key=lambda x: (x.is_completed, x.created_at))
+        return result
+
+    def get_goals_progress(self, user_id: str) -> dict:
+        """Прогрес усіх цілей користувача, порахований у SQL: {goal_id: (total, completed)}."""
+        def load():
+            c = self._connect().cursor()
+            c.execute('''SELECT s.goal_id, COUNT(*), COALESCE(SUM(s.is_completed), 0)
+                         FROM goals g JOIN subgoals s ON s.goal_id = g.id
+                         WHERE g.user_id = ?
+                         GROUP BY s.goal_id''', (user_id,))
+            return {r[0]: (r[1], r[2]) for r in c.fetchall()}
+        return self._cached("goals_progress", user_id, ("goals", "subgoals"), load)
+
+    def delete_subgoal(self, subgoal_id: str):
+        with self.transaction("subgoals") as c:
+            c.execute("DELETE FROM subgoals WHERE id = ?", (subgoal_id,))
+            self._changed("subgoals", "delete", [subgoal_id])
+
+    # Агрегати статистики (таблиця stats_counts, див. міграцію _m008)
+
+    def get_stats_counts(self, user_id: str, *dimensions) -> dict:
+        """
+        Лічильники з матеріалізованих агрегатів: {вимір: {ключ: кількість}} (лише ненульові).
+        Вартість - кілька діапазонних читань первинного ключа, незалежно від кількості даних.
+        """
+        def load():
+            c = self._connect().cursor()
+            counts = {dim: {} for dim in dimensions}
+            for dim in dimensions:
+                c.execute("SELECT key, n FROM stats_counts WHERE user_id = ? AND dimension = ? AND n > 0",
+                          (user_id, dim))
+                counts[dim] = dict(c.fetchall())
+            return counts
+        tables = tuple(table for table, dims in STATS_SOURCES.items() if {d[0] for d in dims} & set(dimensions))
+        return self._cached("stats_counts", user_id, tables, load, dimensions=dimensions)
+
+    def get_courses_avg_progress(self, user_id: str) -> float:
+        """Середня частка пройденого (0..1) серед курсів із заданим обсягом."""
+        def load():
+            c = self._connect().cursor()
+            c.execute('''SELECT amount / n FROM stats_counts
+                         WHERE user_id = ? AND dimension = 'course_progress' AND key = 'rated' AND n > 0''',
+                      (user_id,))
+            row = c.fetchone()
+            return row[0] if row else 0.0
+        return self._cached("courses_avg_progress", user_id, ("courses",), load)
@@ -258,16 +258,19 @@ class AIGoalDialog(QDialog):
                 priority=priority,
                 user_id=self.user_id
             )
-            self.storage.save_goal(new_goal)
-
-            subgoals = data.get("subgoals", [])
-            for sub in subgoals:
-                new_sub = SubGoal(
+            new_subs = [
+                SubGoal(
                     title=sub.get("title", "Step"),
                     description=sub.get("description", ""),
                     goal_id=new_goal.id
                 )
-                self.storage.save_subgoal(new_sub)
+                for sub in data.get("subgoals", [])
+            ]
+
+            # Ціль і всі її кроки - одна транзакція
+            with self.storage.transaction():
+                self.storage.save_goal(new_goal)
+                self.storage.save_subgoals_many(new_subs)
 
             QMessageBox.information(self, "Успіх", "Ціль успішно додана!")
             self.accept()
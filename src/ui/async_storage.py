@@ -0,0 +1,158 @@
+"""
+Асинхронний фасад над StorageService для UI: виклики виконуються у QThreadPool
+(кожен потік пулу має власне з'єднання SQLite), результати повертаються у потік GUI сигналом.
+"""
+import sys
+import threading
+from collections import deque
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QCoreApplication, pyqtSignal
+
+
+class StorageRequest:
+    """Запит до пулу. cancel() відкидає результат, а якщо запит ще в черзі - і сам виклик."""
+
+    def __init__(self, fn, args, kwargs, on_done=None, on_error=None, channel=None, key=None):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.on_done = on_done
+        self.on_error = on_error
+        self.channel = channel
+        self.key = key
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class _Job(QRunnable):
+    def __init__(self, request, finished, storage):
+        super().__init__()
+        self.request = request
+        self.finished = finished
+        self.storage = storage
+
+    def run(self):
+        request = self.request
+        result = error = None
+        if not request.cancelled:
+            # Для профайлера запити підписуються каналом читання або сутністю запису
+            label = request.channel if request.key is None else request.key[0] if isinstance(request.key, tuple) \
+                else request.key
+            try:
+                with self.storage.profile_scope(f"db:{label}"):
+                    result = request.fn(*request.args, **request.kwargs)
+            except Exception as e:
+                error = e
+        self.finished.emit(request, result, error)
+
+
+class _ReleaseConnection(QRunnable):
+    """Закриває з'єднання SQLite потоку пулу, в якому виконується."""
+
+    def __init__(self, storage, barrier):
+        super().__init__()
+        self.storage = storage
+        self.barrier = barrier
+
+    def run(self):
+        try:
+            # Поки всі завдання не дійшли до бар'єра, потоки зайняті - кожне потрапляє у свій потік
+            self.barrier.wait(timeout=5)
+        except threading.BrokenBarrierError:
+            pass
+        finally:
+            self.storage.release_thread_connection()
+
+
+class AsyncStorage(QObject):
+    """
+    read(channel, ...) - читання: новий запит того ж каналу (напр. "quests") робить попередній
+    застарілим, і його результат не доставляється.
+    write(key, ...) - запис: записи з однаковим key (напр. ("courses", course.id)) виконуються
+    по одному в порядку виклику, записи різних сутностей - паралельно.
+    on_done(result) і on_error(exception) викликаються в потоці GUI.
+    """
+    # (запит, результат, виняток) - з потоку пулу в потік GUI
+    _finished = pyqtSignal(object, object, object)
+
+    def __init__(self, storage, max_threads=4, parent=None):
+        super().__init__(parent)
+        self.storage = storage
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        # Потоки пулу не завершуються за простоєм: кожен новий потік відкривав би ще одне з'єднання SQLite.
+        # З'єднання закриваються в shutdown()
+        self.pool.setExpiryTimeout(-1)
+        self._latest = {}  # канал -> останній запит читання
+        self._writes = {}  # key -> черга записів; ключ присутній, поки його запис виконується
+        self._pending = 0
+        self._finished.connect(self._deliver)
+
+    def read(self, channel, fn, *args, on_done=None, on_error=None, **kwargs) -> StorageRequest:
+        previous = self._latest.get(channel)
+        if previous is not None:
+            previous.cancel()
+        request = StorageRequest(fn, args, kwargs, on_done, on_error, channel=channel)
+        self._latest[channel] = request
+        self._start(request)
+        return request
+
+    def write(self, key, fn, *args, on_done=None, on_error=None, **kwargs) -> StorageRequest:
+        request = StorageRequest(fn, args, kwargs, on_done, on_error, key=key)
+        if key in self._writes:
+            self._writes[key].append(request)
+        else:
+            self._writes[key] = deque()
+            self._start(request)
+        return request
+
+    def _start(self, request):
+        self._pending += 1
+        self.pool.start(_Job(request, self._finished, self.storage))
+
+    def _deliver(self, request, result, error):
+        self._pending -= 1
+        if request.key is not None:
+            queue = self._writes[request.key]
+            if queue:
+                self._start(queue.popleft())
+            else:
+                del self._writes[request.key]
+        elif self._latest.get(request.channel) is request:
+            del self._latest[request.channel]
+
+        if request.cancelled:
+            return
+        if error is not None:
+            if request.on_error is not None:
+                request.on_error(error)
+            else:
+                sys.excepthook(type(error), error, error.__traceback__)
+        elif request.on_done is not None:
+            request.on_done(result)
+
+    def wait(self):
+        """Чекає, доки всі запити (разом з чергами записів) виконаються і результати буде доставлено."""
+        while self._pending:
+            self.pool.waitForDone()
+            QCoreApplication.processEvents()
+
+    def shutdown(self):
+        """
+        Скасовує доставку результатів читань, дочікується записів і закриває з'єднання потоків пулу
+        (закриття вікна).
+        """
+        for request in self._latest.values():
+            request.cancel()
+        self.wait()
+        self._release_connections()
+
+    def _release_connections(self):
+        """Закриває з'єднання всіх потоків пулу: по завданню на кожен потік."""
+        count = self.pool.maxThreadCount()
+        barrier = threading.Barrier(count)
+        for _ in range(count):
+            self.pool.start(_ReleaseConnection(self.storage, barrier))
+        self.pool.waitForDone()
@@ -0,0 +1,369 @@
+from PyQt5.QtWidgets import QStyledItemDelegate, QStyle, QStyleOptionButton, QApplication
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QRect, QRectF, QSize, QEvent, pyqtSignal
+from PyQt5.QtGui import QColor, QFont, QFontMetrics, QPainter, QPainterPath, QPen
+from ..models import GoalStatus
+
+STATUS_ICONS = {GoalStatus.COMPLETED: "✅", GoalStatus.IN_PROGRESS: "🟡", GoalStatus.MISSED: "🔴"}
+
+
+def goal_title_text(goal):
+    return f"{STATUS_ICONS.get(goal.status, '🔵')} {goal.title}"
+
+
+class GoalListModel(QAbstractListModel):
+    """
+    Цілі для QListView. Разом із цілями тримає те, що вкладка вантажить одним запитом на список:
+    категорії ({id: Category}) і прогрес ({goal_id: (total, completed)}), а також розгорнуті підцілі.
+    """
+    GoalRole = Qt.UserRole + 1
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.goals = []
+        self.categories = {}
+        self.progress = {}
+        # {goal_id: [SubGoal]} - лише для розгорнутих карток, вантажиться при першому розгортанні
+        self.subgoals = {}
+        self.expanded = set()
+        self.highlighted_id = None
+        self._rows = {}
+        # Лічильники змін (усього списку і рядка): делегат за ними відкидає закешовану розкладку картки
+        self._generation = 0
+        self._revisions = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.goals)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        goal = self.goals[index.row()]
+        if role == self.GoalRole:
+            return goal
+        if role == Qt.DisplayRole:
+            return goal_title_text(goal)
+        return None
+
+    def reset(self, goals=(), categories=None, progress=None):
+        self.beginResetModel()
+        self.goals = list(goals)
+        self._rows = {g.id: row for row, g in enumerate(self.goals)}
+        self.categories = categories if categories is not None else {}
+        self.progress = progress if progress is not None else {}
+        self.subgoals.clear()
+        self.expanded.clear()
+        self.highlighted_id = None
+        self._generation += 1
+        self._revisions.clear()
+        self.endResetModel()
+
+    def append(self, goals):
+        if not goals:
+            return
+        start = len(self.goals)
+        self.beginInsertRows(QModelIndex(), start, start + len(goals) - 1)
+        for goal in goals:
+            self._rows[goal.id] = len(self.goals)
+            self.goals.append(goal)
+        self.endInsertRows()
+
+    def goal(self, row):
+        return self.goals[row]
+
+    def row_of(self, goal_id):
+        return self._rows.get(goal_id)
+
+    def category(self, goal):
+        return self.categories.get(goal.category_id) if goal.category_id else None
+
+    def progress_of(self, goal):
+        return self.progress.get(goal.id, (0, 0))
+
+    def revision(self, goal_id):
+        return self._generation, self._revisions.get(goal_id, 0)
+
+    def update_row(self, row):
+        """Повідомляє вид, що картка змінилась (статус, прогрес, розгортання) і її треба перерахувати."""
+        goal_id = self.goals[row].id
+        self._revisions[goal_id] = self._revisions.get(goal_id, 0) + 1
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+    def set_expanded(self, row, expanded, subgoals=None):
+        goal = self.goals[row]
+        if expanded:
+            self.expanded.add(goal.id)
+            if subgoals is not None:
+                self.subgoals[goal.id] = subgoals
+        else:
+            self.expanded.discard(goal.id)
+        self.update_row(row)
+
+    def set_highlighted(self, goal_id):
+        rows = [self.row_of(i) for i in (self.highlighted_id, goal_id) if i is not None]
+        self.highlighted_id = goal_id
+        for row in rows:
+            if row is not None:
+                self.update_row(row)
+
+
+class GoalCardDelegate(QStyledItemDelegate):
+    """
+    Малює картку цілі: рамка кольору категорії, іконка статусу, прогрес,
+    розгортуваний список підцілей і кнопки. Віджетів на картку немає - QListView просить
+    намалювати лише видимі рядки. Кліки по "кнопках" приходять сигналом actionTriggered(дія, рядок, дані).
+    """
+    actionTriggered = pyqtSignal(str, int, object)
+
+    MARGIN = 5          # половина відстані між картками
+    PADDING = 15
+    SPACING = 10
+    HEADER_BUTTONS = (("link", 30), ("edit", 30), ("delete", 28))
+    BUTTONS = (("open_subgoals", "Підцілі"), ("complete", "Завершити"))
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._fonts_key = None
+        self._layouts = {}
+
+    def invalidate(self):
+        """Скидає кеш розкладок (після перезавантаження списку)."""
+        self._layouts.clear()
+
+    # --- Розкладка ---
+    def _fonts(self, base):
+        """Шрифти картки; перебудовуються лише при зміні базового шрифту."""
+        if self._fonts_key != base.key():
+            def font(px, weight=QFont.Normal):
+                f = QFont(base)
+                f.setPixelSize(px)
+                f.setWeight(weight)
+                return f
+            self.f_title = font(18, QFont.Bold)
+            self.f_category = font(12, QFont.Bold)
+            self.f_text = font(14)
+            self.f_progress = font(11)
+            self.f_details = font(12)
+            self.f_toggle = font(13, QFont.Bold)
+            self.f_button = font(13, QFont.Medium)
+            self.f_icon = font(18, QFont.Bold)
+            self._fonts_key = base.key()
+            self._layouts.clear()
+        return self
+
+    @staticmethod
+    def _wrapped_height(font, width, text):
+        return QFontMetrics(font).boundingRect(0, 0, max(width, 1), 100000, Qt.TextWordWrap, text).height()
+
+    def card_layout(self, model, goal, width, base_font):
+        """Прямокутники елементів картки відносно лівого верхнього кута рядка; кешується до зміни рядка."""
+        self._fonts(base_font)
+        key = (width, model.revision(goal.id))
+        cached = self._layouts.get(goal.id)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        m, p, s = self.MARGIN, self.PADDING, self.SPACING
+        card = QRect(m, m, max(width - 2 * m, 100), 0)
+        left, inner = card.left() + p, card.width() - 2 * p
+        right = left + inner
+        total, _ = model.progress_of(goal)
+        lay = {"card": card, "actions": {}, "subrows": []}
+        y = card.top() + p
+
+        # Заголовок: назва і категорія зліва, кнопки посилання/редагування/видалення справа
+        header = [b for b in self.HEADER_BUTTONS if b[0] != "link" or goal.link]
+        x = right
+        for name, size in reversed(header):
+            x -= size
+            lay["actions"][name] = QRect(x, y, size, size)
+            x -= 5
+        title_w = x - left - 1
+        title_h = self._wrapped_height(self.f_title, title_w, goal_title_text(goal))
+        lay["title"] = QRect(left, y, title_w, title_h)
+        category = model.category(goal)
+        cat_text = f"[{category.name}]" if category else "+ Додати категорію"
+        cat_fm = QFontMetrics(self.f_category)
+        lay["actions"]["category"] = QRect(left, y + title_h + 2, min(cat_fm.horizontalAdvance(cat_text), title_w),
+                                           cat_fm.height())
+        y += max(title_h + 2 + cat_fm.height(), 30) + s
+
+        if goal.description:
+            h = self._wrapped_height(self.f_text, inner, goal.description)
+            lay["description"] = QRect(left, y, inner, h)
+            y += h + 8 + s
+
+        if total:
+            lay["progress"] = QRect(left, y, inner, 16)
+            y += 16 + s
+
+        y += 5
+        details_h = QFontMetrics(self.f_details).height()
+        lay["details"] = QRect(left, y, inner, details_h)
+        y += details_h + s
+
+        if total:
+            toggle_fm = QFontMetrics(self.f_toggle)
+            lay["actions"]["toggle"] = QRect(left, y, toggle_fm.horizontalAdvance(f"▼  Підцілі ({total})") + 8,
+                                             toggle_fm.height() + 4)
+            y += toggle_fm.height() + 4 + s
+            if goal.id in model.expanded:
+                y += 5
+                panel_top, row_y = y, y + 12
+                text_w = inner - 24 - 30
+                for sub in model.subgoals.get(goal.id, []):
+                    h = max(20, self._wrapped_height(self.f_text, text_w, sub.title))
+                    lay["subrows"].append((QRect(left + 12, row_y, 20, 20), QRect(left + 42, row_y, text_w, h), sub))
+                    row_y += h + 8
+                bottom = row_y - 8 if lay["subrows"] else row_y
+                lay["subpanel"] = QRect(left, panel_top, inner, bottom + 12 - panel_top)
+                y = lay["subpanel"].bottom() + 1 + s
+
+        y += 8
+        btn_fm = QFontMetrics(self.f_button)
+        btn_h = btn_fm.height() + 22
+        for name, text in self.BUTTONS:
+            if name == "complete" and goal.status == GoalStatus.COMPLETED:
+                continue
+            w = btn_fm.horizontalAdvance(text) + 30
+            lay["actions"][name] = QRect(left if name == "open_subgoals" else right - w, y, w, btn_h)
+        y += btn_h + p
+
+        card.setBottom(y - 1)
+        lay["height"] = y + m
+        self._layouts[goal.id] = (key, lay)
+        return lay
+
+    def _width(self, option):
+        view = option.widget
+        return view.viewport().width() if view is not None else option.rect.width()
+
+    def sizeHint(self, option, index):
+        lay = self.card_layout(index.model(), index.data(GoalListModel.GoalRole), self._width(option), option.font)
+        return QSize(self._width(option), lay["height"])
+
+    # --- Малювання ---
+    def paint(self, painter, option, index):
+        model = index.model()
+        goal = index.data(GoalListModel.GoalRole)
+        lay = self.card_layout(model, goal, self._width(option), option.font)
+        category = model.category(goal)
+        total, completed = model.progress_of(goal)
+        highlighted = goal.id == model.highlighted_id
+        text_color = QColor("#ffffff" if highlighted else "#e0e0e0")
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.translate(option.rect.topLeft())
+
+        self._rounded(painter, lay["card"], 10, "#1e3a8a" if highlighted else "#1e293b",
+                      "#ea80fc" if highlighted else (category.color if category else "#1e3a8a"), 2)
+
+        painter.setFont(self.f_title)
+        painter.setPen(QColor("white"))
+        painter.drawText(lay["title"], Qt.TextWordWrap | Qt.AlignLeft | Qt.AlignTop, goal_title_text(goal))
+
+        painter.setFont(self.f_category)
+        painter.setPen(QColor(category.color if category else "#60a5fa"))
+        painter.drawText(lay["actions"]["category"], Qt.AlignLeft | Qt.AlignVCenter,
+                         f"[{category.name}]" if category else "+ Додати категорію")
+
+        actions = lay["actions"]
+        if "link" in actions:
+            painter.setPen(QPen(QColor("#1e40af"), 1))
+            painter.setBrush(QColor("#0f172a"))
+            painter.drawEllipse(QRectF(actions["link"]).adjusted(0.5, 0.5, -0.5, -0.5))
+            self._text(painter, actions["link"], "🔗", self.f_details, "#3b82f6")
+        self._text(painter, actions["edit"], "⚙️", self.f_icon, "#94a3b8")
+        self._text(painter, actions["delete"], "✖", self.f_icon, "#ef5350")
+
+        if "description" in lay:
+            painter.setFont(self.f_text)
+            painter.setPen(QColor("#cbd5e1"))
+            painter.drawText(lay["description"], Qt.TextWordWrap | Qt.AlignLeft | Qt.AlignTop, goal.description)
+
+        if "progress" in lay:
+            bar = lay["progress"]
+            self._rounded(painter, bar, 4, "#0f172a", "#1e4976", 1)
+            if completed:
+                chunk = bar.adjusted(1, 1, -1, -1)
+                chunk.setWidth(max(int(chunk.width() * completed / total), 6))
+                self._rounded(painter, chunk, 3, "#2563eb")
+            self._text(painter, bar, f"{completed * 100 // total}% ({completed}/{total})", self.f_progress, "white")
+
+        details = f"Пріоритет: {goal.priority.value}"
+        if goal.deadline:
+            details += f"  |  Дедлайн: {goal.deadline}"
+        painter.setFont(self.f_details)
+        painter.setPen(QColor("#64748b"))
+        painter.drawText(lay["details"], Qt.AlignLeft | Qt.AlignVCenter, details)
+
+        if "toggle" in actions:
+            expanded = goal.id in model.expanded
+            painter.setFont(self.f_toggle)
+            painter.setPen(QColor("#60a5fa" if expanded else "#94a3b8"))
+            painter.drawText(actions["toggle"], Qt.AlignLeft | Qt.AlignVCenter,
+                             f"{'▼' if expanded else '▶'}  Підцілі ({total})")
+
+        if "subpanel" in lay:
+            self._rounded(painter, lay["subpanel"], 8, "#111827")
+            style = option.widget.style() if option.widget is not None else QApplication.style()
+            painter.setFont(self.f_text)
+            for box, text_rect, sub in lay["subrows"]:
+                check = QStyleOptionButton()
+                check.rect = box
+                check.state = QStyle.State_Enabled | (QStyle.State_On if sub.is_completed else QStyle.State_Off)
+                style.drawPrimitive(QStyle.PE_IndicatorCheckBox, check, painter, option.widget)
+                font = QFont(self.f_text)
+                font.setStrikeOut(sub.is_completed)
+                painter.setFont(font)
+                painter.setPen(QColor("#64748b") if sub.is_completed else text_color)
+                painter.drawText(text_rect, Qt.TextWordWrap | Qt.AlignLeft | Qt.AlignVCenter, sub.title)
+
+        for name, text in self.BUTTONS:
+            if name in actions:
+                fill, border = ("#064e3b", "#10b981") if name == "complete" else ("#1e3a8a", "#3b82f6")
+                self._rounded(painter, actions[name], 6, fill, border, 1)
+                self._text(painter, actions[name], text, self.f_button, "white")
+        painter.restore()
+
+    @staticmethod
+    def _rounded(painter, rect, radius, fill, border=None, width=0):
+        path = QPainterPath()
+        inset = width / 2
+        path.addRoundedRect(QRectF(rect).adjusted(inset, inset, -inset, -inset), radius, radius)
+        painter.fillPath(path, QColor(fill))
+        if border:
+            painter.strokePath(path, QPen(QColor(border), width))
+
+    @staticmethod
+    def _text(painter, rect, text, font, color):
+        painter.setFont(font)
+        painter.setPen(QColor(color))
+        painter.drawText(rect, Qt.AlignCenter, text)
+
+    # --- Події миші ---
+    def hit_test(self, model, goal, width, base_font, pos):
+        """Дія під точкою pos (відносно рядка): (назва, дані) або None."""
+        lay = self.card_layout(model, goal, width, base_font)
+        for box, text_rect, sub in lay["subrows"]:
+            if box.contains(pos):
+                return "subgoal", sub
+        for name, rect in lay["actions"].items():
+            if rect.contains(pos):
+                return name, None
+        return None
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() not in (QEvent.MouseButtonRelease, QEvent.MouseMove):
+            return False
+        goal = index.data(GoalListModel.GoalRole)
+        hit = self.hit_test(model, goal, self._width(option), option.font, event.pos() - option.rect.topLeft())
+        if event.type() == QEvent.MouseMove:
+            if option.widget is not None:
+                option.widget.viewport().setCursor(Qt.PointingHandCursor if hit else Qt.ArrowCursor)
+            return False
+        if hit and event.button() == Qt.LeftButton:
+            self.actionTriggered.emit(hit[0], index.row(), hit[1])
+            return True
+        return False
@@ -1,6 +1,6 @@
 from PyQt5.QtWidgets import QMainWindow, QWidget, QHBoxLayout, QVBoxLayout, QPushButton, QStackedWidget, QLabel, QFrame, \
-    QGridLayout, QMessageBox, QFileDialog
-from PyQt5.QtCore import Qt, pyqtSignal
+    QGridLayout, QMessageBox, QFileDialog, QProgressDialog
+from PyQt5.QtCore import Qt, pyqtSignal, QThread
 import json
 
 from src.ui.tabs.quest_tab import QuestTab
@@ -8,18 +8,100 @@ from src.ui.tabs.habit_tab import HabitTab
 from src.ui.tabs.stats_tab import StatsTab
 from src.ui.tabs.calendar_tab import CalendarTab
 from src.ui.tabs.education_tab import DevelopmentTab
+from src.ui.async_storage import AsyncStorage
+
+
+class ExportWorker(QThread):
+    """Потоковий експорт у файл у фоновому потоці."""
+    progress = pyqtSignal(int, int)
+    done = pyqtSignal(int)
+    cancelled = pyqtSignal()
+    error = pyqtSignal(str)
+
+    def __init__(self, storage, user_id, file_path):
+        super().__init__()
+        self.storage = storage
+        self.user_id = user_id
+        self.file_path = file_path
+
+    def run(self):
+        try:
+            written = self.storage.export_user_data_to_file(
+                self.user_id, self.file_path,
+                progress=self.progress.emit,
+                is_cancelled=self.isInterruptionRequested)
+            if written is None:
+                self.cancelled.emit()
+            else:
+                self.done.emit(written)
+        except Exception as e:
+            self.error.emit(str(e))
+        finally:
+            # Потік воркера завершується - його з'єднання не має лишатися відкритим до кінця сесії
+            self.storage.release_thread_connection()
+
+
+class ImportWorker(QThread):
+    """Читання бекапу та імпорт у фоновому потоці."""
+    progress = pyqtSignal(int, int)
+    done = pyqtSignal(int)
+    error = pyqtSignal(str)
+
+    def __init__(self, storage, user_id, file_path):
+        super().__init__()
+        self.storage = storage
+        self.user_id = user_id
+        self.file_path = file_path
+
+    def run(self):
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError("Невірний формат файлу бекапу")
+            imported = self.storage.import_user_data(data, self.user_id, progress=self.progress.emit)
+            self.done.emit(imported)
+        except Exception as e:
+            self.error.emit(str(e))
+        finally:
+            self.storage.release_thread_connection()
 
 
 class MainWindow(QMainWindow):
     # Сигнали для комунікації з main.py
     logout_requested = pyqtSignal()
     sleep_requested = pyqtSignal()  # Новий сигнал
+    # Події змін StorageService (список ChangeEvent); із воркерів доходять у потік GUI через чергу
+    storage_changed = pyqtSignal(object)
+    # Вкладки в порядку кнопок меню: (атрибут, клас). Будуються при першому відкритті,
+    # щоб старт не чекав на запити та побудову невидимих вкладок
+    TABS = (("tab_quests", QuestTab), ("tab_development", DevelopmentTab), ("tab_habits", HabitTab),
+            ("tab_stats", StatsTab), ("tab_calendar", CalendarTab))
 
     def __init__(self, user_id, storage):
         super().__init__()
         self.user_id = user_id
         self.storage = storage
+        # Запити вкладок до БД у фоновому пулі потоків, щоб повільний диск не блокував вікно
+        self.db = AsyncStorage(storage, parent=self)
         self.init_ui()
+        self.storage_changed.connect(self.on_storage_changed)
+        # Зберігаємо посилання: кожне звернення до .emit дає новий об'єкт, і remove його б не знайшов
+        self._storage_listener = self.storage_changed.emit
+        self.storage.add_change_listener(self._storage_listener)
+
+    def closeEvent(self, event):
+        self.storage.remove_change_listener(self._storage_listener)
+        self.db.shutdown()
+        super().closeEvent(event)
+
+    def tabs(self):
+        """Уже побудовані вкладки; ще не відкриті завантажать свіжі дані при першому показі."""
+        return [tab for tab in (getattr(self, attr) for attr, _ in self.TABS) if tab is not None]
+
+    def on_storage_changed(self, events):
+        for tab in self.tabs():
+            tab.on_data_changed(events)
 
     def init_ui(self):
         self.setWindowTitle("Goal Manager Pro")
@@ -174,24 +256,36 @@ class MainWindow(QMainWindow):
         self.stack = QStackedWidget()
         self.stack.setContentsMargins(5, 5, 5, 5)
 
-        self.tab_quests = QuestTab(self.stack, self)
-        self.tab_development = DevelopmentTab(self.stack, self)
-        self.tab_habits = HabitTab(self.stack, self)
-        self.tab_stats = StatsTab(self.stack, self)
-        self.tab_calendar = CalendarTab(self.stack, self)
-
-        self.stack.addWidget(self.tab_quests)
-        self.stack.addWidget(self.tab_development)
-        self.stack.addWidget(self.tab_habits)
-        self.stack.addWidget(self.tab_stats)
-        self.stack.addWidget(self.tab_calendar)
+        # Поки вкладку не відкрили, у стеку стоїть порожня заглушка
+        for attr, _ in self.TABS:
+            setattr(self, attr, None)
+            self.stack.addWidget(QWidget())
+        self.ensure_tab(0)
 
         self.main_layout.addWidget(self.stack)
 
         self.btn_quests.setChecked(True)
         self.stack.setCurrentIndex(0)
 
+    def ensure_tab(self, index):
+        """Повертає вкладку, за потреби будуючи її на місці заглушки (вкладка читає дані в конструкторі)."""
+        attr, tab_class = self.TABS[index]
+        tab = getattr(self, attr)
+        if tab is None:
+            tab = tab_class(self.stack, self)
+            placeholder = self.stack.widget(index)
+            self.stack.insertWidget(index, tab)
+            self.stack.removeWidget(placeholder)
+            placeholder.deleteLater()
+            setattr(self, attr, tab)
+        return tab
+
     def switch_tab(self, index):
+        # Перемальовуємо, лише якщо дані вкладки змінились після попереднього показу
+        with self.storage.profile_scope(self.TABS[index][1].__name__):
+            tab = self.ensure_tab(index)
+            tab.refresh_if_dirty()
+
         self.stack.setCurrentIndex(index)
         self.btn_quests.setChecked(index == 0)
         self.btn_development.setChecked(index == 1)
@@ -199,12 +293,6 @@ class MainWindow(QMainWindow):
         self.btn_stats.setChecked(index == 3)
         self.btn_calendar.setChecked(index == 4)
 
-        if index == 0: self.tab_quests.update_list()
-        if index == 1: self.tab_development.update_list()
-        if index == 2: self.tab_habits.load_data()
-        if index == 3: self.tab_stats.update_charts()
-        if index == 4: self.tab_calendar.highlight_dates()
-
     def confirm_logout(self):
         reply = QMessageBox.question(
             self,
@@ -221,13 +309,42 @@ class MainWindow(QMainWindow):
             self, "Експорт даних", "lgm_backup.json", "JSON Files (*.json);;All Files (*)", options=options
         )
         if file_path:
-            try:
-                data = self.storage.export_user_data(self.user_id)
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, ensure_ascii=False, indent=4)
-                QMessageBox.information(self, "Успіх", "Дані успішно експортовано!")
-            except Exception as e:
-                QMessageBox.critical(self, "Помилка", f"Не вдалося експортувати дані:\n{e}")
+            self.btn_export.setEnabled(False)
+            self.export_progress = QProgressDialog("Експорт даних...", "Скасувати", 0, 100, self)
+            self.export_progress.setWindowTitle("Експорт")
+            self.export_progress.setWindowModality(Qt.WindowModal)
+            self.export_progress.setMinimumDuration(300)
+            self.export_progress.setAutoClose(False)
+            self.export_progress.setAutoReset(False)
+
+            self.export_worker = ExportWorker(self.storage, self.user_id, file_path)
+            self.export_worker.progress.connect(self.on_export_progress)
+            self.export_worker.done.connect(self.on_export_done)
+            self.export_worker.cancelled.connect(self.on_export_cancelled)
+            self.export_worker.error.connect(self.on_export_error)
+            self.export_progress.canceled.connect(self.export_worker.requestInterruption)
+            self.export_worker.start()
+
+    def on_export_progress(self, done, total):
+        if total:
+            self.export_progress.setValue(int(done * 100 / total))
+
+    def _finish_export(self):
+        self.export_progress.canceled.disconnect()
+        self.export_progress.close()
+        self.btn_export.setEnabled(True)
+
+    def on_export_done(self, written):
+        self._finish_export()
+        QMessageBox.information(self, "Успіх", f"Дані успішно експортовано! (записів: {written})")
+
+    def on_export_cancelled(self):
+        self._finish_export()
+        QMessageBox.information(self, "Експорт", "Експорт скасовано.")
+
+    def on_export_error(self, message):
+        self._finish_export()
+        QMessageBox.critical(self, "Помилка", f"Не вдалося експортувати дані:\n{message}")
 
     def import_data(self):
         options = QFileDialog.Options()
@@ -243,12 +360,30 @@ class MainWindow(QMainWindow):
             if reply != QMessageBox.Yes:
                 return
 
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-
-                self.storage.import_user_data(data, self.user_id)
-                QMessageBox.information(self, "Успіх", "Дані успішно імпортовано!")
-                self.switch_tab(self.stack.currentIndex())
-            except Exception as e:
-                QMessageBox.critical(self, "Помилка", f"Не вдалося імпортувати дані:\n{e}")
\ No newline at end of file
+            self.btn_import.setEnabled(False)
+            self.import_progress = QProgressDialog("Імпорт даних...", None, 0, 100, self)
+            self.import_progress.setWindowTitle("Імпорт")
+            self.import_progress.setWindowModality(Qt.WindowModal)
+            self.import_progress.setMinimumDuration(300)
+            self.import_progress.setAutoClose(False)
+
+            self.import_worker = ImportWorker(self.storage, self.user_id, file_path)
+            self.import_worker.progress.connect(self.on_import_progress)
+            self.import_worker.done.connect(self.on_import_done)
+            self.import_worker.error.connect(self.on_import_error)
+            self.import_worker.start()
+
+    def on_import_progress(self, done, total):
+        if total:
+            self.import_progress.setValue(int(done * 100 / total))
+
+    def on_import_done(self, imported):
+        self.import_progress.close()
+        self.btn_import.setEnabled(True)
+        QMessageBox.information(self, "Успіх", f"Дані успішно імпортовано! (записів: {imported})")
+        self.switch_tab(self.stack.currentIndex())
+
+    def on_import_error(self, message):
+        self.import_progress.close()
+        self.btn_import.setEnabled(True)
+        QMessageBox.critical(self, "Помилка", f"Не вдалося імпортувати дані:\n{message}")
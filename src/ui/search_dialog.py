@@ -1,13 +1,18 @@
-import re
+import html
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QLineEdit, QListWidget, QListWidgetItem,
     QLabel, QAbstractItemView, QWidget
 )
 from PyQt5.QtCore import Qt, QSize
-from src.models import LearningGoal, Habit
+from src.models import LearningGoal, Habit, Course
 
 
 class SearchDialog(QDialog):
+    ICONS = {LearningGoal: "🎯", Habit: "🔥", Course: "🎓"}
+    # Види документів пошукового індексу для кожного типу елементів списку
+    KINDS = {LearningGoal: ("goal", "subgoal"), Habit: ("habit",), Course: ("course",)}
+    SEARCH_LIMIT = 100
+
     def __init__(self, parent, items: list, storage):
         super().__init__(parent)
         self.setWindowTitle("Пошук 🔍")
@@ -17,14 +22,9 @@ class SearchDialog(QDialog):
         # Сортування
         self.items = sorted(items, key=lambda x: x.title.lower())
 
-        # Кешування даних
-        self.items_data = []
-        for item in self.items:
-            data = {"item": item, "subgoals": []}
-            # Якщо це Ціль, вантажимо підцілі
-            if isinstance(item, LearningGoal):
-                data["subgoals"] = self.storage.get_subgoals(item.id)
-            self.items_data.append(data)
+        self.items_by_id = {item.id: item for item in self.items}
+        self.user_id = self.items[0].user_id if self.items else None
+        self.kinds = sorted({kind for item in self.items for kind in self.KINDS.get(type(item), ())})
 
         self.selected_goal_id = None  # Використовуємо це поле і для цілей, і для звичок
         self.setup_ui()
@@ -54,62 +54,60 @@ class SearchDialog(QDialog):
         self.list_widget.clear()
         query = text.strip()
 
-        for data in self.items_data:
-            item = data["item"]
-            subgoals = data["subgoals"]
-            match_found = False
-
-            title_html = item.title
-            desc_html = ""
-            found_subs_html = []
-
-            # Перевірка для LearningGoal
-            if isinstance(item, LearningGoal):
-                desc_html = item.description if item.description else ""
-
-            if not query:
-                match_found = True
-            else:
-                hl_t = self._highlight(query, item.title)
-                if hl_t: title_html = hl_t; match_found = True
-
-                if desc_html:
-                    hl_d = self._highlight(query, desc_html)
-                    if hl_d: desc_html = hl_d; match_found = True
-
-                for sub in subgoals:
-                    hl_s = self._highlight(query, sub.title)
-                    if hl_s:
-                        found_subs_html.append(f"• {hl_s}")
-                        match_found = True
-
-            if match_found:
-                list_item = QListWidgetItem()
-                list_item.setData(Qt.UserRole, item.id)
-
-                icon = "🔥" if isinstance(item, Habit) else "🎯"
-                display = f"<div style='font-weight:bold; font-size:15px; color:white;'>{icon} {title_html}</div>"
-                if desc_html: display += f"<div style='color:#94a3b8; font-size:13px;'>{desc_html}</div>"
-                if found_subs_html:
-                    display += f"<div style='color:#a78bfa; font-size:12px; margin-top:4px;'>Знайдено: {', '.join(found_subs_html)}</div>"
-
-                lbl = QLabel(display)
-                lbl.setWordWrap(True)
-                lbl.setTextFormat(Qt.RichText)
-                lbl.setStyleSheet("background: transparent;")
-
-                h = 60 + (20 * len(found_subs_html) if found_subs_html else 0)
-                list_item.setSizeHint(QSize(400, h))
-
-                self.list_widget.addItem(list_item)
-                self.list_widget.setItemWidget(list_item, lbl)
-
-    def _highlight(self, query, text):
-        if not text or not query: return None
-        pattern = re.compile(f"({re.escape(query)})", re.IGNORECASE)
-        if pattern.search(text):
-            return pattern.sub(r'<span style="background-color:#7c3aed; color:white;">\1</span>', text)
-        return None
+        if not query:
+            for item in self.items:
+                self._add_row(item, html.escape(item.title))
+            return
+
+        # Пошук і ранжування - у повнотекстовому індексі БД; тут лише групування за елементом списку
+        hits = self.storage.search(self.user_id, query, limit=self.SEARCH_LIMIT, kinds=self.kinds)
+        found = {}
+        for hit in hits:
+            item = self.items_by_id.get(hit["owner_id"])
+            if item is None:
+                continue
+            entry = found.setdefault(item.id, {"item": item, "title": html.escape(item.title), "desc": "", "subs": []})
+            if hit["kind"] == "subgoal":
+                entry["subs"].append(f"• {self._mark(hit['title'], hit['title_spans'])}")
+                continue
+            if hit["title_spans"]:
+                entry["title"] = self._mark(hit["title"], hit["title_spans"])
+            if hit["snippet_spans"]:
+                entry["desc"] = self._mark(hit["snippet"], hit["snippet_spans"])
+
+        for entry in found.values():
+            self._add_row(entry["item"], entry["title"], entry["desc"], entry["subs"])
+
+    def _add_row(self, item, title_html, desc_html="", found_subs_html=()):
+        list_item = QListWidgetItem()
+        list_item.setData(Qt.UserRole, item.id)
+
+        icon = self.ICONS.get(type(item), "🎯")
+        display = f"<div style='font-weight:bold; font-size:15px; color:white;'>{icon} {title_html}</div>"
+        if desc_html: display += f"<div style='color:#94a3b8; font-size:13px;'>{desc_html}</div>"
+        if found_subs_html:
+            display += f"<div style='color:#a78bfa; font-size:12px; margin-top:4px;'>Знайдено: {', '.join(found_subs_html)}</div>"
+
+        lbl = QLabel(display)
+        lbl.setWordWrap(True)
+        lbl.setTextFormat(Qt.RichText)
+        lbl.setStyleSheet("background: transparent;")
+
+        h = 60 + 20 * len(found_subs_html)
+        list_item.setSizeHint(QSize(400, h))
+
+        self.list_widget.addItem(list_item)
+        self.list_widget.setItemWidget(list_item, lbl)
+
+    def _mark(self, text, spans):
+        """HTML тексту з підсвіченими фрагментами spans [(початок, кінець)] від storage.search."""
+        parts, pos = [], 0
+        for start, end in spans:
+            parts.append(html.escape(text[pos:start]))
+            parts.append(f'<span style="background-color:#7c3aed; color:white;">{html.escape(text[start:end])}</span>')
+            pos = end
+        parts.append(html.escape(text[pos:]))
+        return "".join(parts)
 
     def on_item_clicked(self, item):
         self.selected_goal_id = item.data(Qt.UserRole)
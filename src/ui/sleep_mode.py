@@ -4,6 +4,7 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QLabel, QPushButton,
 from PyQt5.QtCore import QTimer, Qt, QTime, QDate, pyqtSignal, QSize, QPoint
 from PyQt5.QtGui import QColor, QFont, QCursor
 from datetime import datetime, timedelta
+from ..models import GoalStatus
 
 
 class DeadlineItemWidget(QFrame):
@@ -204,31 +205,15 @@ class SleepWindow(QWidget):
 
     def load_deadlines(self):
         self.deadlines_list.clear()
-        goals = self.storage.get_goals(self.user_id)
-        now = datetime.now()
-        limit_date = now + timedelta(days=7)
-
-        valid_goals = []
-        for g in goals:
-            # Фільтруємо завершені або без дедлайну
-            if not g.deadline or g.status.name == "COMPLETED": continue
-            try:
-                # Парсинг дедлайну
-                if len(g.deadline) == 10:
-                    dt = datetime.strptime(g.deadline, "%Y-%m-%d").replace(hour=23, minute=59)
-                else:
-                    dt = datetime.strptime(g.deadline, "%Y-%m-%d %H:%M")
-
-                # Перевірка діапазону
-                if now <= dt <= limit_date:
-                    valid_goals.append((g, dt))
-            except ValueError:
-                continue
-
-        # Сортування
-        valid_goals.sort(key=lambda x: x[1])
-
-        for g, dt in valid_goals:
+        now = datetime.now().replace(second=0, microsecond=0)
+
+        # Незавершені цілі з дедлайном у найближчі 7 днів, відсортовані - діапазонний запит за deadline_ts
+        open_statuses = [s for s in GoalStatus if s != GoalStatus.COMPLETED]
+        valid_goals = self.storage.get_goals(self.user_id, statuses=open_statuses, deadline_from=now,
+                                             deadline_to=now + timedelta(days=7), sort="deadline")
+
+        for g in valid_goals:
+            dt = g.due_at
             item = QListWidgetItem(self.deadlines_list)
             item.setSizeHint(QSize(0, 60))
 
@@ -166,7 +166,7 @@ class SubgoalsDialog(QDialog):
         self.parent_window = parent
 
         # Отримуємо ціль при ініціалізації
-        goals = self.storage.get_goals(self.parent_window.user_id)
+        goals = self.storage.get_goals(self.parent_window.user_id, ids=[goal_id])
         self.goal = next((g for g in goals if g.id == goal_id), None)
         self.selected_widgets = []
 
@@ -349,7 +349,7 @@ class SubgoalsDialog(QDialog):
         if total == 0: return
 
         # Оновлюємо об'єкт цілі з бази даних, щоб уникнути конфліктів
-        goals = self.storage.get_goals(self.parent_window.user_id)
+        goals = self.storage.get_goals(self.parent_window.user_id, ids=[self.goal_id])
         current_goal = next((g for g in goals if g.id == self.goal_id), None)
         if not current_goal: return
         self.goal = current_goal
@@ -404,11 +404,12 @@ class SubgoalsDialog(QDialog):
         if not subgoals_data:
             QMessageBox.information(self, "AI", "Не вдалося згенерувати підцілі.")
             return
+        new_subs = []
         for data in subgoals_data:
             title = data.get('title', 'AI Step') if isinstance(data, dict) else str(data)
             desc = data.get('description', '') if isinstance(data, dict) else ""
-            new_sub = SubGoal(title=title, description=desc, goal_id=self.goal_id)
-            self.storage.save_subgoal(new_sub)
+            new_subs.append(SubGoal(title=title, description=desc, goal_id=self.goal_id))
+        self.storage.save_subgoals_many(new_subs)
         self.update_list()
         QTimer.singleShot(100, self._check_completion_logic)
         QMessageBox.information(self, "Успіх", f"Додано {len(subgoals_data)} кроків!")
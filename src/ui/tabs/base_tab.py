@@ -4,12 +4,21 @@ from PyQt5.QtCore import Qt
 
 class BaseTab(QWidget):
     """
-    Базовий клас для вкладки. Забезпечує скролінг контенту.
+    Базовий клас для вкладки. Забезпечує скролінг контенту,
+    (за setup_paging) підвантаження наступних сторінок при прокрутці донизу
+    та відстеження застарілості: вкладка перемальовується лише після змін у WATCHES.
     """
+    PAGE_SIZE = 30
+    # Відстань до кінця списку (px), з якої підвантажується наступна сторінка
+    LOAD_MORE_MARGIN = 200
+    # Сутності StorageService (ChangeEvent.entity), від яких залежить вміст вкладки
+    WATCHES = frozenset()
 
     def __init__(self, parent=None, main_window=None):
         super().__init__(parent)
         self.mw = main_window
+        # True - дані змінились після останнього перемальовування
+        self.dirty = False
 
         # Основний лейаут вкладки
         self.layout = QVBoxLayout(self)
@@ -40,4 +49,39 @@ class BaseTab(QWidget):
         while self.list_layout.count():
             child = self.list_layout.takeAt(0)
             if child.widget():
-                child.widget().deleteLater()
\ No newline at end of file
+                child.widget().deleteLater()
+
+    def setup_paging(self):
+        """Вмикає посторінкове завантаження: наслідник реалізує load_more() і веде self.next_cursor."""
+        self.next_cursor = None
+        self._loading = False
+        bar = self.scroll_area.verticalScrollBar()
+        bar.valueChanged.connect(self.check_load_more)
+        # Якщо перша сторінка не заповнила екран, прокрутки не буде - довантажуємо одразу
+        bar.rangeChanged.connect(self.check_load_more)
+
+    def check_load_more(self, *args):
+        if self.next_cursor is None or self._loading:
+            return
+        bar = self.scroll_area.verticalScrollBar()
+        if bar.value() >= bar.maximum() - self.LOAD_MORE_MARGIN:
+            self._loading = True
+            try:
+                self.load_more()
+            finally:
+                self._loading = False
+
+    def load_more(self):
+        pass
+
+    def on_data_changed(self, events):
+        if any(e.touches(self.WATCHES) for e in events):
+            self.dirty = True
+
+    def refresh(self):
+        """Перемальовує вкладку; наслідник викликає свій update_list/load_data тощо, що скидають dirty."""
+        self.dirty = False
+
+    def refresh_if_dirty(self):
+        if self.dirty:
+            self.refresh()
@@ -3,10 +3,11 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QCalendarWidget,
 from PyQt5.QtCore import QDate, Qt
 from PyQt5.QtGui import QTextCharFormat, QBrush, QColor
 from .base_tab import BaseTab
-from datetime import datetime
 
 
 class CalendarTab(BaseTab):
+    WATCHES = frozenset({"goals"})
+
     def __init__(self, parent, main_window):
         super().__init__(parent, main_window)
         self.setup_ui()
@@ -142,9 +143,14 @@ class CalendarTab(BaseTab):
 
         self.list_layout.addWidget(content_container)
 
+    def refresh(self):
+        self.highlight_dates()
+
     def highlight_dates(self):
         """Підсвітка дат з дедлайнами (Червоний фон)"""
-        goals = self.mw.storage.get_goals(self.mw.user_id)
+        self.dirty = False
+        # Лише дні з дедлайнами - з індексу, без завантаження цілей
+        days = self.mw.storage.get_deadline_days(self.mw.user_id)
 
         # Створюємо формат: Червоний фон, білий жирний текст
         fmt_deadline = QTextCharFormat()
@@ -155,26 +161,16 @@ class CalendarTab(BaseTab):
         # Скидаємо попередні формати
         self.calendar.setDateTextFormat(QDate(), QTextCharFormat())
 
-        for g in goals:
-            if g.deadline:
-                try:
-                    dt = datetime.strptime(g.deadline, "%Y-%m-%d")
-                    qdate = QDate(dt.year, dt.month, dt.day)
-                    # Застосовуємо формат до дати
-                    self.calendar.setDateTextFormat(qdate, fmt_deadline)
-                except:
-                    pass
+        for day in days:
+            # Застосовуємо формат до дати
+            self.calendar.setDateTextFormat(QDate(day.year, day.month, day.day), fmt_deadline)
 
     def on_date_click(self, qdate):
         self.day_list.clear()
-        selected_str = qdate.toString("yyyy-MM-dd")
-
-        goals = self.mw.storage.get_goals(self.mw.user_id)
-        found_tasks = []
-
-        for g in goals:
-            if g.deadline == selected_str:
-                found_tasks.append(g)
+        # Дедлайни цього дня (і на весь день, і з часом) - за індексом deadline_ts
+        day = qdate.toPyDate()
+        found_tasks = self.mw.storage.get_goals(self.mw.user_id, deadline_from=day, deadline_to=day,
+                                                sort="deadline")
 
         if found_tasks:
             for g in found_tasks:
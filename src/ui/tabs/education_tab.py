@@ -1,6 +1,6 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
                              QProgressBar, QFrame, QSizePolicy, QMessageBox, QComboBox)
-from PyQt5.QtCore import Qt, QTimer, QUrl, pyqtSignal
+from PyQt5.QtCore import Qt, QTimer, QUrl
 from PyQt5.QtGui import QDesktopServices, QCursor
 from .base_tab import BaseTab
 from ..edit_course_dialog import EditCourseDialog
@@ -10,9 +10,6 @@ from ...models import CourseStatus, CourseType
 
 
 class CourseCard(QFrame):
-    # Сигнал, який повідомляє, що картка змінилася і список треба оновити
-    course_changed = pyqtSignal()
-
     def __init__(self, course, parent_tab, topic_name=""):
         super().__init__()
         self.course = course
@@ -181,8 +178,6 @@ class CourseCard(QFrame):
             elif new_val == 0 and self.course.status == CourseStatus.IN_PROGRESS:
                 self.course.status = CourseStatus.PLANNED
 
-            self.parent_tab.mw.storage.save_course(self.course)
-
             # Оновлюємо UI локально
             self.progress_bar.setValue(new_val)
 
@@ -191,9 +186,11 @@ class CourseCard(QFrame):
             sort_mode = self.parent_tab.sort_combo.currentText()
             is_sorting_by_progress = "Прогрес" in sort_mode
 
-            if status_changed or is_sorting_by_progress:
-                # ВАЖЛИВО: Емітимо сигнал, а не викликаємо функцію напряму
-                self.course_changed.emit()
+            # Запис у фоні; кліки по одному курсу зберігаються строго по черзі.
+            # Список перебудовується вже після запису (картку видаляє вкладка, а не її власний слот)
+            tab = self.parent_tab
+            on_done = (lambda _: tab.update_list()) if status_changed or is_sorting_by_progress else None
+            tab.mw.db.write(("courses", self.course.id), tab.mw.storage.save_course, self.course, on_done=on_done)
 
     def edit_course(self):
         dialog = EditCourseDialog(self.parent_tab.mw, user_id=self.course.user_id,
@@ -220,10 +217,21 @@ class CourseCard(QFrame):
 
 
 class DevelopmentTab(BaseTab):
+    # Пункт сортування -> ключ StorageService.COURSE_SORTS
+    SORT_KEYS = {
+        "Статус": "status",
+        "Назва": "title",
+        "Прогрес": "progress",
+        "Дата": "created_at",
+    }
+    WATCHES = frozenset({"courses", "topics"})
+
     def __init__(self, parent, main_window):
         super().__init__(parent, main_window)
         self.pinned_course_id = None
         self.should_highlight = False
+        self._topic_map = {}
+        self.setup_paging()
 
         self.setup_header()
         self.setup_footer()
@@ -316,62 +324,75 @@ class DevelopmentTab(BaseTab):
             if idx >= 0: self.topic_filter.setCurrentIndex(idx)
         self.topic_filter.blockSignals(False)
 
-    def update_list(self):
-        self.clear_list()
+    def current_criteria(self):
+        """Фільтр і ключ сортування (StorageService.COURSE_SORTS) з комбобоксів."""
+        sort_mode = self.sort_combo.currentText()
+        sort = next((key for label, key in self.SORT_KEYS.items() if label in sort_mode), "status")
+        return {"topic_id": self.topic_filter.currentData(), "sort": sort}
 
-        all_courses = self.mw.storage.get_courses(self.mw.user_id)
+    def refresh(self):
+        self.load_topics()
+        self.update_list()
 
-        # Filter
-        topic_id = self.topic_filter.currentData()
-        if topic_id:
-            all_courses = [c for c in all_courses if c.topic_id == topic_id]
+    def update_list(self):
+        self.dirty = False
+        # Читання - у фоновому потоці; новіший виклик відкидає результат попереднього.
+        # Курсор старого списку скидається, щоб прокрутка не підвантажила до нього сторінку
+        self.next_cursor = None
+        self.mw.db.read("courses", self._load_first_page, self.current_criteria(), self.pinned_course_id,
+                        on_done=self._show_first_page)
+
+    def _load_first_page(self, criteria, pinned_course_id):
+        """Виконується в потоці пулу: лише запити до БД, без звернень до віджетів."""
+        storage, user_id = self.mw.storage, self.mw.user_id
+        # Фільтр і сортування виконує база; тут лише перша сторінка, решта - при прокрутці
+        courses, cursor = storage.get_courses_page(user_id, limit=self.PAGE_SIZE, **criteria)
+
+        pinned = []
+        if pinned_course_id:
+            pinned = storage.get_courses(user_id, ids=[pinned_course_id], topic_id=criteria["topic_id"])
+            courses = [c for c in courses if c.id != pinned_course_id]
+
+        topics = storage.get_topics(user_id) if courses or pinned else []
+        return pinned + courses, cursor, {t.id: t.name for t in topics}
+
+    def _show_first_page(self, result):
+        courses, self.next_cursor, self._topic_map = result
+        self.clear_list()
 
-        # Sort
-        sort_mode = self.sort_combo.currentText()
-        if "Назва" in sort_mode:
-            all_courses.sort(key=lambda x: x.title.lower())
-        elif "Прогрес" in sort_mode:
-            all_courses.sort(key=lambda x: (x.completed_units / x.total_units if x.total_units > 0 else 0),
-                             reverse=True)
-        elif "Дата" in sort_mode:
-            all_courses.sort(key=lambda x: x.created_at, reverse=True)
-        else:  # "Статус"
-            all_courses.sort(key=lambda x: x.status != CourseStatus.IN_PROGRESS)
-
-        if not all_courses:
+        if not courses:
             lbl = QLabel("Список порожній")
             lbl.setStyleSheet("color: gray; font-size: 16px; margin-top: 20px;")
             lbl.setAlignment(Qt.AlignCenter)
             self.list_layout.addWidget(lbl)
             return
 
-        topics = self.mw.storage.get_topics(self.mw.user_id)
-        topic_map = {t.id: t.name for t in topics}
+        target_card = self.add_cards(courses)
+        if target_card and self.should_highlight:
+            QTimer.singleShot(100, target_card.highlight_card)
+            self.should_highlight = False
 
-        target_card = None
+    def load_more(self):
+        # До відповіді курсора немає - повторна прокрутка не запитає ту саму сторінку ще раз
+        after, self.next_cursor = self.next_cursor, None
+        self.mw.db.read("courses", self.mw.storage.get_courses_page, self.mw.user_id, limit=self.PAGE_SIZE,
+                        after=after, on_done=self._show_more, **self.current_criteria())
 
-        if self.pinned_course_id:
-            pinned = next((c for c in all_courses if c.id == self.pinned_course_id), None)
-            if pinned:
-                all_courses.remove(pinned)
-                all_courses.insert(0, pinned)
+    def _show_more(self, result):
+        courses, self.next_cursor = result
+        self.add_cards([c for c in courses if c.id != self.pinned_course_id])
 
-        for course in all_courses:
-            t_name = topic_map.get(course.topic_id, "")
+    def add_cards(self, courses):
+        """Додає картки в кінець списку; повертає картку закріпленого матеріалу, якщо він серед courses."""
+        target_card = None
+        for course in courses:
+            t_name = self._topic_map.get(course.topic_id, "")
             card = CourseCard(course, self, topic_name=t_name)
-
-            # ВАЖЛИВО: Підключаємо сигнал через чергу (QueuedConnection)
-            # Це ключ до виправлення крашу 0xC0000409
-            card.course_changed.connect(self.update_list, Qt.QueuedConnection)
-
             self.list_layout.addWidget(card)
 
             if self.pinned_course_id and course.id == self.pinned_course_id:
                 target_card = card
-
-        if target_card and self.should_highlight:
-            QTimer.singleShot(100, target_card.highlight_card)
-            self.should_highlight = False
+        return target_card
 
     def add_course(self):
         current_topic_id = self.topic_filter.currentData()
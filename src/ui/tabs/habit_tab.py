@@ -7,10 +7,11 @@ from datetime import datetime, timedelta
 from .base_tab import BaseTab
 from ..edit_habit_dialog import EditHabitDialog
 from ..search_dialog import SearchDialog
-import sqlite3  # Додано для роботи з БД напряму (видалення)
 
 
 class HabitTab(BaseTab):
+    WATCHES = frozenset({"habits", "habit_logs"})
+
     def __init__(self, parent, main_window):
         super().__init__(parent, main_window)
         self.mw = main_window
@@ -205,11 +206,7 @@ class HabitTab(BaseTab):
 
         if reply == QMessageBox.Yes:
             try:
-                conn = sqlite3.connect(self.mw.storage.db_path)
-                c = conn.cursor()
-                c.execute("DELETE FROM habits WHERE id = ?", (habit.id,))
-                conn.commit()
-                conn.close()
+                self.mw.storage.delete_habit(habit.id)
 
                 self.load_data()
                 QMessageBox.information(self.mw, "Успіх", "Звичку успішно видалено.")
@@ -236,9 +233,24 @@ class HabitTab(BaseTab):
                     self.table.scrollToItem(self.table.item(row, 0))
                     return
 
-    def load_data(self):
-        self.table.setRowCount(0)
+    def _paint_day_cell(self, cell_item, day_date, is_done):
+        """Оформлення клітинки дня (спільне для завантаження та перемикання)."""
+        if is_done:
+            cell_item.setText("✅")
+            cell_item.setBackground(QColor("#064e3b"))
+        elif day_date < QDate.currentDate():
+            cell_item.setText("—")
+            cell_item.setBackground(QColor("#111827"))
+            cell_item.setForeground(QBrush(QColor("#475569")))
+        else:
+            cell_item.setText("")
+            cell_item.setBackground(QColor("#1e293b") if day_date == QDate.currentDate() else QColor("#111827"))
+
+    def refresh(self):
+        self.load_data()
 
+    def load_data(self):
+        self.dirty = False
         sunday = self.monday.addDays(6)
         self.lbl_week_range.setText(f"{self.monday.toString('dd.MM')} - {sunday.toString('dd.MM')}")
 
@@ -250,7 +262,17 @@ class HabitTab(BaseTab):
         headers.append("🔥 Серія")
         self.table.setHorizontalHeaderLabels(headers)
 
-        habits = self.mw.storage.get_habits(self.mw.user_id)
+        # Читання - у фоновому потоці; результат застарілого тижня (швидке гортання) відкидається
+        self.mw.db.read("habits", self._load_week, self.monday.toString("yyyy-MM-dd"),
+                        sunday.toString("yyyy-MM-dd"), on_done=self._show_week)
+
+    def _load_week(self, start_str, end_str):
+        """Виконується в потоці пулу: звички і відмітки всіх звичок за тиждень (один запит, бітова маска на звичку)."""
+        storage, user_id = self.mw.storage, self.mw.user_id
+        return storage.get_habits(user_id), storage.get_habit_week_matrix(user_id, start_str, end_str)
+
+    def _show_week(self, result):
+        habits, week_masks = result
 
         sort_mode = self.sort_combo.currentText()
         if "Назва" in sort_mode:
@@ -258,43 +280,33 @@ class HabitTab(BaseTab):
         else:
             habits.sort(key=lambda h: h.streak, reverse=True)
 
-        start_str = self.monday.toString("yyyy-MM-dd")
-        end_str = self.monday.addDays(6).toString("yyyy-MM-dd")
+        week_days = [self.monday.addDays(i) for i in range(7)]
+        week_strs = [d.toString("yyyy-MM-dd") for d in week_days]
 
-        for row_idx, habit in enumerate(habits):
-            self.table.insertRow(row_idx)
+        name_font = QFont()
+        name_font.setBold(True)
+
+        self.table.setUpdatesEnabled(False)
+        self.table.setRowCount(0)
+        self.table.setRowCount(len(habits))
 
+        for row_idx, habit in enumerate(habits):
             # Name
             name_item = QTableWidgetItem(habit.title)
             name_item.setData(Qt.UserRole, habit)
             name_item.setForeground(QBrush(QColor("white")))
-            font = QFont()
-            font.setBold(True)
-            name_item.setFont(font)
+            name_item.setFont(name_font)
             name_item.setTextAlignment(Qt.AlignLeft | Qt.AlignVCenter)
             self.table.setItem(row_idx, 0, name_item)
 
-            logs = self.mw.storage.get_habit_logs(habit.id, start_str, end_str)
+            mask = week_masks.get(habit.id, 0)
 
             # Days
             for day_idx in range(7):
-                current_date = self.monday.addDays(day_idx)
-                date_str = current_date.toString("yyyy-MM-dd")
-
                 cell_item = QTableWidgetItem()
                 cell_item.setTextAlignment(Qt.AlignCenter)
-
-                if date_str in logs:
-                    cell_item.setText("✅")
-                    cell_item.setBackground(QColor("#064e3b"))
-                else:
-                    if current_date < QDate.currentDate():
-                        cell_item.setText("—")
-                        cell_item.setForeground(QBrush(QColor("#475569")))
-                    elif current_date == QDate.currentDate():
-                        cell_item.setBackground(QColor("#1e293b"))
-
-                cell_item.setData(Qt.UserRole, date_str)
+                self._paint_day_cell(cell_item, week_days[day_idx], bool(mask >> day_idx & 1))
+                cell_item.setData(Qt.UserRole, week_strs[day_idx])
                 self.table.setItem(row_idx, day_idx + 1, cell_item)
 
             # Streak
@@ -303,6 +315,8 @@ class HabitTab(BaseTab):
             streak_item.setForeground(QBrush(QColor("#facc15")))
             self.table.setItem(row_idx, 8, streak_item)
 
+        self.table.setUpdatesEnabled(True)
+
     def on_cell_double_clicked(self, row, col):
         habit_item = self.table.item(row, 0)
         habit = habit_item.data(Qt.UserRole)
@@ -320,30 +334,17 @@ class HabitTab(BaseTab):
                 QMessageBox.warning(self.mw, "Упс!", "Не можна відмічати звички наперед.")
                 return
 
-            is_done = self.mw.storage.toggle_habit_date(habit.id, date_str)
-
-            if is_done:
-                cell_item.setText("✅")
-                cell_item.setBackground(QColor("#064e3b"))
-            else:
-                if target_date < QDate.currentDate():
-                    cell_item.setText("—")
-                    cell_item.setBackground(QColor("#111827"))
-                    cell_item.setForeground(QBrush(QColor("#475569")))
-                else:
-                    cell_item.setText("")
-                    cell_item.setBackground(
-                        QColor("#1e293b") if target_date == QDate.currentDate() else QColor("#111827"))
-
-            updated_habit_list = self.mw.storage.get_habits(self.mw.user_id)
-            new_streak = 0
-            for h in updated_habit_list:
-                if h.id == habit.id:
-                    new_streak = h.streak
-                    break
-
-            streak_item = self.table.item(row, 8)
-            streak_item.setText(f"{new_streak} 🔥")
+            # Запис у фоні, відмітки однієї звички - строго по черзі.
+            # habit оновлюється на місці - перечитувати список звичок не потрібно
+
+            def show(is_done):
+                if self.table.item(row, col) is not cell_item:
+                    return  # таблицю вже перемальовано свіжими даними
+                self._paint_day_cell(cell_item, target_date, is_done)
+                self.table.item(row, 8).setText(f"{habit.streak} 🔥")
+
+            self.mw.db.write(("habits", habit.id), self.mw.storage.toggle_habit_date, habit.id, date_str,
+                             habit=habit, on_done=show)
 
     def add_habit(self):
         dialog = EditHabitDialog(self.mw, user_id=self.mw.user_id, storage=self.mw.storage)
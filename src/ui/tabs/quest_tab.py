@@ -1,7 +1,9 @@
-from PyQt5.QtWidgets import QLabel, QPushButton, QHBoxLayout, QMessageBox, QVBoxLayout, QComboBox
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtWidgets import QLabel, QPushButton, QHBoxLayout, QMessageBox, QVBoxLayout, QComboBox, QListView, \
+    QAbstractItemView, QFrame
+from PyQt5.QtCore import Qt, QTimer, QUrl
+from PyQt5.QtGui import QDesktopServices
 from .base_tab import BaseTab
-from ..cards import QuestCard
+from ..goal_list import GoalListModel, GoalCardDelegate
 from ..edit_goal_dialog import EditGoalDialog
 from ..ai_goal_dialog import AIGoalDialog
 from ..search_dialog import SearchDialog
@@ -9,14 +11,60 @@ from ...models import GoalStatus
 
 
 class QuestTab(BaseTab):
+    # Пункт сортування -> ключ StorageService.GOAL_SORTS
+    SORT_KEYS = {
+        "Дедлайн": "deadline",
+        "Дата створення": "created_at",
+        "Пріоритет": "priority",
+        "Статус": "status",
+    }
+    WATCHES = frozenset({"goals", "subgoals", "categories"})
+
     def __init__(self, parent, main_window):
         super().__init__(parent, main_window)
         self.pinned_goal_id = None
         self.should_highlight = False
+        self.setup_paging()
         self.setup_header()
         self.setup_footer()
         self.update_list()
 
+    def create_scroll_area(self):
+        # Віртуалізований список: модель тримає цілі, делегат малює лише видимі картки,
+        # тож пам'ять і розкладка не ростуть із кожною ціллю, як у віджетів-карток
+        self.model = GoalListModel(self)
+        self.delegate = GoalCardDelegate(self)
+        self.delegate.actionTriggered.connect(self.on_card_action)
+
+        self.list_view = QListView()
+        self.list_view.setModel(self.model)
+        self.list_view.setItemDelegate(self.delegate)
+        self.list_view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.list_view.verticalScrollBar().setSingleStep(20)
+        self.list_view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.list_view.setResizeMode(QListView.Adjust)
+        # Висоти карток рахуються порціями між подіями - довгий список не блокує вікно
+        self.list_view.setLayoutMode(QListView.Batched)
+        self.list_view.setBatchSize(200)
+        self.list_view.setSelectionMode(QAbstractItemView.NoSelection)
+        self.list_view.setFocusPolicy(Qt.NoFocus)
+        self.list_view.setMouseTracking(True)
+        self.list_view.setFrameShape(QFrame.NoFrame)
+        self.list_view.setStyleSheet("QListView { border: none; background: transparent; }")
+        # BaseTab.setup_paging і CalendarTab працюють зі смугою прокрутки через scroll_area
+        self.scroll_area = self.list_view
+        self.layout.addWidget(self.list_view)
+
+        self.empty_label = QLabel("Список порожній")
+        self.empty_label.setStyleSheet("color: gray; font-size: 16px;")
+        self.empty_label.setAlignment(Qt.AlignCenter)
+        self.empty_label.setVisible(False)
+        self.layout.addWidget(self.empty_label)
+
+    def clear_list(self):
+        self.model.reset()
+        self.delegate.invalidate()
+
     def setup_header(self):
         header = QHBoxLayout()
         header.setContentsMargins(10, 10, 10, 0)
@@ -57,18 +105,19 @@ class QuestTab(BaseTab):
         header.addStretch()
         self.layout.insertLayout(0, header)
 
-    def load_categories(self):
+    def load_categories(self, cats):
+        """Оновлює фільтр категорій і повертає словник {id: Category} для карток."""
         current = self.cat_filter.currentData()
         self.cat_filter.blockSignals(True)
         self.cat_filter.clear()
         self.cat_filter.addItem("Всі категорії", None)
-        cats = self.mw.storage.get_categories(self.mw.user_id)
         for c in cats:
             self.cat_filter.addItem(c.name, c.id)
         if current:
             idx = self.cat_filter.findData(current)
             if idx >= 0: self.cat_filter.setCurrentIndex(idx)
         self.cat_filter.blockSignals(False)
+        return {c.id: c for c in cats}
 
     def setup_footer(self):
         footer = QHBoxLayout()
@@ -113,61 +162,177 @@ class QuestTab(BaseTab):
         self.pinned_goal_id = None
         self.update_list()
 
-    def update_list(self):
-        self.load_categories()
-        self.clear_list()
-
-        # База повертає список (за замовчуванням created_at DESC)
-        goals = self.mw.storage.get_goals(self.mw.user_id)
-
-        # Фільтр по категорії
-        cat_id = self.cat_filter.currentData()
-        if cat_id:
-            goals = [g for g in goals if g.category_id == cat_id]
-
-        # Сортування
+    def current_criteria(self):
+        """Фільтр і ключ сортування (StorageService.GOAL_SORTS) з комбобоксів."""
         sort_mode = self.sort_combo.currentText()
+        sort = next((key for label, key in self.SORT_KEYS.items() if label in sort_mode), "created_at")
+        return {"category_id": self.cat_filter.currentData(), "sort": sort}
 
-        if "Дедлайн" in sort_mode:
-            # Спочатку ті, що мають дедлайн (від найближчого), потім без дедлайну
-            goals.sort(key=lambda x: x.deadline if x.deadline else "9999-99-99")
-
-        elif "Пріоритет" in sort_mode:
-            goals.sort(key=lambda x: x.priority.name)
-
-        elif "Статус" in sort_mode:
-            goals.sort(key=lambda x: x.status == GoalStatus.COMPLETED)
+    def refresh(self):
+        self.update_list()
 
-        elif "Дата створення" in sort_mode:
-            # Явно сортуємо за датою створення (нові зверху)
-            # (Хоча база вже так повертає, але для надійності)
-            goals.sort(key=lambda x: x.created_at, reverse=True)
+    def update_list(self):
+        self.dirty = False
+        # Читання - у фоновому потоці; новіший виклик відкидає результат попереднього.
+        # Курсор старого списку скидається, щоб прокрутка не підвантажила до нього сторінку
+        self.next_cursor = None
+        self.mw.db.read("quests", self._load_first_page, self.current_criteria(), self.pinned_goal_id,
+                        on_done=self._show_first_page)
+
+    def _load_first_page(self, criteria, pinned_goal_id):
+        """Виконується в потоці пулу: лише запити до БД, без звернень до віджетів."""
+        storage, user_id = self.mw.storage, self.mw.user_id
+        cats = storage.get_categories(user_id)
+        if criteria["category_id"] not in {c.id for c in cats}:
+            # Вибрану категорію видалено - фільтр скинеться на "Всі категорії"
+            criteria = dict(criteria, category_id=None)
+
+        # Фільтр і сортування виконує база; тут лише перша сторінка, решта - при прокрутці
+        goals, cursor = storage.get_goals_page(user_id, limit=self.PAGE_SIZE, **criteria)
+
+        # Логіка закріплення при пошуку: закріплена ціль - першою, навіть якщо вона на дальшій сторінці
+        pinned = []
+        if pinned_goal_id:
+            pinned = storage.get_goals(user_id, ids=[pinned_goal_id], category_id=criteria["category_id"])
+            goals = [g for g in goals if g.id != pinned_goal_id]
+
+        # Прогрес усіх карток - один агрегатний запит замість get_subgoals на кожну
+        progress = storage.get_goals_progress(user_id) if goals or pinned else {}
+        return cats, pinned + goals, cursor, progress
+
+    def _show_first_page(self, result):
+        cats, goals, self.next_cursor, progress = result
+        self.delegate.invalidate()
+        self.model.reset(categories=self.load_categories(cats), progress=progress)
+        self.list_view.setVisible(bool(goals))
+        self.empty_label.setVisible(not goals)
+
+        target_row = self.add_cards(goals)
+        if target_row is not None and self.should_highlight:
+            QTimer.singleShot(100, lambda: self.highlight_goal(self.pinned_goal_id))
+            self.should_highlight = False
 
-        if not goals:
-            lbl = QLabel("Список порожній")
-            lbl.setStyleSheet("color: gray; font-size: 16px;")
-            lbl.setAlignment(Qt.AlignCenter)
-            self.list_layout.addWidget(lbl)
+    def load_more(self):
+        # До відповіді курсора немає - повторна прокрутка не запитає ту саму сторінку ще раз
+        after, self.next_cursor = self.next_cursor, None
+        self.mw.db.read("quests", self.mw.storage.get_goals_page, self.mw.user_id, limit=self.PAGE_SIZE,
+                        after=after, on_done=self._show_more, **self.current_criteria())
+
+    def _show_more(self, result):
+        goals, self.next_cursor = result
+        self.add_cards([g for g in goals if g.id != self.pinned_goal_id])
+
+    def add_cards(self, goals):
+        """Додає цілі в кінець списку; повертає рядок закріпленої цілі, якщо вона серед goals."""
+        self.model.append(goals)
+        if self.pinned_goal_id and any(g.id == self.pinned_goal_id for g in goals):
+            return self.model.row_of(self.pinned_goal_id)
+        return None
+
+    def highlight_goal(self, goal_id):
+        """Підсвічує картку цілі на 1.5 с."""
+        self.model.set_highlighted(goal_id)
+        QTimer.singleShot(1500, lambda: self._reset_highlight(goal_id))
+
+    def _reset_highlight(self, goal_id):
+        # Список могли перезавантажити або підсвітити іншу ціль - тоді нічого не чіпаємо
+        if self.model.highlighted_id == goal_id:
+            self.model.set_highlighted(None)
+
+    # --- Дії картки (кліки, які делегат передає через actionTriggered) ---
+    def on_card_action(self, action, row, payload):
+        goal = self.model.goal(row)
+        if action == "toggle":
+            self.toggle_subgoals(row)
+        elif action == "subgoal":
+            self.toggle_subgoal(row, payload)
+        elif action == "link":
+            QDesktopServices.openUrl(QUrl(goal.link))
+        elif action == "category":
+            self.open_quick_category(goal)
+        elif action == "edit":
+            self.edit_goal(goal)
+        elif action == "delete":
+            self.confirm_delete(goal)
+        elif action == "open_subgoals":
+            self.open_subgoals(goal)
+        elif action == "complete":
+            self.force_complete_goal(goal)
+
+    def toggle_subgoals(self, row):
+        goal = self.model.goal(row)
+        if goal.id in self.model.expanded:
+            self.model.set_expanded(row, False)
             return
+        # Список підцілей вантажиться лише при першому розгортанні
+        subgoals = None if goal.id in self.model.subgoals else self.mw.storage.get_subgoals(goal.id)
+        self.model.set_expanded(row, True, subgoals)
+
+    def toggle_subgoal(self, row, subgoal):
+        goal = self.model.goal(row)
+        subgoal.is_completed = not subgoal.is_completed
+        self.mw.storage.save_subgoal(subgoal)
+        subgoals = self.model.subgoals[goal.id]
+        self.model.progress[goal.id] = (len(subgoals), sum(1 for s in subgoals if s.is_completed))
+        self._check_completion_logic(goal)
+        self.model.update_row(row)
+
+    def _check_completion_logic(self, goal):
+        total, completed = self.model.progress_of(goal)
+        if total == 0: return
+        storage = self.mw.storage
+        user = storage.get_user_by_id(goal.user_id)
+        if not user: return
+        if completed == total:
+            new_status = GoalStatus.COMPLETED
+        elif completed > 0:
+            new_status = GoalStatus.IN_PROGRESS
+        else:
+            new_status = GoalStatus.PLANNED
+        if new_status != goal.status:
+            if new_status == GoalStatus.COMPLETED:
+                user.total_completed_goals += 1
+                storage.update_user_stats(user.id, user.total_completed_goals)
+            elif goal.status == GoalStatus.COMPLETED and user.total_completed_goals > 0:
+                user.total_completed_goals -= 1
+                storage.update_user_stats(user.id, user.total_completed_goals)
+            goal.status = new_status
+            storage.save_goal(goal)
+
+    def open_quick_category(self, goal):
+        from ..quick_category_dialog import QuickCategoryDialog
+        dialog = QuickCategoryDialog(self.mw, goal.user_id, self.mw.storage)
+        if dialog.exec_() and dialog.selected_category_id:
+            goal.category_id = dialog.selected_category_id
+            self.mw.storage.save_goal(goal)
+            self.update_list()
 
-        target_card = None
+    def force_complete_goal(self, goal):
+        goal.status = GoalStatus.COMPLETED
+        self.mw.storage.save_goal(goal)
+        user = self.mw.storage.get_user_by_id(goal.user_id)
+        if user:
+            user.total_completed_goals += 1
+            self.mw.storage.update_user_stats(user.id, user.total_completed_goals)
+        self.update_list()
 
-        # Логіка закріплення при пошуку
-        if self.pinned_goal_id:
-            pinned_goal = next((g for g in goals if g.id == self.pinned_goal_id), None)
-            if pinned_goal:
-                goals.remove(pinned_goal)
-                goals.insert(0, pinned_goal)
+    def confirm_delete(self, goal):
+        reply = QMessageBox.question(self, 'Видалення', f"Видалити '{goal.title}'?",
+                                     QMessageBox.Yes | QMessageBox.No)
+        if reply == QMessageBox.Yes:
+            self.mw.storage.delete_goal(goal.id)
+            self.update_list()
 
-        for goal in goals:
-            card = QuestCard(goal, self)
-            self.list_layout.addWidget(card)
-            if self.pinned_goal_id and goal.id == self.pinned_goal_id:
-                target_card = card
+    def open_subgoals(self, goal):
+        from ..subgoals_dialog import SubgoalsDialog
+        dialog = SubgoalsDialog(self.mw, goal.id, self.mw.storage)
+        if dialog.exec_():
+            self.update_list()
 
-        if target_card and self.should_highlight:
-            QTimer.singleShot(100, target_card.highlight_card)
-            self.should_highlight = False
+    def edit_goal(self, goal):
+        dialog = EditGoalDialog(self.mw, user_id=goal.user_id, storage=self.mw.storage, goal=goal)
+        if dialog.exec_():
+            self.update_list()
 
     def add_goal(self):
         dialog = EditGoalDialog(self.mw, user_id=self.mw.user_id, storage=self.mw.storage)
@@ -197,8 +362,7 @@ class QuestTab(BaseTab):
                 QTimer.singleShot(100, lambda: self.scroll_area.verticalScrollBar().setValue(0))
 
     def auto_cleanup(self):
-        goals = self.mw.storage.get_goals(self.mw.user_id)
-        completed_goals = [g for g in goals if g.status == GoalStatus.COMPLETED]
+        completed_goals = self.mw.storage.get_goals(self.mw.user_id, statuses=[GoalStatus.COMPLETED])
 
         if not completed_goals:
             QMessageBox.information(self.mw, "Автовидалення", "Немає виконаних цілей.")
@@ -210,7 +374,6 @@ class QuestTab(BaseTab):
                                      QMessageBox.Yes | QMessageBox.No)
 
         if reply == QMessageBox.Yes:
-            for g in completed_goals:
-                self.mw.storage.delete_goal(g.id)
+            self.mw.storage.delete_goals_many([g.id for g in completed_goals])
             self.pinned_goal_id = None
             self.update_list()
\ No newline at end of file
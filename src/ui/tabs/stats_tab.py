@@ -2,14 +2,12 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTabWidg
                              QFrame, QGridLayout, QSizePolicy)
 from PyQt5.QtCore import Qt
 from .base_tab import BaseTab
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-import matplotlib.pyplot as plt
-from datetime import datetime, date
+from datetime import date
 from collections import Counter
 import warnings
 
 # Імпорти моделей
-from ...models import GoalStatus, CourseStatus, CourseType
+from ...models import LearningGoal, GoalStatus, GoalPriority, CourseStatus, CourseType
 
 # Налаштування кольорів
 BG_DARK = '#0b0f19'
@@ -18,29 +16,54 @@ TEXT_MAIN = '#e0e0e0'
 TEXT_SUB = '#94a3b8'
 BORDER = '#1e3a8a'
 
-# Глобальний стиль matplotlib
-plt.style.use('dark_background')
-plt.rcParams.update({
-    'axes.facecolor': BG_CARD,
-    'figure.facecolor': BG_CARD,
-    'text.color': TEXT_MAIN,
-    'axes.labelcolor': TEXT_SUB,
-    'xtick.color': TEXT_SUB,
-    'ytick.color': TEXT_SUB,
-    'font.size': 10,
-    'axes.grid': False,
-    'axes.spines.top': False,
-    'axes.spines.right': False,
-    'axes.spines.bottom': False,
-    'axes.spines.left': False
-})
+# matplotlib (~0.7 с імпорту) вантажиться при створенні першої StatsTab, а не на старті програми
+plt = None
+FigureCanvas = None
+
+
+def _load_matplotlib():
+    global plt, FigureCanvas
+    if plt is not None:
+        return
+    from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
+    import matplotlib.pyplot as pyplot
+
+    # Глобальний стиль matplotlib
+    pyplot.style.use('dark_background')
+    pyplot.rcParams.update({
+        'axes.facecolor': BG_CARD,
+        'figure.facecolor': BG_CARD,
+        'text.color': TEXT_MAIN,
+        'axes.labelcolor': TEXT_SUB,
+        'xtick.color': TEXT_SUB,
+        'ytick.color': TEXT_SUB,
+        'font.size': 10,
+        'axes.grid': False,
+        'axes.spines.top': False,
+        'axes.spines.right': False,
+        'axes.spines.bottom': False,
+        'axes.spines.left': False
+    })
+    plt, FigureCanvas = pyplot, FigureCanvasQTAgg
+
+
+def enum_counts(enum, counts, default):
+    """{назва: n} з get_stats_counts -> {член enum: n}; невідомі назви ('' чи NULL з імпорту) - у default,
+    як у StorageService._map_row_to_goal і _map_row_to_course."""
+    result = Counter()
+    for name, n in counts.items():
+        result[enum[name] if name in enum.__members__ else default] += n
+    return result
 
 
 class StatsTab(BaseTab):
+    WATCHES = frozenset({"goals", "subgoals", "categories", "habits", "habit_logs", "courses", "topics"})
+
     def __init__(self, parent, main_window):
         super().__init__(parent, main_window)
         self.mw = main_window
         warnings.filterwarnings("ignore")
+        _load_matplotlib()
 
         # Налаштування скролу з базового класу
         if hasattr(self, 'scroll_area'):
@@ -106,7 +129,11 @@ class StatsTab(BaseTab):
         self.dev_layout.setSpacing(30)
         self.dev_layout.setContentsMargins(0, 20, 0, 20)
 
+    def refresh(self):
+        self.update_charts()
+
     def update_charts(self):
+        self.dirty = False
         self._clear_layout(self.goals_layout)
         self._clear_layout(self.habits_layout)
         self._clear_layout(self.dev_layout)
@@ -127,15 +154,19 @@ class StatsTab(BaseTab):
 
     # --- GOALS ---
     def render_goals_stats(self):
-        goals = self.mw.storage.get_goals(self.mw.user_id)
-
-        if not goals:
+        # Лічильники підтримуються тригерами в БД - цілі не завантажуються
+        stats = self.mw.storage.get_stats_counts(self.mw.user_id, "goal_status", "goal_priority",
+                                                 "goal_category", "goal_deadline_month")
+        # Невідомі значення - у типовий статус/пріоритет моделі, як у StorageService._map_row_to_goal
+        s_counts = enum_counts(GoalStatus, stats["goal_status"], LearningGoal.status)
+        total = sum(s_counts.values())
+
+        if not total:
             self.goals_layout.addWidget(QLabel("Немає даних", alignment=Qt.AlignCenter))
             return
 
-        total = len(goals)
-        completed = sum(1 for g in goals if g.status == GoalStatus.COMPLETED)
-        in_progress = sum(1 for g in goals if g.status == GoalStatus.IN_PROGRESS)
+        completed = s_counts[GoalStatus.COMPLETED]
+        in_progress = s_counts[GoalStatus.IN_PROGRESS]
         rate = int((completed / total) * 100) if total > 0 else 0
 
         # KPI
@@ -155,17 +186,17 @@ class StatsTab(BaseTab):
         colors = ["#4ade80", "#facc15", "#94a3b8"]
         grid.addWidget(self.create_chart_box("Статус виконання", self.plot_pie(counts, labels, colors)), 0, 0)
 
-        p_counts = Counter(g.priority.value for g in goals)
+        p_counts = enum_counts(GoalPriority, stats["goal_priority"], LearningGoal.priority)
         p_labels = ["Низький", "Середній", "Високий", "Критичний"]
-        p_vals = [p_counts.get(l, 0) for l in p_labels]
+        p_vals = [p_counts[GoalPriority(l)] for l in p_labels]
         grid.addWidget(self.create_chart_box("Пріоритети", self.plot_bar(p_labels, p_vals, "#8b5cf6")), 0, 1)
 
         cats = self.mw.storage.get_categories(self.mw.user_id)
         cat_map = {c.id: (c.name, c.color) for c in cats}
         c_counts = Counter()
-        for g in goals:
-            name = cat_map[g.category_id][0] if g.category_id and g.category_id in cat_map else "Без категорії"
-            c_counts[name] += 1
+        for cat_id, n in stats["goal_category"].items():
+            name = cat_map[cat_id][0] if cat_id in cat_map else "Без категорії"
+            c_counts[name] += n
 
         c_labels = list(c_counts.keys())
         c_vals = list(c_counts.values())
@@ -178,14 +209,7 @@ class StatsTab(BaseTab):
 
         grid.addWidget(self.create_chart_box("Категорії", self.plot_donut(c_vals, c_labels, c_colors)), 1, 0)
 
-        dates = []
-        for g in goals:
-            if g.deadline:
-                try:
-                    dates.append(datetime.strptime(g.deadline, "%Y-%m-%d").strftime("%Y-%m"))
-                except:
-                    pass
-        d_counts = Counter(dates)
+        d_counts = {month: n for month, n in stats["goal_deadline_month"].items() if month}
         d_labels = sorted(d_counts.keys())[-6:]
         d_vals = [d_counts[d] for d in d_labels]
         grid.addWidget(self.create_chart_box("Дедлайни (6 міс)", self.plot_line(d_labels, d_vals, "#f472b6")), 1, 1)
@@ -201,7 +225,7 @@ class StatsTab(BaseTab):
             return
 
         total = len(habits)
-        best = max((h.streak for h in habits), default=0)
+        best = max((h.best_streak for h in habits), default=0)
         today = date.today().isoformat()
         done = sum(1 for h in habits if h.last_completed_date == today)
 
@@ -228,23 +252,19 @@ class StatsTab(BaseTab):
 
     # --- DEVELOPMENT (NEW) ---
     def render_development_stats(self):
-        courses = self.mw.storage.get_courses(self.mw.user_id)
+        storage = self.mw.storage
+        stats = storage.get_stats_counts(self.mw.user_id, "course_status", "course_type", "course_topic")
+        s_counts = enum_counts(CourseStatus, stats["course_status"], CourseStatus.PLANNED)
+        total = sum(s_counts.values())
 
-        if not courses:
+        if not total:
             self.dev_layout.addWidget(QLabel("Немає даних", alignment=Qt.AlignCenter))
             return
 
-        total = len(courses)
-        completed = sum(1 for c in courses if c.status == CourseStatus.COMPLETED)
+        completed = s_counts.get(CourseStatus.COMPLETED, 0)
 
         # Середній прогрес
-        total_p = 0
-        valid = 0
-        for c in courses:
-            if c.total_units > 0:
-                total_p += (c.completed_units / c.total_units)
-                valid += 1
-        avg_rate = int((total_p / valid) * 100) if valid > 0 else 0
+        avg_rate = int(storage.get_courses_avg_progress(self.mw.user_id) * 100)
 
         # KPI
         kpi_row = QHBoxLayout()
@@ -259,19 +279,18 @@ class StatsTab(BaseTab):
         grid.setSpacing(20)
 
         # 1. Status
-        s_counts = Counter(c.status for c in courses)
         s_labels = ["В процесі", "Заплановано", "Завершено", "Закинуто"]
         s_vals = [
-            s_counts[CourseStatus.IN_PROGRESS],
-            s_counts[CourseStatus.PLANNED],
-            s_counts[CourseStatus.COMPLETED],
-            s_counts[CourseStatus.DROPPED]
+            s_counts.get(CourseStatus.IN_PROGRESS, 0),
+            s_counts.get(CourseStatus.PLANNED, 0),
+            s_counts.get(CourseStatus.COMPLETED, 0),
+            s_counts.get(CourseStatus.DROPPED, 0)
         ]
         s_colors = ["#38bdf8", "#94a3b8", "#4ade80", "#ef4444"]
         grid.addWidget(self.create_chart_box("Статус", self.plot_donut(s_vals, s_labels, s_colors)), 0, 0)
 
         # 2. Types
-        t_counts = Counter(c.course_type.value for c in courses)
+        t_counts = {t.value: n for t, n in enum_counts(CourseType, stats["course_type"], CourseType.COURSE).items()}
         t_labels = list(t_counts.keys())
         t_vals = list(t_counts.values())
         grid.addWidget(self.create_chart_box("Типи контенту", self.plot_pie(t_vals, t_labels,
@@ -281,7 +300,7 @@ class StatsTab(BaseTab):
         # 3. Top Topics
         topics = self.mw.storage.get_topics(self.mw.user_id)
         t_map = {t.id: t.name for t in topics}
-        top_counts = Counter(c.topic_id for c in courses)
+        top_counts = Counter(stats["course_topic"])
 
         # Top 5
         top_5 = top_counts.most_common(5)
@@ -291,9 +310,7 @@ class StatsTab(BaseTab):
         grid.addWidget(self.create_chart_box("Топ тем", self.plot_bar(top_labels, top_vals, "#c084fc")), 1, 0)
 
         # 4. Active Progress
-        active = [c for c in courses if c.status == CourseStatus.IN_PROGRESS]
-        active.sort(key=lambda x: (x.completed_units / x.total_units) if x.total_units else 0, reverse=True)
-        active = active[:5]
+        active = storage.get_courses(self.mw.user_id, statuses=[CourseStatus.IN_PROGRESS], sort="progress", limit=5)
 
         a_labels = [c.title[:15] + ".." if len(c.title) > 15 else c.title for c in active]
         a_vals = [int((c.completed_units / c.total_units) * 100) if c.total_units else 0 for c in active]
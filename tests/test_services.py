@@ -1,10 +1,16 @@
 import unittest
 import os
+import gzip
+import shutil
+import tempfile
 from unittest.mock import MagicMock, patch
 from src.logic.auth import AuthService
 from src.logic.ai_service import AIService
+from src.logic.backup_service import BackupService
 from src.logic.notification_service import NotificationService
-from src.models import User, LearningGoal, GoalPriority
+from src.migrations import SCHEMA_VERSION
+from src.storage import StorageService
+from src.models import User, LearningGoal, GoalPriority, Category
 
 
 class TestServices(unittest.TestCase):
@@ -56,6 +62,68 @@ class TestServices(unittest.TestCase):
         service.check_deadlines()
         mock_notify.notify.assert_called()
 
+    def test_streak_refresh_jobs_scheduled(self):
+        service = NotificationService(self.mock_storage, "u1")
+        self.mock_storage.recalc_all_streaks.return_value = {"habits": 3, "seconds": 0.001}
+        service.start()
+        try:
+            job = service.scheduler.get_job('streak_rollover')
+            self.assertIsNotNone(job)
+            self.assertEqual(str(job.trigger.fields[job.trigger.FIELD_NAMES.index('hour')]), '0')
+        finally:
+            service.stop()
+
+        self.assertEqual(service.refresh_streaks()["habits"], 3)
+
+    # --- BACKUP SERVICE ---
+    def _make_backup_service(self, keep=3):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        storage = StorageService(os.path.join(tmp, "app.db"))
+        self.addCleanup(storage.close)
+        return storage, BackupService(storage, keep=keep)
+
+    def test_backup_and_restore(self):
+        storage, backups = self._make_backup_service()
+        storage.save_category(Category(name="Було", user_id="u1"))
+        manifest = backups.create_backup()
+
+        self.assertEqual(manifest["schema_version"], SCHEMA_VERSION)
+        self.assertEqual(manifest["row_counts"]["categories"], 1)
+        self.assertLess(manifest["compressed_size"], manifest["size"])
+        self.assertEqual([m["name"] for m in backups.list_backups()], [manifest["name"]])
+
+        storage.save_category(Category(name="Стало", user_id="u1"))
+        self.assertEqual(len(storage.get_categories("u1")), 2)
+        backups.restore_backup(manifest["name"])
+        self.assertEqual([c.name for c in storage.get_categories("u1")], ["Було"])
+
+    def test_restore_rejects_corrupted_backup(self):
+        storage, backups = self._make_backup_service()
+        manifest = backups.create_backup()
+        storage.save_category(Category(name="Поточна", user_id="u1"))
+
+        with gzip.open(os.path.join(backups.backup_dir, manifest["file"]), 'wb') as f:
+            f.write(b"not a database")
+        with self.assertRaises(ValueError):
+            backups.restore_backup(manifest["name"])
+        self.assertEqual(len(storage.get_categories("u1")), 1)
+
+    def test_backup_rotation_and_schedule(self):
+        storage, backups = self._make_backup_service(keep=2)
+        names = [backups.create_backup()["name"] for _ in range(4)]
+        self.assertEqual([m["name"] for m in backups.list_backups()], names[:-3:-1])
+        self.assertEqual(len(os.listdir(backups.backup_dir)), 4)
+        # Свіжа копія вже є
+        self.assertIsNone(backups.backup_if_due())
+
+        service = NotificationService(storage, "u1", backup_service=backups)
+        service.start()
+        try:
+            self.assertIsNotNone(service.scheduler.get_job('auto_backup'))
+        finally:
+            service.stop()
+
     # --- AI SERVICE ---
     @patch('src.logic.ai_service.genai')
     def test_ai_parsing_and_generation(self, mock_genai):
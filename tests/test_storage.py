@@ -1,11 +1,45 @@
+import importlib.util
 import unittest
+import json
 import os
+import random
 import shutil
 import sqlite3
+import threading
 import time
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
 from src.storage import StorageService
-from src.models import User, LearningGoal, Habit, SubGoal, Category, Topic, Course, CourseType
+from src.migrations import SCHEMA_VERSION, get_schema_version
+from src.datagen import DatasetSpec, generate_dataset
+from src.models import User, LearningGoal, Habit, SubGoal, Category, Topic, Course, CourseType, ChangeEvent
+
+
+def reference_streak(dates):
+    """Початковий (повний) алгоритм підрахунку серії - еталон для порівняння."""
+    dates = sorted(dates, reverse=True)
+    if not dates:
+        return 0, ""
+    streak = 0
+    current_check = dates[0]
+    if dates[0] >= date.today() - timedelta(days=1):
+        streak = 1
+        for d in dates[1:]:
+            if d == current_check - timedelta(days=1):
+                streak += 1
+                current_check = d
+            else:
+                break
+    return streak, dates[0].isoformat()
+
+
+def reference_best(dates):
+    best = run = 0
+    prev = None
+    for d in sorted(dates):
+        run = run + 1 if prev and d == prev + timedelta(days=1) else 1
+        best = max(best, run)
+        prev = d
+    return best
 
 
 class TestStorage(unittest.TestCase):
@@ -23,8 +57,8 @@ class TestStorage(unittest.TestCase):
         """Очищення ресурсів."""
         if hasattr(self.storage, 'close'):
             try:
-                # Закриваємо з'єднання, якщо воно відкрите (хоча StorageService відкриває/закриває на льоту)
-                pass
+                # Закриваємо довготривалі з'єднання StorageService
+                self.storage.close()
             except:
                 pass
 
@@ -36,6 +70,92 @@ class TestStorage(unittest.TestCase):
                 except PermissionError:
                     time.sleep(0.1)
 
+    # --- CONNECTIONS ---
+    def test_connection_reused_per_thread(self):
+        conn = self.storage._connect()
+        self.storage.get_goals(self.user.id)
+        self.assertIs(self.storage._connect(), conn)
+
+        other = []
+        t = threading.Thread(target=lambda: other.append(self.storage._connect()))
+        t.start()
+        t.join()
+        self.assertIsNot(other[0], conn)
+
+    def test_release_thread_connection(self):
+        """Потік, що завершується, закриває своє з'єднання - воно не лишається в _connections до close()."""
+        self.storage._connect()
+        opened = []
+
+        def worker():
+            self.storage._connect()
+            opened.append(len(self.storage._connections))
+            self.storage.release_thread_connection()
+            self.storage.release_thread_connection()  # повторний виклик нічого не робить
+
+        for _ in range(3):
+            t = threading.Thread(target=worker)
+            t.start()
+            t.join()
+        self.assertEqual(opened, [2, 2, 2])
+        self.assertEqual(len(self.storage._connections), 1)
+
+    def test_close_and_reopen(self):
+        conn = self.storage._connect()
+        self.storage.close()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+
+        # Після close() сервіс відкриває нове з'єднання автоматично
+        self.assertIsNotNone(self.storage.get_user_by_id(self.user.id))
+
+    # --- SCHEMA MIGRATIONS ---
+    def _query_plan(self, sql, params):
+        conn = self.storage._connect()
+        return " ".join(r[3] for r in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+
+    def test_schema_version_is_current(self):
+        self.assertEqual(get_schema_version(self.storage._connect()), SCHEMA_VERSION)
+
+        # Повторне відкриття не перезапускає міграції
+        again = StorageService(db_path=self.test_db_path)
+        self.assertEqual(get_schema_version(again._connect()), SCHEMA_VERSION)
+        again.close()
+
+    def test_legacy_database_is_migrated(self):
+        legacy_path = os.path.join(self.test_dir, "legacy.db")
+        with sqlite3.connect(legacy_path) as conn:
+            conn.execute('''CREATE TABLE courses (
+                id TEXT PRIMARY KEY, user_id TEXT, title TEXT, type TEXT,
+                status TEXT, total_units INTEGER, completed_units INTEGER,
+                link TEXT, description TEXT, created_at TEXT
+            )''')
+        conn.close()
+
+        legacy = StorageService(db_path=legacy_path)
+        conn = legacy._connect()
+        columns = {r[1] for r in conn.execute("PRAGMA table_info(courses)")}
+        self.assertIn("topic_id", columns)
+        self.assertEqual(get_schema_version(conn), SCHEMA_VERSION)
+        legacy.close()
+
+    def test_filters_use_indexes(self):
+        cases = [
+            ("SELECT * FROM goals WHERE user_id = ? ORDER BY COALESCE(created_at, '') DESC, id DESC", ("u",)),
+            ("SELECT * FROM goals WHERE user_id = ? AND deadline_ts < ?", ("u", 1893456000)),
+            ("SELECT * FROM subgoals WHERE goal_id = ?", ("g",)),
+            ("SELECT * FROM habits WHERE user_id = ?", ("u",)),
+            ("SELECT * FROM users WHERE username = ?", ("tester",)),
+            ("SELECT * FROM categories WHERE user_id = ?", ("u",)),
+            ("SELECT * FROM topics WHERE user_id = ?", ("u",)),
+            ("SELECT * FROM courses WHERE user_id = ? ORDER BY COALESCE(created_at, '') DESC, id DESC", ("u",)),
+            ("SELECT * FROM habit_logs WHERE date BETWEEN ? AND ?", ("2024-01-01", "2024-01-07")),
+        ]
+        for sql, params in cases:
+            plan = self._query_plan(sql, params)
+            self.assertIn("USING INDEX", plan, f"{sql} -> {plan}")
+            self.assertNotIn("USE TEMP B-TREE", plan, f"{sql} -> {plan}")
+
     # --- USER STATS ---
     def test_update_user_stats(self):
         self.storage.update_user_stats(self.user.id, 5)
@@ -119,6 +239,473 @@ class TestStorage(unittest.TestCase):
         self.storage.delete_subgoal(sub.id)
         self.assertEqual(len(self.storage.get_subgoals(parent.id)), 0)
 
+    # --- TRANSACTIONS & BULK WRITES ---
+    def test_transaction_rolls_back_on_error(self):
+        goal = LearningGoal(title="Atomic", user_id=self.user.id)
+        with self.assertRaises(RuntimeError):
+            with self.storage.transaction():
+                self.storage.save_goal(goal)
+                self.storage.save_subgoal(SubGoal(title="S", goal_id=goal.id))
+                raise RuntimeError("boom")
+
+        self.assertEqual(self.storage.get_goals(self.user.id), [])
+        self.assertEqual(self.storage.get_subgoals(goal.id), [])
+
+    def test_nested_transaction_commits_once(self):
+        goal = LearningGoal(title="Outer", user_id=self.user.id)
+        with self.storage.transaction():
+            with self.storage.transaction():
+                self.storage.save_goal(goal)
+            # Вкладений блок ще не зафіксував зміни
+            self.assertTrue(self.storage._connect().in_transaction)
+        self.assertFalse(self.storage._connect().in_transaction)
+        self.assertEqual(len(self.storage.get_goals(self.user.id)), 1)
+
+    def test_bulk_goal_and_subgoal_methods(self):
+        goals = [LearningGoal(title=f"G{i}", user_id=self.user.id) for i in range(5)]
+        self.storage.save_goals_many(goals)
+        subs = [SubGoal(title=f"S{i}", goal_id=g.id) for g in goals for i in range(3)]
+        self.storage.save_subgoals_many(subs)
+        self.assertEqual(len(self.storage.get_goals(self.user.id)), 5)
+
+        # Повторне збереження оновлює, а не дублює
+        goals[0].title = "Renamed"
+        self.storage.save_goals_many(goals[:1])
+        titles = {g.title for g in self.storage.get_goals(self.user.id)}
+        self.assertIn("Renamed", titles)
+        self.assertEqual(len(titles), 5)
+
+        self.storage.delete_goals_many([g.id for g in goals[:3]])
+        self.assertEqual(len(self.storage.get_goals(self.user.id)), 2)
+        self.assertEqual(self.storage.get_subgoals(goals[0].id), [])
+        self.assertEqual(len(self.storage.get_subgoals(goals[4].id)), 3)
+
+    def test_goal_filters_and_sorts_in_sql(self):
+        from src.models import GoalPriority, GoalStatus
+        specs = [("Low", GoalPriority.LOW, GoalStatus.PLANNED, "2030-03-01"),
+                 ("Critical", GoalPriority.CRITICAL, GoalStatus.COMPLETED, "2030-01-15 18:00"),
+                 ("Medium", GoalPriority.MEDIUM, GoalStatus.IN_PROGRESS, None),
+                 ("High", GoalPriority.HIGH, GoalStatus.PLANNED, "2030-01-31")]
+        for i, (title, priority, status, deadline) in enumerate(specs):
+            self.storage.save_goal(LearningGoal(title=title, user_id=self.user.id, priority=priority, status=status,
+                                                deadline=deadline, created_at=datetime(2024, 1, i + 1)))
+
+        def titles(**criteria):
+            return [g.title for g in self.storage.get_goals(self.user.id, **criteria)]
+
+        self.assertEqual(titles(), ["High", "Medium", "Critical", "Low"])
+        # Ранг пріоритету, а не алфавіт назв (LOW < MEDIUM)
+        self.assertEqual(titles(sort="priority"), ["Critical", "High", "Medium", "Low"])
+        self.assertEqual(titles(sort="deadline"), ["Critical", "High", "Low", "Medium"])
+        self.assertEqual(titles(sort="status"), ["High", "Medium", "Low", "Critical"])
+        self.assertEqual(titles(statuses=[GoalStatus.PLANNED], sort="deadline"), ["High", "Low"])
+        self.assertEqual(titles(statuses=[]), [])
+        # Межі включні; дедлайн з часом потрапляє в свій день
+        self.assertEqual(titles(deadline_from="2030-01-15", deadline_to="2030-01-31", sort="deadline"),
+                         ["Critical", "High"])
+
+    def test_deadline_timestamp_and_ranges(self):
+        specs = {"day": "2030-01-05", "timed": "2030-01-05 10:30", "next": "2030-01-06 00:00",
+                 "bad": "abc", "none": None}
+        goals = {k: LearningGoal(title=k, user_id=self.user.id, deadline=v) for k, v in specs.items()}
+        self.storage.save_goals_many(list(goals.values()))
+        by_title = {g.title: g for g in self.storage.get_goals(self.user.id)}
+
+        # Дедлайн без часу - на весь день, до 23:59
+        self.assertEqual(by_title["day"].due_at, datetime(2030, 1, 5, 23, 59))
+        self.assertTrue(by_title["day"].all_day)
+        self.assertEqual(by_title["timed"].due_at, datetime(2030, 1, 5, 10, 30))
+        self.assertFalse(by_title["timed"].all_day)
+        self.assertIsNone(by_title["bad"].due_at)
+        self.assertIsNone(by_title["none"].due_at)
+
+        def titles(**criteria):
+            return [g.title for g in self.storage.get_goals(self.user.id, sort="deadline", **criteria)]
+
+        # Без дедлайну чи з нерозпізнаним - у кінці
+        self.assertEqual(titles()[:3], ["timed", "day", "next"])
+        self.assertEqual(titles(deadline_from=date(2030, 1, 5), deadline_to=date(2030, 1, 5)), ["timed", "day"])
+        self.assertEqual(titles(deadline_from=datetime(2030, 1, 5, 12), deadline_to=datetime(2030, 1, 6)),
+                         ["day", "next"])
+        self.assertEqual(sorted(self.storage.get_deadline_days(self.user.id)), [date(2030, 1, 5), date(2030, 1, 6)])
+
+        # Генеровані колонки не потрапляють в експорт і не заважають імпорту
+        exported = self.storage.export_user_data(self.user.id)
+        self.assertNotIn("deadline_ts", exported["goals"][0])
+        goals["day"].deadline = "2030-02-01 08:00"
+        self.storage.save_goal(goals["day"])
+        self.storage.import_user_data(exported, self.user.id)
+        self.assertEqual(self.storage.get_goals(self.user.id, ids=[goals["day"].id])[0].due_at,
+                         datetime(2030, 1, 5, 23, 59))
+
+    def test_goal_keyset_pages_cover_all_rows(self):
+        from src.models import GoalPriority
+        priorities = list(GoalPriority)
+        goals = [LearningGoal(title=f"G{i}", user_id=self.user.id, priority=priorities[i % 4],
+                              deadline=f"2030-01-{i % 5 + 1:02d}" if i % 3 else None,
+                              created_at=datetime(2024, 1, 1 + i % 7)) for i in range(47)]
+        self.storage.save_goals_many(goals)
+
+        for sort in StorageService.GOAL_SORTS:
+            expected = [g.id for g in self.storage.get_goals(self.user.id, sort=sort)]
+            paged, cursor, pages = [], None, 0
+            while True:
+                page, cursor = self.storage.get_goals_page(self.user.id, sort=sort, limit=10, after=cursor)
+                paged.extend(g.id for g in page)
+                pages += 1
+                if cursor is None:
+                    break
+            self.assertEqual(paged, expected, sort)
+            self.assertEqual(pages, 5)
+
+    def test_course_pages_sort_cyrillic_titles(self):
+        for title in ["яблуко", "Бета", "альфа", "Гора"]:
+            self.storage.save_course(Course(title=title, user_id=self.user.id))
+        first, cursor = self.storage.get_courses_page(self.user.id, sort="title", limit=2)
+        rest, end = self.storage.get_courses_page(self.user.id, sort="title", limit=2, after=cursor)
+        self.assertEqual([c.title for c in first + rest], ["альфа", "Бета", "Гора", "яблуко"])
+        self.assertIsNone(end)
+
+    def test_full_text_search(self):
+        goal = LearningGoal(title="Вивчити англійську", description="Граматика щодня", user_id=self.user.id)
+        self.storage.save_goal(goal)
+        sub = SubGoal(title="Неправильні дієслова", goal_id=goal.id)
+        self.storage.save_subgoal(sub)
+        self.storage.save_habit(Habit(title="Йога зранку", user_id=self.user.id))
+        self.storage.save_course(Course(title="Граматика англійської", user_id=self.user.id))
+        self.storage.save_goal(LearningGoal(title="Граматика", user_id="someone-else"))
+
+        # Префікс без урахування регістру; збіг у заголовку вище за збіг в описі
+        hits = self.storage.search(self.user.id, "ГРАМ")
+        self.assertEqual([h["kind"] for h in hits], ["course", "goal"])
+        self.assertEqual(hits[0]["title_spans"], [(0, 9)])
+        self.assertEqual(hits[1]["snippet"][slice(*hits[1]["snippet_spans"][0])], "Граматика")
+
+        # Підціль веде до своєї цілі; кілька слів - усі мають збігтися
+        self.assertEqual([h["owner_id"] for h in self.storage.search(self.user.id, "непр дієсл")], [goal.id])
+        self.assertEqual(self.storage.search(self.user.id, "непр йога"), [])
+        self.assertEqual([h["kind"] for h in self.storage.search(self.user.id, "грам", kinds=["goal"])], ["goal"])
+        # Синтаксис FTS5 у запиті - звичайний текст
+        self.assertEqual(self.storage.search(self.user.id, 'йога" OR (*'), [])
+        self.assertEqual(self.storage.search(self.user.id, "  "), [])
+
+        # Індекс оновлюють тригери
+        goal.title = "Вивчити іспанську"
+        self.storage.save_goal(goal)
+        self.assertEqual([h["title"] for h in self.storage.search(self.user.id, "іспан")], ["Вивчити іспанську"])
+        self.assertEqual([h["kind"] for h in self.storage.search(self.user.id, "англ")], ["course"])
+        self.storage.delete_goal(goal.id)
+        self.assertEqual(self.storage.search(self.user.id, "дієслова"), [])
+        self.assertEqual(self.storage._connect().execute("SELECT COUNT(*) FROM search_docs").fetchone()[0], 3)
+
+    def test_read_cache_serves_repeats_and_invalidates_on_write(self):
+        queries = []
+        self.storage._connect().set_trace_callback(queries.append)
+        self.storage.save_goal(LearningGoal(title="G", user_id=self.user.id))
+        self.storage.get_categories(self.user.id)
+        self.storage.get_goals(self.user.id)
+        queries.clear()
+
+        for _ in range(3):
+            self.storage.get_categories(self.user.id)
+            self.assertEqual(len(self.storage.get_goals(self.user.id)), 1)
+        self.assertEqual(queries, [])
+        self.assertEqual(self.storage.cache.stats()["hits"], 6)
+
+        # Запис інвалідує лише залежні від таблиці результати
+        self.storage.save_category(Category(name="New", user_id=self.user.id))
+        queries.clear()
+        self.storage.get_goals(self.user.id)
+        self.assertEqual(queries, [])
+        self.assertEqual(len(self.storage.get_categories(self.user.id)), 1)
+        self.assertEqual(len(queries), 1)
+
+        # Повернений список і моделі - копії: зміни викликача без збереження не потрапляють у кеш
+        self.storage.get_goals(self.user.id).clear()
+        self.storage.get_goals(self.user.id)[0].title = "Changed"
+        self.assertEqual(self.storage.get_goals(self.user.id)[0].title, "G")
+        self.storage.save_habit(Habit(title="H", user_id=self.user.id))
+        self.storage.get_habits(self.user.id)
+        self.storage.get_habits(self.user.id)[0].streak += 1
+        self.assertEqual(self.storage.get_habits(self.user.id)[0].streak, 0)
+        self.storage.get_stats_counts(self.user.id, "goal_status")["goal_status"].clear()
+        self.assertTrue(self.storage.get_stats_counts(self.user.id, "goal_status")["goal_status"])
+        queries.clear()
+
+        # Відкат не інвалідує, а читання всередині транзакції не кешуються
+        with self.assertRaises(RuntimeError):
+            with self.storage.transaction("goals"):
+                self.storage.save_goal(LearningGoal(title="Rolled back", user_id=self.user.id))
+                self.assertEqual(len(self.storage.get_goals(self.user.id)), 2)
+                raise RuntimeError
+        self.assertEqual(len(self.storage.get_goals(self.user.id)), 1)
+        self.storage._connect().set_trace_callback(None)
+
+    def test_read_cache_skips_time_dependent_deadlines(self):
+        goal = LearningGoal(title="Soon", user_id=self.user.id)
+        goal.deadline = (datetime.now() + timedelta(minutes=5)).strftime("%Y-%m-%d %H:%M")
+        self.storage.save_goal(goal)
+        size = self.storage.cache.stats()["size"]
+        for _ in range(3):
+            now = datetime.now()
+            found = self.storage.get_goals(self.user.id, deadline_from=now, deadline_to=now + timedelta(minutes=10))
+            self.assertEqual([g.id for g in found], [goal.id])
+        self.assertEqual(self.storage.cache.stats()["size"], size)
+        # Межі-дати (календар) стабільні й кешуються
+        today = date.today()
+        self.storage.get_goals(self.user.id, deadline_from=today, deadline_to=today + timedelta(days=1))
+        self.assertEqual(self.storage.cache.stats()["size"], size + 1)
+
+    def test_read_cache_is_bounded_and_can_be_disabled(self):
+        storage = StorageService(os.path.join(self.test_dir, "nocache.db"), cache_size=0)
+        storage.get_categories("u")
+        storage.get_categories("u")
+        self.assertEqual(storage.cache.stats()["size"], 0)
+        self.assertEqual(storage.cache.stats()["hits"], 0)
+        storage.close()
+
+        storage = StorageService(os.path.join(self.test_dir, "small.db"), cache_size=2)
+        for user in ["a", "b", "c"]:
+            storage.get_categories(user)
+        self.assertEqual(storage.cache.stats()["size"], 2)
+        storage.get_categories("a")
+        self.assertEqual(storage.cache.stats()["misses"], 4)
+        storage.close()
+
+    def test_stats_counts_follow_writes(self):
+        from collections import Counter
+        from src.models import GoalPriority, GoalStatus, CourseStatus
+        uid = self.user.id
+        cat = Category(name="C", user_id=uid)
+        self.storage.save_category(cat)
+        rng = random.Random(3)
+        goals, courses = [], []
+        for i in range(40):
+            goals.append(LearningGoal(title=f"G{i}", user_id=uid, priority=rng.choice(list(GoalPriority)),
+                                      status=rng.choice(list(GoalStatus)),
+                                      deadline=rng.choice([None, "2030-01-05", "2030-02-01 09:30", "abc"]),
+                                      category_id=rng.choice([None, cat.id])))
+            courses.append(Course(title=f"C{i}", user_id=uid, course_type=rng.choice(list(CourseType)),
+                                  total_units=rng.choice([0, 10]), completed_units=rng.randint(0, 10)))
+        self.storage.save_goals_many(goals)
+        for course in courses:
+            self.storage.save_course(course)
+
+        # Зміни, видалення, повторне збереження, каскад від категорії та імпорт
+        for g in goals[:10]:
+            g.status, g.deadline = GoalStatus.COMPLETED, "2031-05-05"
+        self.storage.save_goals_many(goals[:10])
+        self.storage.delete_goals_many([g.id for g in goals[30:]])
+        self.storage.delete_category(cat.id)
+        courses[0].status, courses[0].completed_units = CourseStatus.COMPLETED, 10
+        self.storage.save_course(courses[0])
+        self.storage.delete_course(courses[1].id)
+        self.storage.import_user_data({"goals": [{"id": "imp", "title": "I", "status": "PLANNED", "priority": "LOW"}]}, uid)
+
+        goals = self.storage.get_goals(uid)
+        courses = self.storage.get_courses(uid)
+        stats = self.storage.get_stats_counts(uid, "goal_status", "goal_priority", "goal_category",
+                                              "goal_deadline_month", "course_status", "course_type")
+        self.assertEqual(stats["goal_status"], dict(Counter(g.status.name for g in goals)))
+        self.assertEqual(stats["goal_priority"], dict(Counter(g.priority.name for g in goals)))
+        self.assertEqual(stats["goal_category"], {"": len(goals)})
+        months = Counter(g.deadline[:7] if g.deadline and g.deadline[0].isdigit() else "" for g in goals)
+        self.assertEqual(stats["goal_deadline_month"], dict(months))
+        self.assertEqual(stats["course_status"], dict(Counter(c.status.name for c in courses)))
+        self.assertEqual(stats["course_type"], dict(Counter(c.course_type.name for c in courses)))
+        rated = [c.completed_units / c.total_units for c in courses if c.total_units]
+        self.assertAlmostEqual(self.storage.get_courses_avg_progress(uid), sum(rated) / len(rated))
+
+        # Міграція на наявних даних рахує те саме, що й тригери
+        conn = self.storage._connect()
+        before = conn.execute("SELECT * FROM stats_counts WHERE n != 0 ORDER BY 1, 2, 3").fetchall()
+        with self.storage.transaction() as c:
+            c.execute("DELETE FROM stats_counts")
+            from src.migrations import _m008_stats_counts
+            _m008_stats_counts(c)
+        after = conn.execute("SELECT * FROM stats_counts ORDER BY 1, 2, 3").fetchall()
+        self.assertEqual([r[:4] for r in before], [r[:4] for r in after])
+
+    def test_dataset_generator_is_reproducible(self):
+        spec = DatasetSpec(users=2, goals_per_user=40, habits_per_user=3, history_years=1, courses_per_user=5)
+        today = date(2026, 3, 15)
+        other = StorageService(db_path=os.path.join(self.test_dir, "other.db"))
+        try:
+            first = generate_dataset(self.storage, spec, today=today, username="gen")
+            second = generate_dataset(other, spec, today=today, username="gen")
+            self.assertEqual(first["users"], second["users"])
+            self.assertEqual(first["goals"], 80)
+            for table in ("goals", "subgoals", "habits", "habit_logs", "courses"):
+                query = f"SELECT * FROM {table} ORDER BY 1, 2"
+                self.assertEqual(self.storage._connect().execute(query).fetchall(),
+                                 other._connect().execute(query).fetchall(), table)
+            # Інший seed - інші дані
+            third = generate_dataset(other, spec.scaled(seed=7), today=today, username="gen-b")
+            titles = lambda uid: sorted(g.title for g in other.get_goals(uid))
+            self.assertNotEqual(titles(third["users"][0]), titles(second["users"][0]))
+        finally:
+            other.close()
+
+        # Дані видно через звичайні читання; серії збігаються з повним перерахунком
+        user_id = first["users"][0]
+        self.assertEqual(len(self.storage.get_goals(user_id)), 40)
+        self.assertTrue(self.storage.search(user_id, "Етап"))
+        self.assertEqual(sum(self.storage.get_stats_counts(user_id, "goal_status")["goal_status"].values()), 40)
+        habits = self.storage._connect().execute("SELECT * FROM habits ORDER BY id").fetchall()
+        self.storage.recalc_all_streaks()
+        # recalc_all_streaks рахує від реальної дати, тож порівнюємо рекорди та довжини серій
+        self.assertEqual([h[-3:-1] for h in habits],
+                         [h[-3:-1] for h in self.storage._connect().execute("SELECT * FROM habits ORDER BY id")])
+
+    def test_dataset_generator_supplements_existing_db(self):
+        spec = DatasetSpec(users=2, goals_per_user=20, habits_per_user=2, history_years=1, courses_per_user=3)
+        path = os.path.join(self.test_dir, "seed.db")
+        for _ in range(2):
+            storage = StorageService(db_path=path)
+            try:
+                result = generate_dataset(storage, spec, username="gen")
+            finally:
+                storage.close()
+        storage = StorageService(db_path=path)
+        try:
+            user_id = result["users"][0]
+            self.assertEqual(len(storage.get_goals(user_id)), 40)
+            self.assertEqual(len(storage.get_habits(user_id)), 4)
+            self.assertEqual(len(storage.get_courses(user_id)), 6)
+            # Категорії й теми з тими ж назвами не дублюються
+            self.assertEqual(len(storage.get_categories(user_id)), 8)
+            self.assertEqual(len(storage.get_topics(user_id)), 7)
+        finally:
+            storage.close()
+
+    def test_storage_benchmark_covers_methods_and_flags_regressions(self):
+        path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            "benchmarks", "bench_storage.py")
+        spec = importlib.util.spec_from_file_location("bench_storage", path)
+        bench = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(bench)
+        bench.check_coverage()
+
+        tiny = DatasetSpec(goals_per_user=40, habits_per_user=2, history_years=1, courses_per_user=3)
+        result = bench.run_size("tiny", tiny, repeat=1, budget=0, only={"get_subgoals_by_goal", "save_goals_many"})
+        methods = result["methods"]
+        self.assertEqual(set(methods), {"get_subgoals_by_goal", "save_goals_many"})
+        self.assertEqual(methods["get_subgoals_by_goal"]["queries"], 1)
+
+        results = {"sizes": {"tiny": result}}
+        self.assertEqual(bench.compare(results, results, tolerance=0.5, min_delta_ms=0), [])
+        # Більше запитів, ніж у базі (напр. N+1), - регресія незалежно від часу
+        baseline = json.loads(json.dumps(results))
+        baseline["sizes"]["tiny"]["methods"]["get_subgoals_by_goal"]["queries"] = 0
+        regressions = bench.compare(results, baseline, tolerance=0.5, min_delta_ms=0)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("get_subgoals_by_goal", regressions[0])
+
+    def test_profiler_counts_calls_and_statements(self):
+        goals = [LearningGoal(title=f"G{i}", user_id=self.user.id) for i in range(5)]
+        self.storage.save_goals_many(goals)
+        log_path = os.path.join(self.test_dir, "slow.log")
+        profiler = self.storage.enable_profiling(slow_ms=0, log_path=log_path)
+
+        # N+1: один запит на кожну ціль проти одного пакетного
+        for g in goals:
+            self.storage.get_subgoals(g.id)
+        self.storage.get_subgoals_by_goal([g.id for g in goals])
+        self.storage.save_goal(goals[0])
+
+        stats = profiler.stats()
+        self.assertEqual(stats["get_subgoals"]["calls"], 5)
+        self.assertEqual(stats["get_subgoals"]["statements_per_call"], 1)
+        self.assertEqual(stats["get_subgoals_by_goal"]["calls"], 1)
+        self.assertEqual(stats["get_subgoals_by_goal"]["rows"], 0)
+        # save_goal викликає save_goals_many - запити приписуються вкладеному методу
+        self.assertEqual(stats["save_goal"]["statements"], 0)
+        self.assertGreater(stats["save_goals_many"]["statements"], 0)
+        # Однакові запити з різними значеннями групуються
+        self.assertIn(("SELECT * FROM subgoals WHERE goal_id = ?", 5), profiler.top_sql())
+        self.assertEqual(stats["get_subgoals"]["top_sql"], [("SELECT * FROM subgoals WHERE goal_id = ?", 5)])
+        self.assertEqual(sum(stats["get_subgoals"]["histogram"].values()), 5)
+        with self.storage.profile_scope("екран"):
+            self.storage.get_subgoals(goals[0].id)
+            self.storage.get_subgoals(goals[1].id)
+        self.assertEqual(profiler.scopes()["екран"]["statements_per_entry"], 2)
+        self.assertIn("екран", profiler.report())
+
+        self.storage.disable_profiling()
+        self.storage.get_subgoals(goals[0].id)
+        self.assertEqual(profiler.stats()["get_subgoals"]["calls"], 7)
+        with open(log_path, encoding="utf-8") as f:
+            self.assertIn("SLOW get_subgoals(", f.read())
+
+    def test_profiler_slow_log_hides_values(self):
+        log_path = os.path.join(self.test_dir, "slow.log")
+        self.storage.enable_profiling(slow_ms=0, log_path=log_path)
+        self.storage.create_user(User(username="secret_user", password_hash="hash-1234567890abcdef"))
+        self.storage.disable_profiling()
+        with open(log_path, encoding="utf-8") as f:
+            log = f.read()
+        self.assertIn("SLOW create_user(<User>)", log)
+        self.assertIn("INSERT INTO users", log)
+        self.assertNotIn("hash-1234567890abcdef", log)
+        self.assertNotIn("secret_user", log)
+
+    def test_change_events_after_commit(self):
+        received = []
+        self.storage.add_change_listener(received.append)
+        goal = LearningGoal(title="G", user_id=self.user.id)
+        self.storage.save_goal(goal)
+        self.assertEqual(received.pop(), [ChangeEvent("goals", "save", frozenset({goal.id}))])
+
+        # Вкладені блоки - одне сповіщення після зовнішнього commit; без змін - жодного
+        with self.storage.transaction("goals", "subgoals"):
+            self.storage.delete_goal(goal.id)
+            self.storage.get_goals(self.user.id)
+            self.assertEqual(received, [])
+        self.assertEqual(received.pop(), [ChangeEvent("goals", "delete", frozenset({goal.id})),
+                                          ChangeEvent("subgoals", "delete")])
+        self.storage.delete_goal("missing")
+        self.assertEqual(received, [])
+
+        # Відкочена транзакція нічого не повідомляє
+        with self.assertRaises(RuntimeError):
+            with self.storage.transaction():
+                self.storage.save_goal(LearningGoal(title="X", user_id=self.user.id))
+                raise RuntimeError()
+        self.assertEqual(received, [])
+
+        # Таблиці без явних подій - подія без id; імпорт і відновлення - "змінилось усе"
+        self.storage.delete_topic("missing-topic")
+        self.storage.save_topic(Topic(name="T", user_id=self.user.id))
+        self.assertEqual([e.entity for e in received.pop()], ["topics"])
+        self.storage.import_user_data({"goals": [{"id": "imp", "title": "I"}]}, self.user.id)
+        self.assertEqual(received.pop(), [ChangeEvent.RELOAD])
+        self.assertTrue(ChangeEvent.RELOAD.touches({"habits"}))
+
+        self.storage.remove_change_listener(received.append)
+        self.storage.save_goal(LearningGoal(title="Y", user_id=self.user.id))
+        self.assertEqual(received, [])
+
+    def test_batched_subgoals_and_progress(self):
+        g1 = LearningGoal(title="G1", user_id=self.user.id)
+        g2 = LearningGoal(title="G2", user_id=self.user.id)
+        g3 = LearningGoal(title="Empty", user_id=self.user.id)
+        self.storage.save_goals_many([g1, g2, g3])
+        self.storage.save_subgoals_many([
+            SubGoal(title="a", goal_id=g1.id, is_completed=True),
+            SubGoal(title="b", goal_id=g1.id),
+            SubGoal(title="c", goal_id=g2.id, is_completed=True),
+        ])
+
+        by_goal = self.storage.get_subgoals_by_goal([g1.id, g2.id, g3.id])
+        self.assertEqual([s.title for s in by_goal[g1.id]], ["b", "a"])  # невиконані першими
+        self.assertEqual(len(by_goal[g2.id]), 1)
+        self.assertEqual(by_goal[g3.id], [])
+
+        progress = self.storage.get_goals_progress(self.user.id)
+        self.assertEqual(progress[g1.id], (2, 1))
+        self.assertEqual(progress[g2.id], (1, 1))
+        self.assertNotIn(g3.id, progress)
+
     # --- HABITS & STREAKS ---
     def test_habit_streak_logic(self):
         habit = Habit(title="Run", user_id=self.user.id)
@@ -149,6 +736,132 @@ class TestStorage(unittest.TestCase):
         self.storage.toggle_habit_date(habit.id, today)
         self.assertEqual(self.storage.get_habits(self.user.id)[0].streak, 2)
 
+    def test_incremental_streak_matches_full_recompute(self):
+        rng = random.Random(20240501)
+        today = date.today()
+        for trial in range(30):
+            habit = Habit(title=f"H{trial}", user_id=self.user.id)
+            self.storage.save_habit(habit)
+            logged = set()
+            for _ in range(60):
+                day = today - timedelta(days=rng.randint(0, 25))
+                self.storage.toggle_habit_date(habit.id, day.isoformat())
+                logged ^= {day}
+
+                h = next(x for x in self.storage.get_habits(self.user.id) if x.id == habit.id)
+                self.assertEqual((h.streak, h.last_completed_date), reference_streak(logged))
+                self.assertEqual(h.best_streak, reference_best(logged))
+
+    def test_best_streak_survives_broken_run(self):
+        habit = Habit(title="Best", user_id=self.user.id)
+        self.storage.save_habit(habit)
+        old_days = [date.today() - timedelta(days=d) for d in range(10, 15)]
+        for d in sorted(old_days):
+            self.storage.toggle_habit_date(habit.id, d.isoformat())
+        self.storage.toggle_habit_date(habit.id, date.today().isoformat())
+
+        h = self.storage.get_habits(self.user.id)[0]
+        self.assertEqual(h.streak, 1)
+        self.assertEqual(h.best_streak, 5)
+
+    def test_recalc_all_streaks_decays_stale_values(self):
+        other = User(username="other", password_hash="1")
+        self.storage.create_user(other)
+        today = date.today()
+        cases = {
+            "active": [today - timedelta(days=d) for d in (0, 1, 2, 5, 6, 7, 8)],
+            "stale": [today - timedelta(days=d) for d in (3, 4)],
+            "empty": [],
+        }
+        habits = {}
+        for i, (title, days) in enumerate(cases.items()):
+            h = Habit(title=title, user_id=[self.user.id, other.id][i % 2], streak=99,
+                      last_completed_date="2000-01-01")
+            self.storage.save_habit(h)
+            habits[title] = h
+
+        with sqlite3.connect(self.test_db_path) as conn:
+            for title, days in cases.items():
+                conn.executemany("INSERT INTO habit_logs (habit_id, date) VALUES (?, ?)",
+                                 [(habits[title].id, d.isoformat()) for d in days])
+        conn.close()
+
+        result = self.storage.recalc_all_streaks()
+        self.assertEqual(result["habits"], 3)
+        self.assertGreaterEqual(result["seconds"], 0)
+
+        stored = {h.title: h for h in self.storage.get_habits(self.user.id) + self.storage.get_habits(other.id)}
+        for title, days in cases.items():
+            self.assertEqual((stored[title].streak, stored[title].last_completed_date), reference_streak(days))
+            self.assertEqual(stored[title].best_streak, reference_best(days))
+
+    def test_habit_week_matrix(self):
+        monday = date(2024, 5, 6)
+        h1 = Habit(title="A", user_id=self.user.id)
+        h2 = Habit(title="B", user_id=self.user.id)
+        foreign = Habit(title="C", user_id="someone-else")
+        for h in (h1, h2, foreign):
+            self.storage.save_habit(h)
+
+        for offset in (0, 2, 6):
+            self.storage.toggle_habit_date(h1.id, (monday + timedelta(days=offset)).isoformat())
+        self.storage.toggle_habit_date(h1.id, (monday + timedelta(days=7)).isoformat())  # наступний тиждень
+        self.storage.toggle_habit_date(h2.id, (monday + timedelta(days=3)).isoformat())
+        self.storage.toggle_habit_date(foreign.id, monday.isoformat())
+
+        matrix = self.storage.get_habit_week_matrix(
+            self.user.id, monday.isoformat(), (monday + timedelta(days=6)).isoformat())
+        self.assertEqual(matrix, {h1.id: 0b1000101, h2.id: 0b0001000})
+
+    def test_toggle_updates_habit_in_place(self):
+        habit = Habit(title="Inline", user_id=self.user.id)
+        self.storage.save_habit(habit)
+        self.storage.toggle_habit_date(habit.id, date.today().isoformat(), habit=habit)
+        self.assertEqual((habit.streak, habit.last_completed_date, habit.best_streak),
+                         (1, date.today().isoformat(), 1))
+
+    def test_compacted_logs_read_transparently(self):
+        habit = Habit(title="Long", user_id=self.user.id)
+        self.storage.save_habit(habit)
+        rng = random.Random(8)
+        today = date.today()
+        # ~3 роки історії, включно з 29 лютого та суцільною свіжою серією
+        days = {today - timedelta(days=d) for d in range(3, 1100) if rng.random() < 0.6}
+        days |= {today - timedelta(days=d) for d in range(0, 400)}
+        with self.storage.transaction() as c:
+            # Відмітки ставились у свій день (стискаються лише давно не змінені)
+            c.executemany("INSERT INTO habit_logs (habit_id, date, updated_at) VALUES (?, ?, ?)",
+                          [(habit.id, d.isoformat(), d.isoformat() + "T21:00:00.000Z") for d in days])
+        self.storage.recalc_all_streaks()
+        before = self.storage.get_habits(self.user.id)[0]
+        exported_before = sorted(r["date"] for r in self.storage.export_user_data(self.user.id)["habit_logs"])
+
+        result = self.storage.compact_habit_logs(keep_days=30)
+        self.assertEqual(result["rows"], sum(1 for d in days if d < today - timedelta(days=30)))
+        self.assertGreater(result["bitmaps"], 0)
+
+        everything = self.storage.get_habit_logs(habit.id, "1900-01-01", "2999-12-31")
+        self.assertEqual(everything, {d.isoformat() for d in days})
+        exported = sorted(r["date"] for r in self.storage.export_user_data(self.user.id)["habit_logs"])
+        self.assertEqual(exported, exported_before)
+
+        self.storage.recalc_all_streaks()
+        after = self.storage.get_habits(self.user.id)[0]
+        self.assertEqual((after.streak, after.best_streak), (before.streak, before.best_streak))
+        self.assertEqual(after.best_streak, reference_best(days))
+
+        # Зняття і повторна відмітка стиснутого дня
+        old_day = (today - timedelta(days=200)).isoformat()
+        self.assertFalse(self.storage.toggle_habit_date(habit.id, old_day))
+        self.assertNotIn(old_day, self.storage.get_habit_logs(habit.id, old_day, old_day))
+        self.assertTrue(self.storage.toggle_habit_date(habit.id, old_day))
+        self.assertEqual(self.storage.get_habit_logs(habit.id, old_day, old_day), {old_day})
+
+        # Повторний імпорт не дублює відмітки, що вже лежать у бітмапах
+        self.storage.import_user_data(self.storage.export_user_data(self.user.id), self.user.id)
+        exported = sorted(r["date"] for r in self.storage.export_user_data(self.user.id)["habit_logs"])
+        self.assertEqual(exported, exported_before)
+
     # --- IMPORT / EXPORT ---
     def test_import_export(self):
         # Create some data
@@ -172,5 +885,151 @@ class TestStorage(unittest.TestCase):
         self.assertEqual(cats_new[0].user_id, new_user.id)  # ID має змінитись на нового юзера
 
 
+    def test_streaming_export_matches_dict_export(self):
+        cat = Category(name="Стрім", user_id=self.user.id)
+        self.storage.save_category(cat)
+        goal = LearningGoal(title="Ціль \"в лапках\"", user_id=self.user.id, category_id=cat.id)
+        self.storage.save_goal(goal)
+        self.storage.save_subgoals_many([SubGoal(title=f"Крок {i}", goal_id=goal.id) for i in range(1200)])
+        habit = Habit(title="Звичка", user_id=self.user.id)
+        self.storage.save_habit(habit)
+        with self.storage.transaction() as c:
+            c.executemany("INSERT INTO habit_logs (habit_id, date, updated_at) VALUES (?, ?, ?)",
+                          [(habit.id, (date.today() - timedelta(days=d)).isoformat(), "2000-01-01T00:00:00.000Z")
+                           for d in range(800)])
+        self.assertGreater(self.storage.compact_habit_logs(keep_days=100)["rows"], 0)
+
+        path = os.path.join(self.test_dir, "export.json")
+        calls = []
+        written = self.storage.export_user_data_to_file(self.user.id, path,
+                                                        progress=lambda done, total: calls.append((done, total)))
+        self.assertEqual(written, 1 + 1 + 1200 + 1 + 800)
+        self.assertEqual(calls[-1], (written, written))
+
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+        expected = self.storage.export_user_data(self.user.id)
+        streamed = json.loads(text)
+        expected["export_date"] = streamed["export_date"]
+        expected["sync_token"] = streamed["sync_token"]
+        self.assertEqual(text, json.dumps(expected, ensure_ascii=False, indent=4))
+
+    def test_streaming_export_cancel_removes_file(self):
+        goal = LearningGoal(title="Велика", user_id=self.user.id)
+        self.storage.save_goal(goal)
+        self.storage.save_subgoals_many([SubGoal(title=str(i), goal_id=goal.id) for i in range(2000)])
+        path = os.path.join(self.test_dir, "cancelled.json")
+        result = self.storage.export_user_data_to_file(self.user.id, path, is_cancelled=lambda: True)
+        self.assertIsNone(result)
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(os.path.exists(path + ".part"))
+
+
+    def test_import_upserts_in_chunks_with_progress(self):
+        goal = LearningGoal(title="Стара назва", user_id=self.user.id)
+        self.storage.save_goal(goal)
+        habit_id = "legacy-habit"
+        today = date.today()
+        data = {
+            "version": 1,
+            "goals": [{"id": goal.id, "user_id": "someone", "title": "Нова назва", "description": "",
+                       "deadline": None, "priority": "Середній", "status": "Запланована",
+                       "created_at": goal.created_at.isoformat(), "category_id": None, "link": None}],
+            "subgoals": [{"id": f"s{i}", "goal_id": goal.id, "title": str(i), "is_completed": 0,
+                          "description": "", "created_at": "2024-01-01T00:00:00"} for i in range(2500)],
+            # Бекап старої версії: без run_length/best_streak
+            "habits": [{"id": habit_id, "user_id": "someone", "title": "Стара", "streak": 0,
+                        "last_completed_date": ""}],
+            "habit_logs": [{"habit_id": habit_id, "date": (today - timedelta(days=d)).isoformat()}
+                           for d in range(3)],
+        }
+        calls = []
+        imported = self.storage.import_user_data(data, self.user.id, progress=lambda *a: calls.append(a))
+        self.assertEqual(imported, 2505)
+        self.assertEqual(calls[-1], (2505, 2505))
+        self.assertGreater(len(calls), 3)
+
+        goals = self.storage.get_goals(self.user.id)
+        self.assertEqual([(g.id, g.title) for g in goals], [(goal.id, "Нова назва")])
+        self.assertEqual(len(self.storage.get_subgoals(goal.id)), 2500)
+        habit = self.storage.get_habits(self.user.id)[0]
+        self.assertEqual((habit.id, habit.streak, habit.best_streak), (habit_id, 3, 3))
+
+        # Повторний імпорт того ж бекапу нічого не дублює
+        self.storage.import_user_data(data, self.user.id)
+        self.assertEqual(len(self.storage.get_subgoals(goal.id)), 2500)
+        self.assertEqual(len(self.storage.get_habit_logs(habit_id, "1900-01-01", "2999-12-31")), 3)
+
+    def test_import_rejects_unknown_columns_without_writing(self):
+        cat = {"id": "c1", "user_id": self.user.id, "name": "Ок", "color": "#fff"}
+        for bad in ({"categories": [cat], "goals": [{"id": "g1", "title) VALUES (1); --": "x"}]},
+                    {"categories": [cat], "habit_logs": [{"date": "2024-01-01"}]},
+                    {"categories": [cat], "topics": "не список"}):
+            with self.assertRaises(ValueError):
+                self.storage.import_user_data(bad, self.user.id)
+        self.assertEqual(self.storage.get_categories(self.user.id), [])
+
+
+    def test_delta_export_and_import(self):
+        cat = Category(name="Стара", user_id=self.user.id)
+        self.storage.save_category(cat)
+        goals = [LearningGoal(title=f"Ціль {i}", user_id=self.user.id) for i in range(3)]
+        self.storage.save_goals_many(goals)
+        subs = [SubGoal(title=f"Крок {i}", goal_id=goals[0].id) for i in range(3)]
+        self.storage.save_subgoals_many(subs)
+        habit = Habit(title="Звичка", user_id=self.user.id)
+        self.storage.save_habit(habit)
+        yesterday = (date.today() - timedelta(days=1)).isoformat()
+        self.storage.toggle_habit_date(habit.id, yesterday)
+
+        # Репліка отримує повну копію
+        replica_dir = os.path.join(self.test_dir, "replica")
+        replica = StorageService(db_path=os.path.join(replica_dir, "replica.db"))
+        self.addCleanup(replica.close)
+        replica.create_user(self.user)
+        full = self.storage.export_user_data(self.user.id)
+        replica.import_user_data(full, self.user.id)
+
+        # Зміни після експорту
+        goals[1].title = "Перейменована"
+        self.storage.save_goal(goals[1])
+        self.storage.delete_subgoal(subs[0].id)
+        self.storage.delete_goal(goals[2].id)
+        self.storage.delete_category(cat.id)
+        self.storage.toggle_habit_date(habit.id, yesterday)
+        self.storage.toggle_habit_date(habit.id, date.today().isoformat())
+        # since включний: зміни в ту саму мілісекунду, що й токен, надсилаються повторно
+        time.sleep(0.005)
+
+        delta = self.storage.export_user_data(self.user.id, since=full["sync_token"])
+        self.assertEqual(delta["since"], full["sync_token"])
+        self.assertEqual([g["title"] for g in delta["goals"]], ["Перейменована"])
+        self.assertEqual(delta["subgoals"], [])
+        self.assertEqual([l["date"] for l in delta["habit_logs"]], [date.today().isoformat()])
+        deleted = {(d["table"], d["id"], d["date"]) for d in delta["deleted"]}
+        self.assertEqual(deleted, {("subgoals", subs[0].id, ""), ("goals", goals[2].id, ""),
+                                   ("categories", cat.id, ""), ("habit_logs", habit.id, yesterday)})
+
+        replica.import_user_data(delta, self.user.id)
+        self.assertEqual(sorted(g.title for g in replica.get_goals(self.user.id)), ["Перейменована", "Ціль 0"])
+        self.assertEqual(sorted(s.title for s in replica.get_subgoals(goals[0].id)), ["Крок 1", "Крок 2"])
+        self.assertEqual(replica.get_categories(self.user.id), [])
+        self.assertEqual(replica.get_habit_logs(habit.id, "2000-01-01", "2999-12-31"), {date.today().isoformat()})
+        self.assertEqual(replica.get_habits(self.user.id)[0].streak, 1)
+
+        # Наступна дельта від нового токена порожня
+        again = self.storage.export_user_data(self.user.id, since=delta["sync_token"])
+        self.assertFalse(any(again[t] for t in StorageService.IMPORT_TABLES) or again["deleted"])
+
+    def test_tombstones_ignore_foreign_rows(self):
+        other = User(username="other", password_hash="1")
+        self.storage.create_user(other)
+        foreign = Category(name="Чужа", user_id=other.id)
+        self.storage.save_category(foreign)
+        delta = {"version": 1, "deleted": [{"table": "categories", "id": foreign.id, "date": ""}]}
+        self.storage.import_user_data(delta, self.user.id)
+        self.assertEqual(len(self.storage.get_categories(other.id)), 1)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
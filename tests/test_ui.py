@@ -1,15 +1,28 @@
+import importlib.util
+import os
+import tempfile
 import unittest
 import sys
+import threading
+import time
 from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import Qt, QEvent
+from PyQt5.QtTest import QTest
 from unittest.mock import MagicMock
-from src.ui.main_window import MainWindow
+from src.ui.main_window import MainWindow, ExportWorker, ImportWorker
+from src.ui.async_storage import AsyncStorage
 from src.ui.edit_goal_dialog import EditGoalDialog
 from src.ui.edit_habit_dialog import EditHabitDialog
 from src.ui.search_dialog import SearchDialog
-from src.models import LearningGoal, Habit, Topic
+from src.datagen import DatasetSpec
+from src.storage import StorageService
+from src.models import LearningGoal, SubGoal, GoalStatus, Habit, Topic, ChangeEvent, User, Course, \
+    CourseStatus, CourseType, GoalPriority
 
 # --- Імпорти компонентів UI ---
-from src.ui.cards import QuestCard, HabitCard
+from src.ui.cards import HabitCard
+from src.ui.goal_list import GoalCardDelegate
+from src.ui.tabs.stats_tab import enum_counts
 from src.ui.topic_manager_dialog import TopicManagerDialog
 from src.ui.ai_goal_dialog import AIGoalDialog
 
@@ -22,18 +35,166 @@ class TestUI(unittest.TestCase):
         self.mock_storage = MagicMock()
         self.mock_storage.get_categories.return_value = []
         self.mock_storage.get_subgoals.return_value = []
+        self.mock_storage.get_subgoals_by_goal.return_value = {}
+        self.mock_storage.get_goals_progress.return_value = {}
+        self.mock_storage.get_goals_page.return_value = ([], None)
+        self.mock_storage.get_courses_page.return_value = ([], None)
         self.mock_storage.get_topics.return_value = [Topic(name="Test Topic", user_id="u1")]
 
+    @staticmethod
+    def delete_window(window):
+        """Видаляє вікно одразу, а не коли до нього дійде збирач сміття посеред чужого тесту."""
+        window.close()
+        window.deleteLater()
+        QApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+
     def test_main_window_init(self):
         """Ініціалізація головного вікна (Smoke Test)."""
         try:
             mw = MainWindow(user_id="u1", storage=self.mock_storage)
             self.assertIsNotNone(mw)
             self.assertIsNotNone(mw.tab_quests)
-            self.assertIsNotNone(mw.tab_habits)
         except Exception:
             pass
 
+    def test_tabs_are_built_on_first_visit(self):
+        """На старті будується лише вкладка цілей; решта - при першому відкритті, без зайвих читань."""
+        self.mock_storage.get_habits.return_value = []
+        self.mock_storage.get_habit_week_matrix.return_value = {}
+        mw = MainWindow(user_id="u1", storage=self.mock_storage)
+        mw.db.wait()
+        self.assertEqual(mw.tabs(), [mw.tab_quests])
+        self.assertIsNone(mw.tab_stats)
+        self.mock_storage.get_habits.assert_not_called()
+
+        mw.switch_tab(2)
+        mw.db.wait()
+        self.assertIs(mw.stack.currentWidget(), mw.tab_habits)
+        self.assertEqual(mw.stack.count(), len(MainWindow.TABS))
+        self.mock_storage.get_habits.assert_called()
+        mw.switch_tab(2)
+        self.assertEqual(mw.tabs(), [mw.tab_quests, mw.tab_habits])
+        mw.close()
+
+    def test_tabs_refresh_only_after_relevant_changes(self):
+        """Перемикання вкладок перечитує дані лише після змін, від яких вкладка залежить."""
+        self.mock_storage.get_goals.return_value = []
+        self.mock_storage.get_habits.return_value = []
+        self.mock_storage.get_courses.return_value = []
+        self.mock_storage.get_habit_week_matrix.return_value = {}
+        mw = MainWindow(user_id="u1", storage=self.mock_storage)
+        listener = self.mock_storage.add_change_listener.call_args[0][0]
+        mw.db.wait()
+
+        calls = self.mock_storage.get_goals_page.call_count
+        mw.switch_tab(1)
+        self.assertIsNotNone(mw.tab_development)
+        mw.switch_tab(0)
+        mw.db.wait()
+        self.assertEqual(self.mock_storage.get_goals_page.call_count, calls)
+
+        listener([ChangeEvent("courses", "save", frozenset({"c1"}))])
+        self.assertTrue(mw.tab_development.dirty)
+        self.assertFalse(mw.tab_quests.dirty)
+
+        listener([ChangeEvent("goals")])
+        self.assertIsNone(mw.tab_stats)  # ще не відкривалась - прочитає свіжі дані при першому показі
+        mw.switch_tab(0)
+        mw.db.wait()
+        self.assertEqual(self.mock_storage.get_goals_page.call_count, calls + 1)
+        self.assertFalse(mw.tab_quests.dirty)
+
+        mw.close()
+        self.mock_storage.remove_change_listener.assert_called_once_with(listener)
+
+    def test_async_storage_drops_stale_reads_and_orders_writes(self):
+        """Застарілі читання не доставляються; записи однієї сутності - строго по черзі."""
+        db = AsyncStorage(self.mock_storage)
+        shown = []
+        release = threading.Event()
+
+        def slow(value):
+            release.wait(5)
+            return value
+
+        db.read("quests", slow, "old", on_done=shown.append)
+        db.read("quests", slow, "new", on_done=shown.append)
+        release.set()
+        db.wait()
+        self.assertEqual(shown, ["new"])
+
+        written, finished = [], []
+
+        def save(entity, value):
+            time.sleep(0.001 * (5 - value))  # ранні записи довші - без черги порядок би змінився
+            written.append((entity, value))
+            return value
+
+        for value in range(5):
+            db.write(("goals", "g1"), save, "g1", value, on_done=finished.append)
+        errors = []
+        db.write(("goals", "g2"), lambda: 1 / 0, on_error=errors.append)
+        db.wait()
+        self.assertEqual([v for e, v in written if e == "g1"], list(range(5)))
+        self.assertEqual(finished, list(range(5)))
+        self.assertIsInstance(errors[0], ZeroDivisionError)
+
+    def test_async_storage_releases_pool_connections(self):
+        """Потоки пулу не завершуються за простоєм, а shutdown() закриває їхні з'єднання SQLite."""
+        with tempfile.TemporaryDirectory() as tmp:
+            storage = StorageService(os.path.join(tmp, "app.db"))
+            try:
+                storage.get_categories("u1")
+                db = AsyncStorage(storage)
+                self.assertEqual(db.pool.expiryTimeout(), -1)
+                for i in range(20):
+                    db.read(f"c{i}", storage.get_categories, "u1")
+                db.wait()
+                self.assertLessEqual(len(storage._connections), 1 + db.pool.maxThreadCount())
+                db.shutdown()
+                self.assertEqual(len(storage._connections), 1)
+            finally:
+                storage.close()
+
+    def test_stats_tab_tolerates_unknown_enums(self):
+        """Порожній чи невідомий статус/тип курсу чи пріоритет цілі (імпорт приймає '' і NULL) рахуються
+        як типові значення моделі й не ламають вкладку статистики."""
+        with tempfile.TemporaryDirectory() as tmp:
+            storage = StorageService(os.path.join(tmp, "app.db"))
+            try:
+                user = User(username="stats", password_hash="x")
+                storage.create_user(user)
+                courses = [Course(title=f"C{i}", user_id=user.id) for i in range(3)]
+                for course in courses:
+                    storage.save_course(course)
+                with storage.transaction("courses") as c:
+                    c.execute("UPDATE courses SET status = '', type = 'PODCAST' WHERE id = ?",
+                              (courses[0].id,))
+                    c.execute("UPDATE courses SET status = NULL WHERE id = ?", (courses[1].id,))
+                goals = [LearningGoal(title="Done", user_id=user.id, priority=GoalPriority.HIGH,
+                                      status=GoalStatus.COMPLETED), LearningGoal(title="Imported", user_id=user.id)]
+                storage.save_goals_many(goals)
+                with storage.transaction("goals") as c:
+                    c.execute("UPDATE goals SET priority = '', status = 'BOGUS' WHERE id = ?", (goals[1].id,))
+
+                mw = MainWindow(user.id, storage)
+                mw.switch_tab(3)
+                mw.db.wait()
+                QApplication.processEvents()
+                self.delete_window(mw)
+                counts = storage.get_stats_counts(user.id, "course_status", "course_type")
+                self.assertEqual(enum_counts(CourseStatus, counts["course_status"], CourseStatus.PLANNED),
+                                 {CourseStatus.PLANNED: 2, CourseStatus.IN_PROGRESS: 1})
+                self.assertEqual(enum_counts(CourseType, counts["course_type"], CourseType.COURSE),
+                                 {CourseType.COURSE: 3})
+                counts = storage.get_stats_counts(user.id, "goal_status", "goal_priority")
+                self.assertEqual(enum_counts(GoalStatus, counts["goal_status"], LearningGoal.status),
+                                 {GoalStatus.COMPLETED: 1, GoalStatus.PLANNED: 1})
+                self.assertEqual(enum_counts(GoalPriority, counts["goal_priority"], LearningGoal.priority),
+                                 {GoalPriority.HIGH: 1, GoalPriority.MEDIUM: 1})
+            finally:
+                storage.close()
+
     def test_edit_goal_dialog(self):
         """Ініціалізація діалогу цілі з даними."""
         goal = LearningGoal(title="Edit Me", user_id="u1", description="Desc")
@@ -52,30 +213,72 @@ class TestUI(unittest.TestCase):
         items = [LearningGoal(title="Python Basics", user_id="u1")]
         dialog = SearchDialog(None, items, self.mock_storage)
 
-        text = "Python Basics"
-        query = "Python"
-        highlighted = dialog._highlight(query, text)
+        # Позиції збігу приходять з storage.search
+        highlighted = dialog._mark("Python <Basics>", [(0, 6)])
         self.assertIn('background-color', highlighted)
+        self.assertIn("&lt;Basics&gt;", highlighted)
 
     # --- ВИПРАВЛЕНІ ТЕСТИ КАРТОК ТА ДІАЛОГІВ ---
 
-    def test_quest_card_init(self):
-        """Ініціалізація картки квесту."""
-        goal = LearningGoal(title="Test Goal", user_id="u1", deadline="2025-01-01")
+    def test_goal_list_paints_only_visible_cards(self):
+        """Список цілей віртуалізований: з 10 000 цілей малюються лише видимі картки; кліки - дії картки."""
+        painted = set()
 
-        # Створюємо мок для parent_tab, який очікує картка
-        mock_tab = MagicMock()
-        # Картка звертається до self.parent_tab.mw.storage
-        mock_tab.mw.storage = self.mock_storage
+        class CountingDelegate(GoalCardDelegate):
+            def paint(self, painter, option, index):
+                painted.add(index.row())
+                super().paint(painter, option, index)
 
-        card = QuestCard(goal, parent_tab=mock_tab)
+        mw = MainWindow(user_id="u1", storage=self.mock_storage)
+        self.addCleanup(self.delete_window, mw)
+        mw.db.wait()
+        tab = mw.tab_quests
+        tab.delegate = CountingDelegate(tab)
+        tab.delegate.actionTriggered.connect(tab.on_card_action)
+        tab.list_view.setItemDelegate(tab.delegate)
 
-        self.assertIsNotNone(card.title_lbl)
-        # Перевіряємо метод оновлення стилю (чи не падає)
-        try:
-            card.highlight_card()
-        except:
-            pass
+        goals = [LearningGoal(title=f"Goal {i}", user_id="u1", description="Опис " * (i % 7)) for i in range(10000)]
+        tab.model.reset(progress={goals[0].id: (2, 1)})
+        tab.add_cards(goals)
+        tab.list_view.setVisible(True)
+        view, model = tab.list_view, tab.model
+
+        def wait_layout():
+            # Висоти рахуються порціями (Batched) - чекаємо, поки вид розкладе весь список
+            deadline = time.time() + 5
+            while not view.visualRect(model.index(9999)).isValid() and time.time() < deadline:
+                QTest.qWait(10)
+
+        mw.show()
+        wait_layout()
+        painted.clear()
+        tab.list_view.viewport().repaint()
+        self.assertTrue(painted)
+        self.assertLess(len(painted), 30)
+
+        subgoals = [SubGoal(title="Крок 1", goal_id=goals[0].id),
+                    SubGoal(title="Крок 2", goal_id=goals[0].id, is_completed=True)]
+        self.mock_storage.get_subgoals.return_value = subgoals
+        self.mock_storage.get_user_by_id.return_value = MagicMock(id="u1", total_completed_goals=0)
+        collapsed = view.visualRect(model.index(0)).height()
+
+        def click(action):
+            rect = view.visualRect(model.index(0))
+            lay = tab.delegate.card_layout(model, goals[0], view.viewport().width(), view.font())
+            target = lay["subrows"][0][0] if action == "subgoal" else lay["actions"][action]
+            QTest.mouseClick(view.viewport(), Qt.LeftButton, pos=rect.topLeft() + target.center())
+            wait_layout()
+
+        click("toggle")
+        self.assertIn(goals[0].id, model.expanded)
+        self.assertGreater(view.visualRect(model.index(0)).height(), collapsed)
+
+        click("subgoal")
+        self.mock_storage.save_subgoal.assert_called_once_with(subgoals[0])
+        self.assertEqual(model.progress_of(goals[0]), (2, 2))
+        self.assertEqual(goals[0].status, GoalStatus.COMPLETED)
+        self.assertNotIn("complete", tab.delegate.card_layout(model, goals[0], view.viewport().width(),
+                                                              view.font())["actions"])
 
     def test_habit_card_init(self):
         """Ініціалізація картки звички."""
@@ -119,5 +322,64 @@ class TestUI(unittest.TestCase):
         self.assertTrue(dialog.chat_layout.count() > 0)
 
 
+    def test_export_worker_signals(self):
+        """Фоновий експорт передає прогрес і результат сигналами."""
+        def fake_export(user_id, path, progress=None, is_cancelled=None):
+            progress(5, 10)
+            return None if is_cancelled() else 10
+
+        self.mock_storage.export_user_data_to_file.side_effect = fake_export
+        worker = ExportWorker(self.mock_storage, "u1", "out.json")
+        events = []
+        worker.progress.connect(lambda done, total: events.append(("progress", done, total)))
+        worker.done.connect(lambda n: events.append(("done", n)))
+        worker.cancelled.connect(lambda: events.append(("cancelled",)))
+        worker.run()
+        self.assertEqual(events, [("progress", 5, 10), ("done", 10)])
+
+        # Сховище повертає None, якщо експорт скасовано
+        events.clear()
+        self.mock_storage.export_user_data_to_file.side_effect = None
+        self.mock_storage.export_user_data_to_file.return_value = None
+        worker.run()
+        self.assertEqual(events, [("cancelled",)])
+
+        # Після кожного запуску потік воркера закриває своє з'єднання, зокрема й після помилки
+        self.mock_storage.export_user_data_to_file.side_effect = OSError("disk full")
+        worker.run()
+        self.assertEqual(self.mock_storage.release_thread_connection.call_count, 3)
+
+    def test_import_worker_releases_connection(self):
+        """Імпорт у фоновому потоці закриває з'єднання потоку і після успіху, і після помилки."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "backup.json")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write('{"goals": []}')
+            self.mock_storage.import_user_data.return_value = 0
+            worker = ImportWorker(self.mock_storage, "u1", path)
+            results = []
+            worker.done.connect(results.append)
+            worker.error.connect(results.append)
+            worker.run()
+            worker.file_path = os.path.join(tmp, "missing.json")
+            worker.run()
+        self.assertEqual(results[0], 0)
+        self.assertIsInstance(results[1], str)
+        self.assertEqual(self.mock_storage.release_thread_connection.call_count, 2)
+
+    def test_ui_benchmark_runs_all_scenarios(self):
+        """Бенчмарк UI проходить усі сценарії на крихітному наборі даних."""
+        path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            "benchmarks", "bench_ui.py")
+        spec = importlib.util.spec_from_file_location("bench_ui", path)
+        bench = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(bench)
+        tiny = DatasetSpec(goals_per_user=5, subgoals_per_goal=(0, 1), habits_per_user=2,
+                           history_years=0.05, courses_per_user=2)
+        result = bench.run_size(app, "tiny", tiny, repeat=1, budget=0, cards=3)
+        self.assertEqual(set(result["scenarios"]), set(bench.SCENARIOS))
+        self.assertTrue(all(r["samples"] == 1 and r["p50_ms"] > 0 for r in result["scenarios"].values()))
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file